@@ -0,0 +1,231 @@
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+
+from benchmarks.scenes import control_grid, mesh_scene, polygons_scene
+from models.point_3d import Point3D
+from models.surface_3d import Surface3D
+from models.wireframe import Wireframe
+from models.wireframe_3d import Wireframe_3D
+from utils.descritorOBJ import DescritorOBJ
+from utils.tessellation_cache import tessellation_cache
+from utils.transformations import (
+    create_rotation_matrix_3d,
+    forward_differences_bicubic_evaluate,
+    forward_differences_bicubic_setup,
+)
+from utils.types import ObjectType
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+# Each case builds its data for a size and returns the function to be timed.
+# The functions may change the data, as long as timing them again stays representative.
+
+def point3d_transformation(size: int, directory: str):
+    rng = np.random.default_rng(0)
+    points = [Point3D(tuple(point)) for point in rng.uniform(-10, 10, (size, 3)).tolist()]
+    rotation = create_rotation_matrix_3d(1, 2, 3)
+    return lambda: [point.transformation(op=rotation) for point in points]
+
+
+def wireframe_transformation(size: int, directory: str):
+    angles = np.linspace(0, 2 * math.pi, size, endpoint=False)
+    wireframe = Wireframe("polygon", ObjectType.POLYGON, list(zip(np.cos(angles).tolist(), np.sin(angles).tolist())))
+    return lambda: wireframe.rotate(1)
+
+
+def wireframe_3d_rotate(size: int, directory: str):
+    rng = np.random.default_rng(0)
+    vertices = rng.uniform(-10, 10, (size, 3))
+    edges = [(i, i + 1) for i in range(size - 1)]
+    wireframe = Wireframe_3D("wireframe", ObjectType.POLYGON_3D, vertices, edges)
+    return lambda: wireframe.rotate(1, 2, 3)
+
+
+def surface3d_generate_surface(size: int, directory: str):
+    surface = Surface3D("surface", ObjectType.SURFACE_BEZIER, control_grid(4, 4), size)
+    return surface.generate_surface
+
+
+def forward_differences_evaluate(size: int, directory: str):
+    Cx, Cy, Cz, delta_u, delta_v = forward_differences_bicubic_setup(control_grid(4, 4), size)
+    return lambda: forward_differences_bicubic_evaluate(Cx, Cy, Cz, delta_u, delta_v, size)
+
+
+def export_objects(size: int) -> list:
+    """
+    size objects, half 2D hexagons and half 10 x 10 vertex 3D meshes
+    """
+    objects = polygons_scene(size - size // 2)
+    for i in range(size // 2):
+        mesh = mesh_scene(10, seed=i)[0]
+        mesh.name = f"mesh{i}"
+        objects.append(mesh)
+    return objects
+
+
+def obj_export(size: int, directory: str):
+    descritor = DescritorOBJ()
+    descritor.objs = export_objects(size)
+    path = os.path.join(directory, "export.obj")
+    return lambda: descritor.export_file(path)
+
+
+def obj_import(size: int, directory: str):
+    path = os.path.join(directory, "import.obj")
+    descritor = DescritorOBJ()
+    descritor.objs = export_objects(size)
+    descritor.export_file(path)
+    # Every import parses the file, instead of reading the sidecar of the previous one
+    descritor.use_sidecar = False
+    return lambda: descritor.import_file(path)
+
+
+# Case name -> (setup, sizes)
+CASES = {
+    "point3d_transformation": (point3d_transformation, [100, 1000, 10000]),
+    "wireframe_transformation": (wireframe_transformation, [10, 100, 1000]),
+    "wireframe_3d_rotate": (wireframe_3d_rotate, [100, 10000, 1000000]),
+    "surface3d_generate_surface": (surface3d_generate_surface, [10, 50, 200]),
+    "forward_differences_bicubic_evaluate": (forward_differences_evaluate, [10, 20, 50]),
+    "obj_export": (obj_export, [100, 1000]),
+    "obj_import": (obj_import, [100, 1000]),
+}
+
+
+def run_case(case: str, size: int, repeat: int) -> dict:
+    """
+    Times a case at a size, with as many calls per run as take at least 0.2 seconds
+    """
+    setup, _ = CASES[case]
+    directory = tempfile.mkdtemp(prefix="benchmark_")
+    try:
+        timer = timeit.Timer(setup(size, directory))
+        number, _ = timer.autorange()
+        times = [elapsed / number * 1000 for elapsed in timer.repeat(repeat, number)]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "case": case,
+        "size": size,
+        "median_ms": statistics.median(times),
+        "min_ms": min(times),
+        "max_ms": max(times),
+        "calls": number * repeat,
+    }
+
+
+def run(cases: list[str], repeat: int) -> dict:
+    # Surfaces are tessellated every time, not read from the cache on disk
+    tessellation_cache.enabled = False
+    results = []
+    for case in cases:
+        for size in CASES[case][1]:
+            result = run_case(case, size, repeat)
+            results.append(result)
+            print(f"{case:>38} {size:>8} {result['median_ms']:>12.4f} ms", file=sys.stderr)
+    return {"environment": environment(), "results": results}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """
+    Returns the cases of the current results whose median is more than threshold
+    (a fraction) slower than the baseline, printing every case compared
+    """
+    reference = {(result["case"], result["size"]): result["median_ms"] for result in baseline["results"]}
+    regressions = []
+    print(f"{'case':>38} {'size':>8} {'baseline ms':>12} {'current ms':>12} {'ratio':>8}")
+    for result in current["results"]:
+        key = (result["case"], result["size"])
+        if key not in reference:
+            print(f"{key[0]:>38} {key[1]:>8} {'no baseline':>12}")
+            continue
+        ratio = result["median_ms"] / reference[key]
+        status = "SLOWER" if ratio > 1 + threshold else "ok"
+        print(f"{key[0]:>38} {key[1]:>8} {reference[key]:>12.4f} {result['median_ms']:>12.4f} {ratio:>7.2f}x {status}")
+        if status == "SLOWER":
+            regressions.append(f"{key[0]} ({key[1]})")
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the model layer.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="runs the benchmarks and prints or saves the results")
+    run_parser.add_argument("-o", "--output", help="JSON file of the results, printed when not given")
+
+    baseline_parser = subparsers.add_parser("baseline", help="runs the benchmarks and stores them as the baseline")
+    baseline_parser.add_argument("--baseline", default=BASELINE_PATH)
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="runs the benchmarks, or loads --results, and fails if a case is slower than the baseline"
+    )
+    compare_parser.add_argument("--baseline", default=BASELINE_PATH)
+    compare_parser.add_argument("--results", help="JSON file of results to compare instead of running the benchmarks")
+    compare_parser.add_argument("--threshold", type=float, default=0.2,
+                                help="allowed slowdown as a fraction of the baseline (default 0.2, 20%%)")
+
+    for subparser in (run_parser, baseline_parser, compare_parser):
+        subparser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+        subparser.add_argument("--repeat", type=int, default=5, help="timed runs of each case")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    if args.command == "compare":
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except OSError:
+            print(f"Error: No baseline at {args.baseline}, record one with the baseline command", file=sys.stderr)
+            return 2
+        if args.results:
+            with open(args.results) as f:
+                current = json.load(f)
+        else:
+            current = run(args.cases, args.repeat)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) over {args.threshold:.0%} slower: {', '.join(regressions)}")
+            return 1
+        return 0
+
+    results = json.dumps(run(args.cases, args.repeat), indent=2)
+    output = args.baseline if args.command == "baseline" else args.output
+    if output:
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, "w") as f:
+            f.write(results + "\n")
+    else:
+        print(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
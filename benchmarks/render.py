@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Frames are drawn without a display, through the offscreen platform plugin
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QT_VERSION_STR, Qt
+from PyQt6.QtGui import QImage
+from PyQt6.QtWidgets import QApplication
+
+from benchmarks.micro import environment as model_environment
+from benchmarks.scenes import DEFAULT_SIZES, SCENES
+from ui.canvas import Canvas
+
+PROJECTIONS = {"parallel": "Parallel Projection", "perspective": "Perspective Projection"}
+CLIPPING_ALGORITHMS = {"cohen-sutherland": "Cohen-Sutherland", "liang-barsky": "Liang-Barsky"}
+
+
+class QuietConsole():
+    """
+    Console of the benchmark canvas, keeping only how many messages were logged
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def log(self, message: str):
+        self.count += 1
+
+
+def create_canvas(width: int, height: int) -> Canvas:
+    """
+    Returns an empty canvas laid out at width x height, without being shown on screen
+    """
+    canvas = Canvas(QuietConsole(), None, load_examples=False)
+    canvas.setAttribute(Qt.WidgetAttribute.WA_DontShowOnScreen)
+    canvas.resize(width, height)
+    canvas.show()
+    QApplication.processEvents()
+    return canvas
+
+
+def time_frames(canvas: Canvas, repeat: int, warmup: int) -> list[float]:
+    """
+    Returns the times, in milliseconds, of repeat frames drawn by Canvas.paintEvent into
+    an offscreen QImage, after warmup frames that are not timed
+    """
+    image = QImage(canvas.width(), canvas.height(), QImage.Format.Format_ARGB32_Premultiplied)
+    times = []
+    for i in range(warmup + repeat):
+        canvas.update()
+        start = time.perf_counter()
+        canvas.render(image)
+        elapsed = (time.perf_counter() - start) * 1000
+        if i >= warmup:
+            times.append(elapsed)
+    return times
+
+
+def run_case(canvas: Canvas, case: str, size: int, clipping: list[str], projections: list[str], repeat: int, warmup: int) -> list[dict]:
+    """
+    Times a synthetic scene with every clipping algorithm and projection
+    """
+    start = time.perf_counter()
+    objects = SCENES[case](size)
+    build_ms = (time.perf_counter() - start) * 1000
+    canvas.clear()
+    canvas.add_objects(objects)
+
+    results = []
+    for projection in projections:
+        for algorithm in clipping:
+            canvas.set_projection_mode(PROJECTIONS[projection])
+            canvas.set_line_clipping_algorithm(CLIPPING_ALGORITHMS[algorithm])
+            canvas.console.count = 0
+            times = time_frames(canvas, repeat, warmup)
+            results.append({
+                "case": case,
+                "size": size,
+                "objects": len(objects),
+                "projection": projection,
+                "clipping": algorithm,
+                "build_ms": round(build_ms, 3),
+                "median_ms": round(statistics.median(times), 3),
+                "min_ms": round(min(times), 3),
+                "max_ms": round(max(times), 3),
+                "mean_ms": round(statistics.fmean(times), 3),
+                "frames": len(times),
+                "messages": canvas.console.count,
+            })
+    return results
+
+
+def environment(width: int, height: int) -> dict:
+    return {**model_environment(), "qt": QT_VERSION_STR, "viewport": [width, height]}
+
+
+def parse_sizes(text: str) -> tuple[str, list[int]]:
+    case, sizes = text.split("=")
+    if case not in SCENES:
+        raise argparse.ArgumentTypeError(f"unknown case {case}")
+    return case, [int(size) for size in sizes.split(",")]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Times Canvas.paintEvent on synthetic scenes, by object type and clipping algorithm."
+    )
+    parser.add_argument("--cases", nargs="+", choices=SCENES, default=list(SCENES))
+    parser.add_argument("--size", type=parse_sizes, action="append", default=[], metavar="CASE=N[,N...]",
+                        help="sizes of a case (object count, mesh side or surface resolution) instead of the defaults")
+    parser.add_argument("--clipping", nargs="+", choices=CLIPPING_ALGORITHMS, default=list(CLIPPING_ALGORITHMS))
+    parser.add_argument("--projection", nargs="+", choices=PROJECTIONS, default=["parallel"])
+    parser.add_argument("--repeat", type=int, default=3, help="timed frames of each case")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed frames drawn before each case")
+    parser.add_argument("--viewport", default="800x600", help="canvas size as WIDTHxHEIGHT")
+    parser.add_argument("-o", "--output", help="JSON file of the results, printed when not given")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    width, height = (int(size) for size in args.viewport.lower().split("x"))
+    app = QApplication(sys.argv[:1])
+    canvas = create_canvas(width, height)
+
+    sizes = {**DEFAULT_SIZES, **dict(args.size)}
+    results = []
+    for case in args.cases:
+        for size in sizes[case]:
+            for result in run_case(canvas, case, size, args.clipping, args.projection, args.repeat, args.warmup):
+                results.append(result)
+                print(
+                    f"{case:>16} {size:>6} {result['projection']:>11} {result['clipping']:>16} "
+                    f"{result['median_ms']:>10.2f} ms",
+                    file=sys.stderr,
+                )
+
+    report = json.dumps({"environment": environment(width, height), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    canvas.close()
+    app.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import math
+
+import numpy as np
+
+from models.point_3d import Point3D
+from models.surface_3d import Surface3D
+from models.surface_BSpline import SurfaceBSplineFD
+from models.wireframe import Wireframe
+from models.wireframe_3d import Wireframe_3D
+from utils.tessellation_cache import grid_edges
+from utils.types import ObjectType
+
+# Objects are spread over this square around the origin, a bit larger than the default
+# window (-10 to 10), so some of them are clipped and some are culled
+SCENE_EXTENT = 15.0
+
+
+def random_positions(count: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).uniform(-SCENE_EXTENT, SCENE_EXTENT, (count, 2))
+
+
+def lines_scene(count: int, seed: int = 0) -> list:
+    """
+    count LINE objects with random endpoints up to 3 units apart
+    """
+    rng = np.random.default_rng(seed)
+    starts = random_positions(count, seed)
+    ends = starts + rng.uniform(-3, 3, (count, 2))
+    return [
+        Wireframe(f"line{i}", ObjectType.LINE, [tuple(start), tuple(end)])
+        for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist()))
+    ]
+
+
+def polygons_scene(count: int, seed: int = 0, sides: int = 6, fill: bool = False) -> list:
+    """
+    count regular POLYGON objects of random size and orientation
+    """
+    rng = np.random.default_rng(seed)
+    centers = random_positions(count, seed)
+    radii = rng.uniform(0.2, 1.5, count)
+    phases = rng.uniform(0, 2 * math.pi, count)
+    angles = np.arange(sides) * 2 * math.pi / sides
+    objects = []
+    for i, ((x, y), radius, phase) in enumerate(zip(centers.tolist(), radii.tolist(), phases.tolist())):
+        coordinates = [(x + radius * math.cos(a + phase), y + radius * math.sin(a + phase)) for a in angles]
+        objects.append(Wireframe(f"polygon{i}", ObjectType.POLYGON, coordinates, fill))
+    return objects
+
+
+def bezier_scene(count: int, segments: int = 50, seed: int = 0) -> list:
+    """
+    count G0 continuous Bézier CURVE objects of segments cubic pieces each,
+    crossing the whole window
+    """
+    rng = np.random.default_rng(seed)
+    objects = []
+    for i in range(count):
+        x = np.linspace(-SCENE_EXTENT, SCENE_EXTENT, 3 * segments + 1)
+        y = rng.uniform(-SCENE_EXTENT, SCENE_EXTENT) + rng.uniform(-2, 2, len(x))
+        points = list(zip(x.tolist(), y.tolist()))
+        coordinates = []
+        for j in range(segments):
+            coordinates.extend(points[3 * j:3 * j + 4])
+        objects.append(Wireframe(f"bezier{i}", ObjectType.CURVE, coordinates))
+    return objects
+
+
+def bspline_scene(count: int, points: int = 150, seed: int = 0) -> list:
+    """
+    count CURVE_BSPLINE objects of points control points each, crossing the whole window
+    """
+    rng = np.random.default_rng(seed)
+    objects = []
+    for i in range(count):
+        x = np.linspace(-SCENE_EXTENT, SCENE_EXTENT, points)
+        y = rng.uniform(-SCENE_EXTENT, SCENE_EXTENT) + rng.uniform(-2, 2, points)
+        objects.append(Wireframe(f"bspline{i}", ObjectType.CURVE_BSPLINE, list(zip(x.tolist(), y.tolist()))))
+    return objects
+
+
+def mesh_scene(size: int, seed: int = 0) -> list:
+    """
+    A single POLYGON_3D grid mesh of size x size vertices over a wavy height field
+    """
+    rng = np.random.default_rng(seed)
+    u, v = np.meshgrid(np.linspace(-SCENE_EXTENT, SCENE_EXTENT, size), np.linspace(-SCENE_EXTENT, SCENE_EXTENT, size))
+    z = np.sin(u / 2) * np.cos(v / 2) * 3 + rng.uniform(-0.1, 0.1, u.shape)
+    vertices = np.column_stack([u.ravel(), v.ravel(), z.ravel()])
+    edges = [tuple(edge) for edge in grid_edges(size, size).tolist()]
+    return [Wireframe_3D("mesh", ObjectType.POLYGON_3D, vertices, edges)]
+
+
+def control_grid(rows: int, cols: int, seed: int = 0) -> list[list[Point3D]]:
+    rng = np.random.default_rng(seed)
+    return [
+        [
+            Point3D(((j - (cols - 1) / 2) * 2.5, (i - (rows - 1) / 2) * 2.5, float(rng.uniform(-2, 2))))
+            for j in range(cols)
+        ]
+        for i in range(rows)
+    ]
+
+
+def surface_scene(resolution: int, seed: int = 0) -> list:
+    """
+    A Bézier and a B-spline Surface3D, each tessellated at resolution
+    """
+    return [
+        Surface3D("bezier surface", ObjectType.SURFACE_BEZIER, control_grid(4, 4, seed), resolution),
+        Surface3D("bspline surface", ObjectType.SURFACE_BSPLINE, control_grid(4, 4, seed + 1), resolution),
+    ]
+
+
+def fd_surface_scene(resolution: int, size: int = 10, seed: int = 0) -> list:
+    """
+    A SurfaceBSplineFD of size x size control points, tessellated at resolution
+    """
+    return [SurfaceBSplineFD("fd surface", control_grid(size, size, seed), resolution)]
+
+
+# Scene builders of each case, called with its size parameter
+SCENES = {
+    "lines": lines_scene,
+    "polygons": polygons_scene,
+    "filled_polygons": lambda count: polygons_scene(count, fill=True),
+    "bezier_curves": bezier_scene,
+    "bspline_curves": bspline_scene,
+    "wireframe_3d": mesh_scene,
+    "surfaces": surface_scene,
+    "fd_surfaces": fd_surface_scene,
+}
+
+# Sizes of each case: object counts, mesh side or surface resolution
+DEFAULT_SIZES = {
+    "lines": [1000, 5000],
+    "polygons": [500, 2000],
+    "filled_polygons": [500, 2000],
+    "bezier_curves": [1, 4],
+    "bspline_curves": [1, 4],
+    "wireframe_3d": [20, 50],
+    "surfaces": [10, 30],
+    "fd_surfaces": [5, 10],
+}
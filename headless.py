@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import sys
+
+# Without a display, Qt draws through the offscreen platform plugin
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+
+from models.window import Window
+from ui.canvas import Canvas
+from utils.descritorOBJ import DescritorOBJ
+from utils.descritorScene import DescritorScene
+from utils.profiler import OPERATIONS, PROFILE_DIRECTORY, profiler
+
+PROJECTIONS = {"parallel": "Parallel Projection", "perspective": "Perspective Projection"}
+CLIPPING_ALGORITHMS = {"cohen-sutherland": "Cohen-Sutherland", "liang-barsky": "Liang-Barsky"}
+
+
+class PrintConsole():
+    """
+    Console of the headless canvas, writing its messages to stderr
+    """
+
+    def log(self, message: str):
+        print(message, file=sys.stderr)
+
+
+class HeadlessRenderer():
+    """
+    Renders scene files to images without a window, with the same Canvas pipeline as the
+    interface. A single canvas is kept for every render, so a scene is only loaded once
+    for all the camera positions it is rendered from.
+    """
+
+    def __init__(self):
+        self.console = PrintConsole()
+        self.canvas = Canvas(self.console, None, load_examples=False)
+        # Path of the loaded scene, None for the example objects and "" before the first load
+        self.scene: str | None = ""
+
+    def load_scene(self, path: str | None, fill: bool = False):
+        if path == self.scene:
+            return
+        self.canvas.clear()
+        self.scene = ""
+        if path is None:
+            self.canvas.load_example_objects()
+        elif path.endswith(".scene"):
+            self.canvas.add_objects(DescritorScene().import_file(path))
+        else:
+            self.canvas.add_objects(DescritorOBJ().import_file(path, fill))
+        self.scene = path
+
+    def render_frame(self, width: int, height: int):
+        """
+        Draws the scene as the canvas is set up, returning the image and the messages logged
+        """
+        snapshot = self.canvas.snapshot()
+        snapshot.resize(width, height)
+        return snapshot.render(), snapshot.messages
+
+    def render(self, job: dict):
+        """
+        Renders a job, a dict with the same keys as the command line options, to its output
+        """
+        self.load_scene(job.get("scene"), job.get("fill", False))
+        canvas = self.canvas
+        canvas.window = Window(*job["window"]) if job.get("window") else Window()
+        if job.get("zoom"):
+            canvas.window.zoom(job["zoom"])
+        if job.get("pan"):
+            canvas.window.pan(*job["pan"])
+        if job.get("camera"):
+            angle_x, angle_y, angle_z = job["camera"]
+            canvas.window.rotate_x(angle_x)
+            canvas.window.rotate_y(angle_y)
+            canvas.window.rotate_z(angle_z)
+        canvas.set_projection_mode(PROJECTIONS[job.get("projection", "parallel")])
+        canvas.set_line_clipping_algorithm(CLIPPING_ALGORITHMS[job.get("clipping", "cohen-sutherland")])
+        canvas.show_control_points = job.get("control_points", False)
+
+        width, height = job.get("size", (800, 600))
+        canvas.resize(width, height)
+        frames = job.get("profile_frames", 0)
+        if frames:
+            stem = os.path.splitext(os.path.basename(job["output"]))[0]
+            with profiler.profile(f"render_{stem}"):
+                for _ in range(frames):
+                    image, messages = self.render_frame(width, height)
+        else:
+            image, messages = self.render_frame(width, height)
+        for message in messages:
+            self.console.log(message)
+
+        output = job["output"]
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        if not image.save(output):
+            raise OSError(f"Could not write {output}")
+
+
+def parse_size(text: str) -> tuple[int, int]:
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def parse_camera(text: str) -> tuple[float, float, float]:
+    angle_x, angle_y, angle_z = (float(angle) for angle in text.split(","))
+    return angle_x, angle_y, angle_z
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Renders scene files (.obj or .scene) to PNG images without opening a window."
+    )
+    parser.add_argument("scenes", nargs="*", help="scene files to render; the example objects when none is given")
+    parser.add_argument("-o", "--output", default="render.png",
+                        help="image file of a single render, or directory of the images of a batch")
+    parser.add_argument("--size", type=parse_size, default=(800, 600), help="image size as WIDTHxHEIGHT")
+    parser.add_argument("--window", type=float, nargs=6, metavar=("XMIN", "YMIN", "XMAX", "YMAX", "ZMAX", "ZMIN"),
+                        help="window extent in world coordinates")
+    parser.add_argument("--zoom", type=float, help="zoom factor applied to the window (< 1 zooms in)")
+    parser.add_argument("--pan", type=float, nargs=3, metavar=("DX", "DY", "DZ"), help="moves the window")
+    parser.add_argument("--camera", type=parse_camera, action="append", default=[],
+                        help="window rotation as AX,AY,AZ degrees; repeat it to render each scene from several cameras")
+    parser.add_argument("--projection", choices=PROJECTIONS, default="parallel")
+    parser.add_argument("--clipping", choices=CLIPPING_ALGORITHMS, default="cohen-sutherland")
+    parser.add_argument("--control-points", action="store_true", help="shows the control points of the curves")
+    parser.add_argument("--fill", action="store_true", help="fills the polygons of OBJ files")
+    parser.add_argument("--batch", help="JSON file with a list of jobs, each with the keys of these options")
+    parser.add_argument("--profile-frames", type=int, default=0, metavar="N",
+                        help="draws each render N times under cProfile, writing the profile under --profile-dir")
+    parser.add_argument("--profile", nargs="+", choices=OPERATIONS, default=[], metavar="OPERATION",
+                        help=f"profiles each of these operations ({', '.join(OPERATIONS)}) on its own")
+    parser.add_argument("--profile-memory", action="store_true", help="also traces memory allocations while profiling")
+    parser.add_argument("--profile-memory-depth", type=int, default=1, metavar="N",
+                        help="frames of the call stack kept for each traced allocation")
+    parser.add_argument("--profile-dir", default=PROFILE_DIRECTORY, help="directory of the profiles")
+    return parser.parse_args(argv)
+
+
+def build_jobs(args: argparse.Namespace) -> list[dict]:
+    """
+    Returns one job per scene and camera, and the jobs of the batch file
+    """
+    options = {
+        "size": args.size,
+        "window": args.window,
+        "zoom": args.zoom,
+        "pan": args.pan,
+        "projection": args.projection,
+        "clipping": args.clipping,
+        "control_points": args.control_points,
+        "fill": args.fill,
+        "profile_frames": args.profile_frames,
+    }
+    scenes = args.scenes or ([] if args.batch else [None])
+    cameras = args.camera or [None]
+    jobs = []
+    for scene in scenes:
+        for camera in cameras:
+            jobs.append({**options, "scene": scene, "camera": camera})
+
+    # A single render is written to the output itself, a batch to files inside it
+    if len(jobs) == 1 and not args.batch:
+        jobs[0]["output"] = args.output
+    else:
+        for job in jobs:
+            stem = os.path.splitext(os.path.basename(job["scene"] or "examples"))[0]
+            if len(cameras) > 1:
+                stem += "_" + "_".join(f"{angle:g}" for angle in job["camera"])
+            job["output"] = os.path.join(args.output, f"{stem}.png")
+
+    if args.batch:
+        with open(args.batch) as f:
+            for entry in json.load(f):
+                job = {**options, "camera": None, **entry}
+                if "size" in entry and isinstance(entry["size"], str):
+                    job["size"] = parse_size(entry["size"])
+                jobs.append(job)
+    return jobs
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    jobs = build_jobs(args)
+    profiler.directory = args.profile_dir
+    profiler.memory = args.profile_memory
+    profiler.memory_depth = args.profile_memory_depth
+    profiler.operations = set(args.profile)
+    app = QApplication(sys.argv[:1])
+    renderer = HeadlessRenderer()
+    failed = 0
+    for job in jobs:
+        try:
+            renderer.render(job)
+            print(job["output"])
+        except Exception as e:
+            failed += 1
+            print(f"Error: {job.get('scene') or 'examples'} -> {job.get('output')}: {e}", file=sys.stderr)
+    for profile_path, text_path in profiler.written:
+        print(f"Profile written to {profile_path} and {text_path}", file=sys.stderr)
+    app.quit()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
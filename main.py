@@ -48,6 +48,10 @@ class MainWindow(QMainWindow):
         self.showFullScreen()
         self.show()
 
+    def closeEvent(self, event):
+        self.canvas.close_session()
+        super().closeEvent(event)
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -18,6 +18,14 @@ class Point3D:
     def get_coordinates(self) -> list[tuple[int, int, int]]:
         return self.coordinates
 
+    def get_xyz(self) -> tuple[float, float, float]:
+        """
+        Returns the coordinates as a (x, y, z) tuple, whether they are stored as a tuple or as a one element list
+        """
+        if isinstance(self.coordinates, list):
+            return self.coordinates[0]
+        return self.coordinates
+
     def translate(self, dx: float, dy: float, dz: float) -> None:
         T = create_translation_matrix_3d(dx, dy, dz)
         self.transformation(op=T)
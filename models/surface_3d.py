@@ -1,6 +1,10 @@
 import numpy as np
 from PyQt6.QtGui import QColor
 from models.point_3d import Point3D
+from utils.tessellation_cache import tessellation_cache
+from utils.tessellation_service import surface_edges, surface_shape, tessellate, tessellation_service
+from utils.bounds import CachedBounds
+from utils.profiler import profiled
 from utils.types import ObjectType
 
 
@@ -14,15 +18,20 @@ class Surface3D:
         fill: bool = False,
     ):
         self.name: str = name
+        self._bounds = CachedBounds()
         self.obj_type: ObjectType = obj_type
         self.control_points: list[list[Point3D]] = control_points  
         self.color: QColor = QColor("black")
         self.is_selected: bool = False
         self.fill: bool = fill
         self.resolution: int = resolution
-        self.surface_points: list[list[Point3D]] = []
+        # Surface points are built from the mesh arrays when first needed
+        self._surface_points: list[list[Point3D]] | None = []
+        self.mesh_shape: tuple[int, int] = (0, 0)
         self.triangles: list[tuple[int, int, int]] = []
-        self.generate_surface()
+        self.mesh_vertices: np.ndarray = np.zeros((0, 3))
+        self.mesh_edges: np.ndarray = np.zeros((0, 2), dtype=np.int32)
+        self.load_surface()
 
     def set_fill(self, fill: bool) -> None:
         self.fill = fill
@@ -40,103 +49,71 @@ class Surface3D:
         for row in self.control_points:
             for point in row:
                 point.translate(dx, dy, dz)
-        self.generate_surface()
+        self.update_surface()
 
     def transform(self, sx: float, sy: float, sz: float) -> None:
         for row in self.control_points:
             for point in row:
                 point.transform(sx, sy, sz)
-        self.generate_surface()
+        self.update_surface()
 
     def rotate(self, angle_x: float, angle_y: float, angle_z: float):
         for row in self.control_points:
             for point in row:
                 point.rotate(angle_x, angle_y, angle_z)
-        self.generate_surface()
-
+        self.update_surface()
+
+    @profiled("surface")
+    def load_surface(self):
+        """Load the surface mesh from the tessellation cache, generating and caching it on a miss"""
+        key = tessellation_cache.key(self.obj_type.value, self.get_control_array(), self.resolution)
+        cached = tessellation_cache.load(key)
+        if cached is None:
+            if tessellation_service.enabled:
+                tessellation_service.submit(self, key)
+                return
+            self.generate_surface()
+            tessellation_cache.store(key, self.mesh_vertices, self.mesh_edges, self.mesh_shape)
+            return
+
+        self.apply_mesh(*cached)
+
+    def update_surface(self):
+        """Regenerate the mesh after the control points changed, on the tessellation service if enabled"""
+        if tessellation_service.enabled:
+            tessellation_service.submit(self)
+        else:
+            self.generate_surface()
+
+    @profiled("surface")
     def generate_surface(self):
         """Generate the surface mesh from control points"""
-        if self.obj_type == ObjectType.SURFACE_BEZIER:
-            self._generate_bezier_surface()
-        elif self.obj_type == ObjectType.SURFACE_BSPLINE:
-            self._generate_bspline_surface()
-
-    def _generate_bezier_surface(self):
-        """Generate Bézier bicubic surface"""
-        # Bézier basis matrix
-        M_bezier = np.array([
-            [-1, 3, -3, 1],
-            [3, -6, 3, 0],
-            [-3, 3, 0, 0],
-            [1, 0, 0, 0]
-        ])
-
-        self.surface_points = []
-        
-        for i in range(self.resolution + 1):
-            u = i / self.resolution
-            row_points = []
-            
-            for j in range(self.resolution + 1):
-                v = j / self.resolution
-                
-                point = self._evaluate_bezier_point(u, v, M_bezier)
-                row_points.append(point)
-            
-            self.surface_points.append(row_points)
-        
-        self._generate_triangles()
-
-    def _generate_bspline_surface(self):
-        """Generate B-Spline surface"""
-        M_bspline = np.array([
-            [-1, 3, -3, 1],
-            [3, -6, 3, 0],
-            [-3, 0, 3, 0],
-            [1, 4, 1, 0]
-        ]) / 6
-
-        self.surface_points = []
-        
-        for i in range(self.resolution + 1):
-            u = i / self.resolution
-            row_points = []
-            
-            for j in range(self.resolution + 1):
-                v = j / self.resolution
-                
-                point = self._evaluate_bezier_point(u, v, M_bspline)
-                row_points.append(point)
-            
-            self.surface_points.append(row_points)
-        
+        control = self.get_control_array()
+        shape = surface_shape(self.obj_type.value, control.shape, self.resolution)
+        vertices = tessellate(self.obj_type.value, control, self.resolution)
+        self.apply_mesh(vertices, surface_edges(shape), shape)
+
+    def apply_mesh(self, vertices: np.ndarray, edges: np.ndarray, shape: tuple):
+        """Replace the surface mesh by (rows * cols, 3) vertices and their grid edges"""
+        self.mesh_shape = tuple(shape)
+        self._surface_points = None
         self._generate_triangles()
-
-    def _evaluate_bezier_point(self, u: float, v: float, basis_matrix: np.ndarray) -> Point3D:
-        """Evaluate a point on the surface at parameters u, v"""
-        U = np.array([u**3, u**2, u, 1])
-        V = np.array([v**3, v**2, v, 1])
-        
-        x_points = np.zeros((4, 4))
-        y_points = np.zeros((4, 4))
-        z_points = np.zeros((4, 4))
-        
-        for i in range(4):
-            for j in range(4):
-                coords = self.control_points[i][j].get_coordinates()
-                if isinstance(coords, list) and len(coords) > 0:
-                    x, y, z = coords[0]
-                else:
-                    x, y, z = coords
-                x_points[i][j] = x
-                y_points[i][j] = y
-                z_points[i][j] = z
-        
-        x = U @ basis_matrix @ x_points @ basis_matrix.T @ V
-        y = U @ basis_matrix @ y_points @ basis_matrix.T @ V
-        z = U @ basis_matrix @ z_points @ basis_matrix.T @ V
-        
-        return Point3D([(float(x), float(y), float(z))])
+        self.mesh_vertices = vertices
+        self.mesh_edges = edges
+
+    @property
+    def surface_points(self) -> list[list[Point3D]]:
+        if self._surface_points is None:
+            rows, cols = self.mesh_shape
+            self._surface_points = [
+                [Point3D([tuple(point)]) for point in row]
+                for row in self.mesh_vertices.reshape(rows, cols, 3).tolist()
+            ]
+        return self._surface_points
+
+    def get_control_array(self) -> np.ndarray:
+        """Get the control points as a (rows, cols, 3) array"""
+        return np.array([[point.get_xyz() for point in row] for row in self.control_points], dtype=np.float64)
 
     def _generate_triangles(self):
         """Generate triangles for wireframe rendering"""
@@ -206,6 +183,12 @@ class Surface3D:
     def export_coordinates(self) -> list[Point3D]:
         return self.get_control_points_flat()
 
+    def get_bounds(self) -> np.ndarray:
+        """
+        Returns the cached (xmin, ymin, zmin, xmax, ymax, zmax) box of the object
+        """
+        return self._bounds.get(self.mesh_vertices, self.obj_type)
+
     def get_name(self) -> str:
         return self.name
 
@@ -1,8 +1,11 @@
 import numpy as np
 from PyQt6.QtGui import QColor
 from models.point_3d import Point3D
+from utils.tessellation_cache import tessellation_cache
+from utils.tessellation_service import surface_edges, surface_shape, tessellate, tessellation_service
+from utils.bounds import CachedBounds
+from utils.profiler import profiled
 from utils.types import ObjectType
-from utils.transformations import forward_differences_bicubic_setup, forward_differences_bicubic_evaluate
 
 
 class SurfaceBSplineFD:
@@ -14,6 +17,7 @@ class SurfaceBSplineFD:
         fill: bool = False,
     ):
         self.name: str = name
+        self._bounds = CachedBounds()
         self.obj_type: ObjectType = ObjectType.SURFACE_BSPLINE_FD
         self.control_points_matrix: list[list[Point3D]] = control_points_matrix
         self.color: QColor = QColor("black")
@@ -29,8 +33,12 @@ class SurfaceBSplineFD:
         if self.rows > 20 or self.cols > 20:
             raise ValueError("Control points matrix cannot exceed 20x20")
         
-        self.surface_patches = []
-        self.generate_surface()
+        # Patch points are built from the mesh arrays when first needed
+        self._surface_patches: list[list[list[Point3D]]] | None = []
+        self.mesh_shape: tuple[int, int, int] = (0, 0, 0)
+        self.mesh_vertices: np.ndarray = np.zeros((0, 3))
+        self.mesh_edges: np.ndarray = np.zeros((0, 2), dtype=np.int32)
+        self.load_surface()
 
     def set_fill(self, fill: bool) -> None:
         self.fill = fill
@@ -48,46 +56,70 @@ class SurfaceBSplineFD:
         for row in self.control_points_matrix:
             for point in row:
                 point.translate(dx, dy, dz)
-        self.generate_surface()
+        self.update_surface()
 
     def transform(self, sx: float, sy: float, sz: float) -> None:
         for row in self.control_points_matrix:
             for point in row:
                 point.transform(sx, sy, sz)
-        self.generate_surface()
+        self.update_surface()
 
     def rotate(self, angle_x: float, angle_y: float, angle_z: float):
         for row in self.control_points_matrix:
             for point in row:
                 point.rotate(angle_x, angle_y, angle_z)
-        self.generate_surface()
-
+        self.update_surface()
+
+    @profiled("surface")
+    def load_surface(self):
+        """Load the surface patches from the tessellation cache, generating and caching them on a miss"""
+        key = tessellation_cache.key(self.obj_type.value, self.get_control_array(), self.resolution)
+        cached = tessellation_cache.load(key)
+        if cached is None:
+            if tessellation_service.enabled:
+                tessellation_service.submit(self, key)
+                return
+            self.generate_surface()
+            tessellation_cache.store(key, self.mesh_vertices, self.mesh_edges, self.mesh_shape)
+            return
+
+        self.apply_mesh(*cached)
+
+    def update_surface(self):
+        """Regenerate the patches after the control points changed, on the tessellation service if enabled"""
+        if tessellation_service.enabled:
+            tessellation_service.submit(self)
+        else:
+            self.generate_surface()
+
+    @profiled("surface")
     def generate_surface(self):
         """Generate surface patches using forward differences"""
-        self.surface_patches = []
-        
-        patches_u = max(1, self.rows - 3)
-        patches_v = max(1, self.cols - 3)
-        
-        for i in range(patches_u):
-            for j in range(patches_v):
-                patch_control_points = []
-                for u in range(4):
-                    row = []
-                    for v in range(4):
-                        row.append(self.control_points_matrix[min(i + u, self.rows - 1)][min(j + v, self.cols - 1)])
-                    patch_control_points.append(row)
-                
-                try:
-                    Cx, Cy, Cz, delta_u, delta_v = forward_differences_bicubic_setup(
-                        patch_control_points, self.resolution
-                    )
-                    patch_points = forward_differences_bicubic_evaluate(
-                        Cx, Cy, Cz, delta_u, delta_v, self.resolution
-                    )
-                    self.surface_patches.append(patch_points)
-                except Exception as e:
-                    print(f"Error generating patch [{i}][{j}]: {e}")
+        control = self.get_control_array()
+        shape = surface_shape(self.obj_type.value, control.shape, self.resolution)
+        vertices = tessellate(self.obj_type.value, control, self.resolution)
+        self.apply_mesh(vertices, surface_edges(shape), shape)
+
+    def apply_mesh(self, vertices: np.ndarray, edges: np.ndarray, shape: tuple):
+        """Replace the patches by (patches * rows * cols, 3) vertices and their grid edges"""
+        self.mesh_shape = tuple(shape)
+        self._surface_patches = None
+        self.mesh_vertices = vertices
+        self.mesh_edges = edges
+
+    @property
+    def surface_patches(self) -> list[list[list[Point3D]]]:
+        if self._surface_patches is None:
+            patches, rows, cols = self.mesh_shape
+            self._surface_patches = [
+                [[Point3D([tuple(point)]) for point in row] for row in patch]
+                for patch in self.mesh_vertices.reshape(patches, rows, cols, 3).tolist()
+            ]
+        return self._surface_patches
+
+    def get_control_array(self) -> np.ndarray:
+        """Get the control points as a (rows, cols, 3) array"""
+        return np.array([[point.get_xyz() for point in row] for row in self.control_points_matrix], dtype=np.float64)
 
     def get_wireframe_edges(self) -> list[tuple[Point3D, Point3D]]:
         """Get edges for wireframe rendering of all patches"""
@@ -145,6 +177,12 @@ class SurfaceBSplineFD:
     def export_coordinates(self) -> list[Point3D]:
         return self.get_control_points_flat()
 
+    def get_bounds(self) -> np.ndarray:
+        """
+        Returns the cached (xmin, ymin, zmin, xmax, ymax, zmax) box of the object
+        """
+        return self._bounds.get(self.mesh_vertices, self.obj_type)
+
     def get_name(self) -> str:
         return self.name
 
@@ -150,6 +150,22 @@ class Window:
 
         return xn, yn, zn
 
+    def get_normalization_matrix(self):
+        """
+        Returns the matrix of world_to_normalized, so it can be applied to homogeneous coordinates
+        """
+
+        sx = 2.0 / (self.__xmax - self.__xmin)
+        sy = 2.0 / (self.__ymax - self.__ymin)
+        sz = 2.0 / (self.__zmax - self.__zmin)
+
+        return np.array([
+            [sx, 0, 0, 0],
+            [0, sy, 0, 0],
+            [0, 0, sz, 0],
+            [-self.__xmin * sx - 1, -self.__ymin * sy - 1, -self.__zmin * sz - 1, 1]
+        ])
+
     def normalized_to_world(
         self, xn: float, yn: float, zn: float
     ) -> tuple[float, float, float]:
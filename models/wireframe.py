@@ -6,6 +6,7 @@ from utils.transformations import (
     create_scale_matrix_2d,
     create_rotation_matrix_2d,
 )
+from utils.bounds import CachedBounds
 from utils.types import ObjectType
 
 
@@ -18,6 +19,7 @@ class Wireframe:
         fill: bool = False,
     ):
         self.name: str = name
+        self._bounds = CachedBounds()
         self.obj_type: ObjectType = obj_type
         self.coordinates: list[tuple[int, int]] = coordinates
         self.color: QColor = QColor("black")
@@ -79,6 +81,12 @@ class Wireframe:
     def export_coordinates(self) -> list[tuple[int, int]]:
         return self.coordinates
 
+    def get_bounds(self) -> np.ndarray:
+        """
+        Returns the cached (xmin, ymin, zmin, xmax, ymax, zmax) box of the object
+        """
+        return self._bounds.get(self.coordinates, self.obj_type, 2)
+
     def get_name(self) -> str:
         return self.name
 
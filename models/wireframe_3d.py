@@ -1,5 +1,17 @@
+import numpy as np
+
 from models.point_3d import Point3D
+from utils.bounds import CachedBounds
 from utils.types import ObjectType
+from utils.welding import weld
+from utils.transformations import (
+    create_translation_matrix_3d,
+    create_scale_matrix_3d,
+    create_rotation_matrix_3dx,
+    create_rotation_matrix_3dy,
+    create_rotation_matrix_3dz,
+    create_rotation_matrix_3d,
+)
 from PyQt6.QtGui import QColor
 
 
@@ -8,18 +20,50 @@ class Wireframe_3D:
         self,
         name: str,
         obj_type: ObjectType,
-        points: list[Point3D],
+        points: list[Point3D] | np.ndarray,
         edges: list[tuple[int, int]],
         fill: bool = False,
+        weld_epsilon: float | None = None,
     ):
         self.name: str = name
+        self._bounds = CachedBounds()
         self.obj_type: ObjectType = obj_type
-        self.points: list[Point3D] = points
         self.color: QColor = QColor("black")
         self.is_selected: bool = False
         self.fill: bool = fill
         self.edges: list[tuple[int, int]] = edges
 
+        # The vertices are kept in a compact (n, 3) array, the Point3D list is only built when requested
+        if isinstance(points, np.ndarray):
+            self.vertices: np.ndarray = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+            self._points: list[Point3D] | None = None
+        else:
+            self.vertices = np.array(
+                [point.get_xyz() for point in points], dtype=np.float64
+            ).reshape(-1, 3)
+            self._points = points
+
+        # Vertices and edges removed by the last weld
+        self.welded: tuple[int, int] = (0, 0)
+        if weld_epsilon is not None:
+            self.weld(weld_epsilon)
+
+    @property
+    def points(self) -> list[Point3D]:
+        if self._points is None:
+            self._points = [Point3D((x, y, z)) for x, y, z in self.vertices.tolist()]
+        return self._points
+
+    def weld(self, epsilon: float = 1e-6) -> tuple[int, int]:
+        """
+        Merges vertices closer than epsilon and removes duplicate or reversed edges.
+        Returns how many vertices and edges were removed.
+        """
+        self.vertices, self.edges, removed_vertices, removed_edges = weld(self.vertices, self.edges, epsilon)
+        self._points = None
+        self.welded = (removed_vertices, removed_edges)
+        return self.welded
+
     def set_fill(self, fill: bool) -> None:
         self.fill = fill
 
@@ -33,28 +77,36 @@ class Wireframe_3D:
         self.is_selected = False
 
     def translate(self, dx: float, dy: float, dz: float) -> None:
-        for point in self.points:
-            point.translate(dx, dy, dz)
+        T = create_translation_matrix_3d(dx, dy, dz)
+        self.transformation(op=T)
 
     def transform(self, sx: float, sy: float, sz: float) -> None:
-        for point in self.points:
-            point.transform(sx, sy, sz)
+        S = create_scale_matrix_3d(sx, sy, sz)
+        self.transformation(op=S)
 
     def rotate_x(self, angle: float) -> None:
-        for point in self.points:
-            point.rotate_x(angle)
+        Rx = create_rotation_matrix_3dx(angle)
+        self.transformation(op=Rx)
 
     def rotate_y(self, angle: float) -> None:
-        for point in self.points:
-            point.rotate_y(angle)
+        Ry = create_rotation_matrix_3dy(angle)
+        self.transformation(op=Ry)
 
     def rotate_z(self, angle: float) -> None:
-        for point in self.points:
-            point.rotate_z(angle)
+        Rz = create_rotation_matrix_3dz(angle)
+        self.transformation(op=Rz)
 
     def rotate(self, angle_x: float, angle_y: float, angle_z: float):
-        for point in self.points:
-            point.rotate(angle_x, angle_y, angle_z)
+        R = create_rotation_matrix_3d(angle_x, angle_y, angle_z)
+        self.transformation(op=R)
+
+    def transformation(self, obj=None, op=None) -> None:
+        """
+        Applies the operation matrix to all the vertices at once
+        """
+        homogeneous = np.hstack([self.vertices, np.ones((len(self.vertices), 1))])
+        self.vertices = (homogeneous @ op)[:, :3]
+        self._points = None
 
     def get_center_object_x(self) -> float:
         if not self.points:
@@ -84,6 +136,12 @@ class Wireframe_3D:
     def export_coordinates(self) -> list[Point3D]:
         return self.points
 
+    def get_bounds(self) -> np.ndarray:
+        """
+        Returns the cached (xmin, ymin, zmin, xmax, ymax, zmax) box of the object
+        """
+        return self._bounds.get(self.vertices, self.obj_type)
+
     def get_name(self) -> str:
         return self.name
 
@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+# The canvas is drawn without a display, and the modules are imported from the repository root
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    # The transformations still use np.matrix and float() of 1x1 matrices
+    config.addinivalue_line("filterwarnings", "ignore::PendingDeprecationWarning")
+    config.addinivalue_line("filterwarnings", "ignore:Conversion of an array with ndim:DeprecationWarning")
+
+
+@pytest.fixture(scope="session")
+def app():
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+class RecordingConsole():
+    """
+    Stands in for the console widget, keeping the logged messages
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    def log(self, message: str):
+        self.messages.append(message)
+
+
+@pytest.fixture
+def canvas(app):
+    """
+    A 640x480 canvas with no objects and no session journal
+    """
+    from ui.canvas import Canvas
+
+    canvas = Canvas(RecordingConsole(), None, load_examples=False)
+    canvas.resize(640, 480)
+    canvas.resizeEvent(None)
+    return canvas
+
+
+@pytest.fixture(autouse=True, scope="session")
+def tessellation_cache_directory(tmp_path_factory):
+    """
+    Keeps the tessellations of the tests out of the cache of the package
+    """
+    from utils.tessellation_cache import tessellation_cache
+
+    directory = tessellation_cache.directory
+    tessellation_cache.directory = str(tmp_path_factory.mktemp("tessellation_cache"))
+    yield
+    tessellation_cache.directory = directory
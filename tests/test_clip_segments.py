@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def perspective(canvas):
+    canvas.set_projection_mode("Perspective Projection")
+    return canvas
+
+
+def inside_viewport(canvas, segments: np.ndarray) -> bool:
+    xs, ys = segments[:, [0, 2]], segments[:, [1, 3]]
+    return bool(
+        (xs >= canvas.viewport_xmin - 1e-6).all() and (xs <= canvas.viewport_xmax + 1e-6).all()
+        and (ys >= canvas.viewport_ymin - 1e-6).all() and (ys <= canvas.viewport_ymax + 1e-6).all()
+    )
+
+
+def test_segment_in_front_is_projected_whole(perspective):
+    segments = perspective.clip_segments(np.array([[1.0, 1.0, 40.0]]), np.array([[2.0, 1.0, 60.0]]))
+    assert len(segments) == 1
+    assert perspective.clipped_segments == 0
+    assert inside_viewport(perspective, segments)
+
+
+def test_segment_crossing_the_near_plane_is_cut(perspective):
+    # From behind the center of projection to in front of it
+    starts = np.array([[-1.0, 0.5, -50.0]])
+    ends = np.array([[3.0, 0.5, 50.0]])
+    segments = perspective.clip_segments(starts, ends)
+    assert len(segments) == 1
+    assert perspective.clipped_segments == 1
+    assert np.isfinite(segments).all()
+    assert inside_viewport(perspective, segments)
+    # The part in front ends where the far end projects
+    whole = perspective.clip_segments(np.array([[2.9, 0.5, 49.0]]), ends)
+    np.testing.assert_allclose(segments[0, 2:], whole[0, 2:])
+
+
+def test_segments_behind_or_outside_are_culled(perspective):
+    starts = np.array([[0.0, 0.0, -20.0], [1.0, 1.0, 0.05], [1000.0, 0.0, 10.0], [0.0, 0.0, 20000.0]])
+    ends = np.array([[5.0, 5.0, -30.0], [2.0, 2.0, 0.01], [1000.0, 50.0, 10.0], [1.0, 0.0, 30000.0]])
+    segments = perspective.clip_segments(starts, ends)
+    assert segments.shape == (0, 4)
+    assert perspective.clipped_segments == 0
+
+
+def test_segments_leaving_the_window_are_cut_at_its_sides(perspective):
+    segments = perspective.clip_segments(np.array([[0.0, 0.0, 10.0]]), np.array([[1000.0, 0.0, 10.0]]))
+    assert perspective.clipped_segments == 1
+    assert segments[0, 2] == pytest.approx(perspective.viewport_xmax)
+
+
+def test_project_segments_has_no_side_effects(perspective):
+    starts = np.array([[-1.0, 0.5, -50.0], [1.0, 1.0, 40.0]])
+    ends = np.array([[3.0, 0.5, 50.0], [2.0, 1.0, 60.0]])
+    perspective.clipped_segments = 7
+    segments, clipped = perspective.project_segments(starts, ends)
+    assert clipped == 1 and len(segments) == 2
+    assert perspective.clipped_segments == 7
+    np.testing.assert_array_equal(perspective.clip_segments(starts, ends), segments)
+    assert perspective.clipped_segments == 1
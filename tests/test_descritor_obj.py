@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.descritorOBJ import DescritorOBJ, load_sidecar, parse_block, parse_obj_text, sidecar_path
+
+OBJ_TEXT = """o Line_Example
+v -5.000000 -5.000000 0.000000
+v 5.000000 5.000000 0.000000
+usemtl green
+l -2 -1
+
+o Square_Example
+v -5.000000 -5.000000 0.000000
+v 5.000000 -5.000000 0.000000
+v 5.000000 5.000000 5.000000
+v -5.000000 5.000000 5.000000
+usemtl aqua
+l 0 1
+l 1 2
+l 2 3
+l 3 0
+"""
+
+
+def test_parse_block_aligned_run():
+    values = parse_block("v 1 2 3\nv 4 5 6\nv -7.5 8e2 0.25\n", "v", 3)
+    assert values.flags.c_contiguous
+    np.testing.assert_array_equal(values, [[1, 2, 3], [4, 5, 6], [-7.5, 800, 0.25]])
+
+
+def test_parse_block_without_final_newline():
+    np.testing.assert_array_equal(parse_block("l 0 1\nl 1 2", "l", 2), [[0, 1], [1, 2]])
+
+
+@pytest.mark.parametrize(
+    "block, expected",
+    [
+        # "w" coordinates are ignored
+        ("v 1 2 3 1\nv 4 5 6 1\n", [[1, 2, 3], [4, 5, 6]]),
+        # Missing z is read as 0
+        ("v 1 2\nv 3 4\n", [[1, 2, 0], [3, 4, 0]]),
+        # As many values as an aligned run, misplaced across the lines
+        ("v 1 2\nv 3 4 5 6\n", [[1, 2, 0], [3, 4, 5]]),
+        ("v 1 2 3 4\nv 5 6\n", [[1, 2, 3], [5, 6, 0]]),
+        # Trailing comments
+        ("v 1 2 3 # first\nv 4 5 6\n", [[1, 2, 3], [4, 5, 6]]),
+    ],
+)
+def test_parse_block_irregular_runs_fall_back_to_each_line(block, expected):
+    np.testing.assert_array_equal(parse_block(block, "v", 3), expected)
+
+
+def test_parse_obj_text_records():
+    records = parse_obj_text(OBJ_TEXT)
+    assert [(name, type, color, is_3d) for name, type, _, _, color, is_3d in records] == [
+        ("Line_Example", "LINE", "green", False),
+        ("Square_Example", "POLYGON_3D", "aqua", True),
+    ]
+    np.testing.assert_array_equal(records[0][2], [[-5, -5, 0], [5, 5, 0]])
+    np.testing.assert_array_equal(records[1][3], [[0, 1], [1, 2], [2, 3], [3, 0]])
+    assert records[1][3].dtype == np.int32
+
+
+@pytest.fixture
+def obj_file(tmp_path):
+    path = tmp_path / "scene.obj"
+    path.write_text(OBJ_TEXT)
+    return str(path)
+
+
+def test_import_writes_a_sidecar_matching_the_parse(obj_file):
+    objects = DescritorOBJ().import_file(obj_file)
+    assert os.path.exists(sidecar_path(obj_file))
+
+    cached = load_sidecar(obj_file, os.stat(obj_file))
+    parsed = parse_obj_text(OBJ_TEXT)
+    assert [record[0] for record in cached] == [record[0] for record in parsed]
+    for cached_record, parsed_record in zip(cached, parsed):
+        np.testing.assert_array_equal(cached_record[2], parsed_record[2])
+        np.testing.assert_array_equal(cached_record[3], parsed_record[3])
+
+    again = DescritorOBJ().import_file(obj_file)
+    assert [obj.name for obj in again] == [obj.name for obj in objects]
+
+
+def test_sidecar_is_ignored_when_the_mtime_changes(obj_file):
+    DescritorOBJ().import_file(obj_file)
+    stat = os.stat(obj_file)
+    # Same size, different contents and modification time
+    with open(obj_file, "r+") as f:
+        f.write(OBJ_TEXT.replace("-5.000000 -5.000000 0.000000", "-6.000000 -6.000000 0.000000", 1))
+    os.utime(obj_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert os.stat(obj_file).st_size == stat.st_size
+
+    assert load_sidecar(obj_file, os.stat(obj_file)) is None
+    objects = DescritorOBJ().import_file(obj_file)
+    assert objects[0].coordinates[0] == (-6.0, -6.0)
+
+
+def test_sidecar_is_ignored_when_the_size_changes(obj_file):
+    DescritorOBJ().import_file(obj_file)
+    stat = os.stat(obj_file)
+    with open(obj_file, "a") as f:
+        f.write("\no Dot_Example\nv 1.000000 2.000000 0.000000\np -1\n")
+    # Same modification time, different size
+    os.utime(obj_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert load_sidecar(obj_file, os.stat(obj_file)) is None
+    objects = DescritorOBJ().import_file(obj_file)
+    assert [obj.name for obj in objects] == ["Line_Example", "Square_Example", "Dot_Example"]
+    # The new sidecar is valid for the new file
+    assert len(load_sidecar(obj_file, os.stat(obj_file))) == 3
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+from PyQt6.QtGui import QColor
+
+from models.point_3d import Point3D
+from models.surface_3d import Surface3D
+from models.wireframe import Wireframe
+from models.wireframe_3d import Wireframe_3D
+from utils.descritorScene import (
+    HEADER_DTYPE,
+    HEADER_V1_DTYPE,
+    HEADER_V2_DTYPE,
+    DescritorScene,
+    SceneArrays,
+    scene_record,
+)
+from utils.types import ObjectType
+
+
+def make_objects(count: int) -> list:
+    rng = np.random.default_rng(0)
+    objects = []
+    for i in range(count):
+        center = rng.uniform(-1000, 1000, 3)
+        if i % 3 == 0:
+            obj = Wireframe_3D(
+                f"prism {i}", ObjectType.POLYGON_3D, center + rng.uniform(-1, 1, (4, 3)),
+                np.array([[0, 1], [1, 2], [2, 3], [3, 0]]), False,
+            )
+        elif i % 3 == 1:
+            obj = Wireframe(f"polygon {i}", ObjectType.POLYGON, [(center[0], center[1]), (center[0] + 1, center[1]), (center[0], center[1] + 1)], True)
+        else:
+            control = [[Point3D((center[0] + x, center[1] + y, center[2])) for y in range(4)] for x in range(4)]
+            obj = Surface3D(f"surface {i}", ObjectType.SURFACE_BEZIER, control, 5, False)
+        obj.set_color(QColor.fromRgba(0xFF000000 | i))
+        objects.append(obj)
+    return objects
+
+
+def assert_same_objects(loaded: list, objects: list):
+    assert [obj.get_name() for obj in loaded] == [obj.get_name() for obj in objects]
+    for a, b in zip(loaded, objects):
+        record_a, record_b = scene_record(a), scene_record(b)
+        assert record_a[:4] == record_b[:4]
+        np.testing.assert_array_equal(record_a[4], record_b[4])
+        np.testing.assert_array_equal(record_a[5], record_b[5])
+        assert record_a[6:] == record_b[6:]
+
+
+def export(path, objects, objects_per_chunk: int = 256) -> str:
+    descritor = DescritorScene()
+    descritor.objs = objects
+    descritor.objects_per_chunk = objects_per_chunk
+    assert descritor.export_file(str(path))
+    return str(path)
+
+
+def downgrade(path: str, version: int) -> None:
+    """
+    Rewrites the header of a scene file as one of an older version. The sections stay
+    where they are, as their offsets are in the header.
+    """
+    data = bytearray(open(path, "rb").read())
+    header = np.frombuffer(bytes(data[:HEADER_DTYPE.itemsize]), dtype=HEADER_DTYPE)[0]
+    dtype = HEADER_V1_DTYPE if version == 1 else HEADER_V2_DTYPE
+    old = np.zeros(1, dtype=dtype)
+    for field in dtype.names:
+        old[field] = header[field]
+    old["version"] = version
+    data[:HEADER_DTYPE.itemsize] = old.tobytes().ljust(HEADER_DTYPE.itemsize, b"\0")
+    open(path, "wb").write(bytes(data))
+
+
+def test_round_trip_keeps_the_display_order(tmp_path):
+    objects = make_objects(600)
+    path = export(tmp_path / "scene.scene", objects, objects_per_chunk=32)
+
+    scene = SceneArrays(path)
+    assert len(scene.chunks) > 1
+    # The table is grouped by chunk, not in display order
+    assert [scene.get_name(i) for i in range(len(scene.table))] != [obj.get_name() for obj in objects]
+
+    assert_same_objects(DescritorScene().import_file(path), objects)
+
+
+def test_chunks_hold_every_object_once_in_display_order(tmp_path):
+    objects = make_objects(300)
+    path = export(tmp_path / "scene.scene", objects, objects_per_chunk=16)
+    scene = SceneArrays(path)
+    position = {obj.get_name(): i for i, obj in enumerate(objects)}
+
+    members = []
+    for chunk in range(len(scene.chunks)):
+        indices = scene.get_chunk_objects(chunk)
+        positions = [position[scene.get_name(i)] for i in indices]
+        assert positions == sorted(positions)
+        bounds = scene.bounds[indices]
+        assert (bounds[:, :3] >= scene.chunks[chunk]["bounds"][:3]).all()
+        assert (bounds[:, 3:] <= scene.chunks[chunk]["bounds"][3:]).all()
+        members.extend(indices)
+    assert sorted(members) == list(range(len(objects)))
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_older_versions_are_read_in_table_order(tmp_path, version):
+    # A single chunk, so the table is in display order as in files of these versions
+    objects = make_objects(60)
+    path = export(tmp_path / "scene.scene", objects)
+    downgrade(path, version)
+
+    scene = SceneArrays(path)
+    assert len(scene.chunks) == 1
+    assert list(scene.get_chunk_range(0)) == list(range(len(objects)))
+    np.testing.assert_array_equal(scene.order, np.arange(len(objects)))
+    assert_same_objects(DescritorScene().import_file(path), objects)
+
+
+def test_version_1_bounds_are_computed_from_the_vertices(tmp_path):
+    objects = make_objects(30)
+    path = export(tmp_path / "scene.scene", objects)
+    expected = SceneArrays(path).bounds.copy()
+    downgrade(path, 1)
+    np.testing.assert_allclose(SceneArrays(path).bounds, expected)
+
+
+def test_unknown_files_are_rejected(tmp_path):
+    path = tmp_path / "other.scene"
+    path.write_bytes(b"\0" * HEADER_DTYPE.itemsize)
+    with pytest.raises(ValueError):
+        SceneArrays(str(path))
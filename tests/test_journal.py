@@ -0,0 +1,112 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from models.wireframe import Wireframe
+from models.wireframe_3d import Wireframe_3D
+from utils.descritorScene import scene_record
+from utils.journal import Journal, load_session, unrecovered_sessions
+from utils.types import ObjectType
+
+from conftest import RecordingConsole
+
+
+def large_prism(name: str) -> Wireframe_3D:
+    vertices = np.random.default_rng(0).uniform(-10, 10, (600, 3))
+    edges = np.column_stack([np.arange(599), np.arange(1, 600)])
+    return Wireframe_3D(name, ObjectType.POLYGON_3D, vertices, edges, False)
+
+
+def crash(journal: Journal) -> None:
+    """
+    Leaves a session as a killed process would: not closed and no longer locked
+    """
+    journal.file.close()
+    journal.lock_file.close()
+    journal.file = journal.lock_file = None
+
+
+def wait_for_snapshot(journal: Journal) -> None:
+    deadline = time.monotonic() + 30
+    while journal.compacting and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not journal.compacting
+
+
+def test_the_session_is_created_with_the_first_change(tmp_path):
+    journal = Journal(str(tmp_path))
+    assert not os.path.exists(journal.directory)
+    journal.record_remove("nothing")
+    assert os.path.exists(Journal.journal_path(journal.directory))
+    journal.close()
+
+
+def test_replay_entries_and_blobs(tmp_path):
+    journal = Journal(str(tmp_path))
+    journal.record_add(Wireframe("line", ObjectType.LINE, [(0, 0), (1, 1)]))
+    prism = large_prism("prism")
+    journal.record_add(prism)
+    journal.record_transform("prism", "translate_objects", (1, 2, 3))
+    journal.save()
+
+    objects, entries, stream = load_session(journal.directory)
+    assert objects == [] and stream is None
+    assert [entry["op"] for entry in entries] == ["add", "add", "transform"]
+    assert entries[0]["vertices"] == [[0, 0, 0], [1, 1, 0]]
+    # The large object went to a blob, read back with the entry
+    assert "blob" in entries[1]
+    np.testing.assert_array_equal(entries[1]["vertices"], prism.vertices)
+    np.testing.assert_array_equal(entries[1]["edges"], prism.edges)
+    journal.close()
+
+
+def test_compaction_keeps_only_the_later_entries(tmp_path):
+    journal = Journal(str(tmp_path))
+    line = Wireframe("line", ObjectType.LINE, [(0, 0), (1, 1)])
+    prism = large_prism("prism")
+    journal.record_add(line)
+    journal.record_add(prism)
+    journal.compact([line, prism]).join()
+    journal.record_remove("line")
+
+    objects, entries, _ = load_session(journal.directory)
+    assert [obj.get_name() for obj in objects] == ["line", "prism"]
+    np.testing.assert_array_equal(scene_record(objects[1])[4], prism.vertices)
+    assert [entry["op"] for entry in entries] == ["remove"]
+    # The blob is in the snapshot now
+    assert os.listdir(os.path.join(journal.directory, "blobs")) == []
+    journal.close()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_crashed_session_is_recovered(app, tmp_path, compact):
+    from ui.canvas import Canvas
+
+    root = str(tmp_path)
+    canvas = Canvas(RecordingConsole(), root, load_examples=False)
+    canvas.add_object(Wireframe("line", ObjectType.LINE, [(0, 0), (1, 1)]))
+    canvas.add_object(Wireframe("triangle", ObjectType.POLYGON, [(0, 0), (4, 0), (0, 4)], True))
+    canvas.add_object(large_prism("prism"))
+    if compact:
+        canvas.journal.compact(canvas.objects).join()
+    canvas.translate_objects(canvas.find_object("triangle"), 5, -5)
+    canvas.remove_object("line")
+    expected = [scene_record(obj) for obj in canvas.objects]
+    canvas.save_session()
+    crash(canvas.journal)
+
+    console = RecordingConsole()
+    recovered = Canvas(console, root, load_examples=False)
+    assert any("Recover Session" in message for message in console.messages)
+    assert len(unrecovered_sessions(root)) == 1
+    recovered.recover_session()
+    records = [scene_record(obj) for obj in recovered.objects]
+    assert [record[0] for record in records] == [record[0] for record in expected]
+    for record, expected_record in zip(records, expected):
+        np.testing.assert_allclose(record[4], expected_record[4])
+
+    wait_for_snapshot(recovered.journal)
+    assert unrecovered_sessions(root) == []
+    recovered.close_session()
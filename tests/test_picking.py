@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from PyQt6.QtCore import QRectF
+
+from models.wireframe import Wireframe
+from models.wireframe_3d import Wireframe_3D
+from utils.types import ObjectType
+
+
+@pytest.fixture
+def scene(canvas):
+    objects = {
+        "line": Wireframe("line", ObjectType.LINE, [(-8, -8), (-2, -2)]),
+        "triangle": Wireframe("triangle", ObjectType.POLYGON, [(2, 2), (8, 2), (2, 8)], True),
+        "outline": Wireframe("outline", ObjectType.POLYGON, [(2, -8), (8, -8), (8, -2), (2, -2)]),
+        "dot": Wireframe("dot", ObjectType.DOT, [(-5, 5)]),
+        "prism": Wireframe_3D(
+            "prism", ObjectType.POLYGON_3D, np.array([[-9.0, 9, 0], [-7, 9, 0], [-7, 7, 0]]), np.array([[0, 1], [1, 2]]), False
+        ),
+    }
+    canvas.add_objects(list(objects.values()))
+    return canvas, objects
+
+
+def viewport(canvas, x, y):
+    return canvas.transform_coords(x, y)
+
+
+def test_pick_the_object_under_the_point(scene):
+    canvas, objects = scene
+    assert canvas.pick(*viewport(canvas, -5, -5)) is objects["line"]
+    assert canvas.pick(*viewport(canvas, -8, 9)) is objects["prism"]
+    # Filled polygons are picked anywhere inside, outlines only near their edges
+    assert canvas.pick(*viewport(canvas, 3, 3)) is objects["triangle"]
+    assert canvas.pick(*viewport(canvas, 5, -5)) is None
+    assert canvas.pick(*viewport(canvas, 5, -8)) is objects["outline"]
+
+
+def test_pick_tolerance(scene):
+    canvas, objects = scene
+    vx, vy = viewport(canvas, -5, -5)
+    # The line runs diagonally, so a point moved along x is at dx / sqrt(2) from it
+    assert canvas.pick(vx + canvas.pick_tolerance, vy) is objects["line"]
+    assert canvas.pick(vx + 2 * canvas.pick_tolerance, vy) is None
+    # Dots are drawn as circles of radius 3
+    vx, vy = viewport(canvas, -5, 5)
+    assert canvas.pick(vx + 3 + canvas.pick_tolerance, vy) is objects["dot"]
+    assert canvas.pick(vx + 4 + canvas.pick_tolerance, vy) is None
+
+
+def test_pick_prefers_the_object_drawn_last(scene):
+    canvas, objects = scene
+    above = Wireframe("above", ObjectType.LINE, [(-8, -8), (-2, -2)])
+    canvas.add_object(above)
+    assert canvas.pick(*viewport(canvas, -5, -5)) is above
+    canvas.remove_object("above")
+    assert canvas.pick(*viewport(canvas, -5, -5)) is objects["line"]
+
+
+def test_pick_follows_transformations(scene):
+    canvas, objects = scene
+    canvas.translate_objects(objects["line"], 20, 0)
+    assert canvas.pick(*viewport(canvas, -5, -5)) is None
+    canvas.translate_objects(objects["line"], -20, 0)
+    assert canvas.pick(*viewport(canvas, -5, -5)) is objects["line"]
+
+
+def test_pick_in_perspective(scene):
+    canvas, objects = scene
+    canvas.set_projection_mode("Perspective Projection")
+    deep = Wireframe_3D(
+        "deep", ObjectType.POLYGON_3D, np.array([[1.0, 1, 20], [3, 1, 40], [3, 3, 60]]), np.array([[0, 1], [1, 2]]), False
+    )
+    canvas.add_object(deep)
+    # Picking must agree with what is drawn in perspective
+    segments = canvas.clip_segments(deep.vertices[[0, 1]], deep.vertices[[1, 2]])
+    assert len(segments) == 2
+    for x1, y1, x2, y2 in segments:
+        assert canvas.pick((x1 + x2) / 2, (y1 + y2) / 2) is deep
+
+
+def test_pick_does_not_count_clipped_segments(scene):
+    canvas, _ = scene
+    canvas.set_projection_mode("Perspective Projection")
+    canvas.clipped_segments = 5
+    for x in range(-10, 11, 2):
+        canvas.pick(*viewport(canvas, x, x))
+    assert canvas.clipped_segments == 5
+
+
+def rect(canvas, x1, y1, x2, y2) -> QRectF:
+    vx1, vy1 = viewport(canvas, x1, y1)
+    vx2, vy2 = viewport(canvas, x2, y2)
+    return QRectF(min(vx1, vx2), min(vy1, vy2), abs(vx2 - vx1), abs(vy2 - vy1))
+
+
+def test_pick_rect_returns_the_objects_entirely_inside(scene):
+    canvas, objects = scene
+    assert canvas.pick_rect(rect(canvas, -9, -9, -1, -1)) == [objects["line"]]
+    # Only part of the line
+    assert canvas.pick_rect(rect(canvas, -9, -9, -4, -4)) == []
+    everything = canvas.pick_rect(rect(canvas, -9.9, -9.9, 9.9, 9.9))
+    assert everything == [objects[name] for name in ("line", "triangle", "outline", "dot", "prism")]
+    assert canvas.pick_rect(rect(canvas, 1, 1, 9, 9)) == [objects["triangle"]]
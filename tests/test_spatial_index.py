@@ -0,0 +1,125 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.picking import point_segment_distance
+from utils.spatial_index import SpatialIndex
+
+
+def random_boxes(count: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    low = rng.uniform(-500, 500, (count, 3))
+    size = rng.exponential(20, (count, 3))
+    return np.hstack([low, low + size])
+
+
+def brute_force_query(boxes: dict, xmin, ymin, xmax, ymax) -> set:
+    return {
+        key for key, box in boxes.items()
+        if box[0] <= xmax and box[3] >= xmin and box[1] <= ymax and box[4] >= ymin
+    }
+
+
+def box_distance(box, x, y) -> float:
+    return math.hypot(max(box[0] - x, 0, x - box[3]), max(box[1] - y, 0, y - box[4]))
+
+
+def test_query_returns_the_overlapping_keys_in_insertion_order():
+    index = SpatialIndex(cell_size=16)
+    boxes = {f"box {i}": box for i, box in enumerate(random_boxes(400))}
+    for key, box in boxes.items():
+        index.insert(key, box)
+
+    rng = np.random.default_rng(1)
+    for _ in range(100):
+        x, y = rng.uniform(-550, 550, 2)
+        w, h = rng.exponential(60, 2)
+        found = index.query(x, y, x + w, y + h)
+        assert set(found) == brute_force_query(boxes, x, y, x + w, y + h)
+        assert found == sorted(found, key=lambda key: int(key.split()[1]))
+
+
+def test_remove_and_move():
+    index = SpatialIndex(cell_size=10)
+    index.insert("a", [0, 0, 0, 5, 5, 0])
+    index.insert("b", [20, 20, 0, 25, 25, 0])
+    assert index.query(0, 0, 30, 30) == ["a", "b"]
+
+    index.remove("a")
+    assert "a" not in index and len(index) == 1
+    assert index.query(0, 0, 10, 10) == []
+    # No empty cells are left behind
+    assert all(index.cells.values())
+
+    # Moving keeps the insertion order
+    index.insert("c", [100, 100, 0, 101, 101, 0])
+    index.insert("b", [100, 100, 0, 102, 102, 0])
+    assert index.query(90, 90, 110, 110) == ["b", "c"]
+    assert index.query(20, 20, 25, 25) == []
+    index.remove("missing")
+
+
+def test_large_and_unbounded_boxes_are_always_candidates():
+    index = SpatialIndex(cell_size=1, max_cells=16)
+    index.insert("large", [-1000, -1000, 0, 1000, 1000, 0])
+    index.insert("unbounded", [math.nan, 0, 0, 1, 1, 0])
+    index.insert("small", [0, 0, 0, 0.5, 0.5, 0])
+    assert index.large == {"large", "unbounded"}
+    assert index.query(0, 0, 1, 1) == ["large", "unbounded", "small"]
+    assert index.query(5000, 5000, 5001, 5001) == ["unbounded"]
+
+
+def test_insert_many_matches_insert():
+    boxes = random_boxes(300)
+    boxes[::50] = [-math.inf, -math.inf, -math.inf, math.inf, math.inf, math.inf]
+    one_by_one = SpatialIndex(cell_size=8, max_cells=64)
+    for i, box in enumerate(boxes):
+        one_by_one.insert(i, box)
+    bulk = SpatialIndex(cell_size=8, max_cells=64)
+    bulk.insert_many(list(range(len(boxes))), boxes)
+
+    assert bulk.cells == one_by_one.cells
+    assert bulk.large == one_by_one.large
+    assert bulk.sequence == one_by_one.sequence
+    assert (bulk.zmin, bulk.zmax) == (one_by_one.zmin, one_by_one.zmax)
+
+
+@pytest.mark.parametrize("max_distance", [math.inf, 15.0])
+def test_nearest_matches_brute_force(max_distance):
+    boxes = random_boxes(300, seed=2)
+    index = SpatialIndex(cell_size=16)
+    index.insert_many(list(range(len(boxes))), boxes)
+    for key in range(0, 300, 7):
+        index.remove(key)
+    remaining = {key: boxes[key] for key in index.entries}
+
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        x, y = rng.uniform(-600, 600, 2)
+        distances = {key: box_distance(box, x, y) for key, box in remaining.items()}
+        best = min(distances.values())
+        found = index.nearest((x, y), max_distance)
+        if best > max_distance:
+            assert found is None
+        else:
+            assert found[0] == pytest.approx(best)
+            # Ties go to the latest inserted key
+            assert found[1] == max(key for key, distance in distances.items() if distance == found[0])
+
+
+def test_nearest_refines_the_box_distance():
+    index = SpatialIndex(cell_size=10)
+    # A segment from (0, 0) to (100, 100), whose box holds the query point, and a dot
+    index.insert("diagonal", [0, 0, 0, 100, 100, 0])
+    index.insert("dot", [60, 40, 0, 60, 40, 0])
+    segments = {"diagonal": np.array([[0.0, 0.0, 100.0, 100.0]]), "dot": np.array([[60.0, 40.0, 60.0, 40.0]])}
+
+    def distance(key):
+        return float(point_segment_distance(70, 30, segments[key]).min())
+
+    assert index.nearest((70, 30))[1] == "diagonal"
+    found = index.nearest((70, 30), distance=distance)
+    assert found == (pytest.approx(math.hypot(10, 10)), "dot")
+    assert index.nearest((70, 30), 10.0, distance=distance) is None
+    assert SpatialIndex().nearest((0, 0)) is None
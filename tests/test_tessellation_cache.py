@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+
+from models.point_3d import Point3D
+from models.surface_3d import Surface3D
+from utils.tessellation_cache import TessellationCache, grid_edges, tessellation_cache
+from utils.types import ObjectType
+
+CONTROL = np.arange(48, dtype=np.float64).reshape(4, 4, 3)
+
+
+def test_key_is_stable():
+    # Pinned, so a change of the key format is noticed: it would orphan every cached file
+    assert TessellationCache.key(9, CONTROL, 10) == "2e6bc0979050b41e365351e519dcb4fa22ca07c9def30cb76317da94bc8d7758"
+
+
+def test_key_depends_only_on_the_values():
+    key = TessellationCache.key(9, CONTROL, 10)
+    assert TessellationCache.key(9, CONTROL.astype(np.int64), 10) == key
+    assert TessellationCache.key(9, CONTROL.tolist(), 10) == key
+    assert TessellationCache.key(9, np.asfortranarray(CONTROL), 10) == key
+    assert TessellationCache.key(9, np.ascontiguousarray(CONTROL[::-1])[::-1], 10) == key
+    assert TessellationCache.key(9, CONTROL.astype(">f8"), 10) == key
+
+
+def test_key_changes_with_the_definition():
+    key = TessellationCache.key(9, CONTROL, 10)
+    assert TessellationCache.key(10, CONTROL, 10) != key
+    assert TessellationCache.key(9, CONTROL, 11) != key
+    assert TessellationCache.key(9, CONTROL.reshape(2, 8, 3), 10) != key
+    moved = CONTROL.copy()
+    moved[2, 1, 0] += 1e-9
+    assert TessellationCache.key(9, moved, 10) != key
+
+
+def test_store_and_load(tmp_path):
+    cache = TessellationCache(str(tmp_path))
+    key = TessellationCache.key(9, CONTROL, 3)
+    vertices = np.random.default_rng(0).uniform(size=(9, 3))
+    assert cache.load(key) is None and cache.misses == 1
+
+    cache.store(key, vertices, grid_edges(3, 3), (3, 3))
+    loaded_vertices, loaded_edges, shape = cache.load(key)
+    np.testing.assert_array_equal(loaded_vertices, vertices)
+    np.testing.assert_array_equal(loaded_edges, grid_edges(3, 3))
+    assert shape == (3, 3) and cache.hits == 1
+
+    # A damaged file is a miss
+    with open(cache.path(key), "wb") as f:
+        f.write(b"not a zip file")
+    assert cache.load(key) is None
+
+
+def test_equal_surfaces_share_the_cached_mesh():
+    control = [[Point3D((float(x), float(y), float(x * y))) for y in range(4)] for x in range(4)]
+    first = Surface3D("first", ObjectType.SURFACE_BEZIER, control, 6, False)
+    hits = tessellation_cache.hits
+    second = Surface3D("second", ObjectType.SURFACE_BEZIER, [row[:] for row in control], 6, False)
+    assert tessellation_cache.hits == hits + 1
+    np.testing.assert_array_equal(second.mesh_vertices, first.mesh_vertices)
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    vertices = np.zeros((100, 3))
+    edges = np.zeros((10, 2), dtype=np.int32)
+    probe = TessellationCache(str(tmp_path / "probe"))
+    probe.store("00", vertices, edges, (10, 10))
+    file_size = os.path.getsize(probe.path("00"))
+
+    cache = TessellationCache(str(tmp_path / "cache"), max_size=3 * file_size)
+    keys = [TessellationCache.key(9, CONTROL + i, 4) for i in range(5)]
+    for age, key in enumerate(keys[:3]):
+        cache.store(key, vertices, edges, (10, 10))
+        os.utime(cache.path(key), (age, age))
+    # Reading the oldest one makes it the most recently used
+    assert cache.load(keys[0]) is not None
+
+    cache.store(keys[3], vertices, edges, (10, 10))
+    cache.store(keys[4], vertices, edges, (10, 10))
+    assert [os.path.exists(cache.path(key)) for key in keys] == [True, False, False, True, True]
+    assert cache.size == 3 * file_size
+
+
+def test_default_directory_is_next_to_the_package():
+    package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert TessellationCache().directory == os.path.join(package, "files", "tessellation_cache")
@@ -0,0 +1,63 @@
+import threading
+
+import numpy as np
+import pytest
+from PyQt6.QtGui import QImage
+
+from ui.tile_renderer import render_snapshot_tiles, render_tiles
+
+WIDTH, HEIGHT = 640, 480
+
+
+def pixels(image: QImage) -> np.ndarray:
+    image = image.convertToFormat(QImage.Format.Format_RGBA8888)
+    data = np.frombuffer(image.constBits().asstring(image.sizeInBytes()), dtype=np.uint8)
+    return data.reshape(image.height(), -1, 4)[:, :image.width()].astype(np.int64)
+
+
+@pytest.fixture
+def examples(canvas):
+    canvas.load_example_objects()
+    return canvas
+
+
+@pytest.mark.parametrize("projection", ["Parallel Projection", "Perspective Projection"])
+@pytest.mark.parametrize("tile_size", [100, 256])
+def test_tiles_match_a_single_pass_render(examples, projection, tile_size):
+    examples.set_projection_mode(projection)
+    # Filled polygons are cut again at every tile, which moves their antialiased edges slightly
+    for obj in [obj for obj in examples.objects if obj.fill]:
+        examples.remove_object(obj.name)
+
+    single = pixels(examples.snapshot().render())
+    tiled = pixels(render_tiles(examples, WIDTH, HEIGHT, tile_size, processes=1))
+    np.testing.assert_array_equal(tiled, single)
+
+
+def test_filled_polygons_differ_only_in_their_antialiasing(examples):
+    single = pixels(examples.snapshot().render())
+    tiled = pixels(render_tiles(examples, WIDTH, HEIGHT, 100, processes=1))
+    difference = np.abs(tiled - single).max(axis=2)
+    assert difference.max() <= 8
+    assert np.count_nonzero(difference) < 0.01 * WIDTH * HEIGHT
+
+
+def test_worker_processes_draw_the_same_image(examples):
+    one = pixels(render_tiles(examples, WIDTH, HEIGHT, 200, processes=1))
+    two = pixels(render_tiles(examples, WIDTH, HEIGHT, 200, processes=2))
+    np.testing.assert_array_equal(two, one)
+
+
+def test_progress_and_cancel(examples):
+    reported = []
+    image = render_snapshot_tiles(examples.snapshot(), WIDTH, HEIGHT, 160, 1, lambda done, total: reported.append((done, total)))
+    assert image.size().width() == WIDTH
+    assert reported == [(done, reported[-1][1]) for done in range(1, reported[-1][1] + 1)]
+
+    cancel = threading.Event()
+
+    def progress(done, total):
+        if done == 2:
+            cancel.set()
+
+    assert render_snapshot_tiles(examples.snapshot(), WIDTH, HEIGHT, 160, 1, progress, cancel) is None
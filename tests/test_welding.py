@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from utils.welding import close_pairs, weld
+
+
+def brute_force_labels(vertices: np.ndarray, epsilon: float) -> np.ndarray:
+    """
+    Lowest index of the group of each vertex, joining every pair at most epsilon apart
+    """
+    labels = np.arange(len(vertices))
+    distances = np.linalg.norm(vertices[:, None] - vertices[None], axis=2)
+    changed = True
+    while changed:
+        changed = False
+        for i, j in zip(*np.nonzero(distances <= epsilon)):
+            low = min(labels[i], labels[j])
+            if labels[i] != low or labels[j] != low:
+                labels[i] = labels[j] = low
+                changed = True
+    return labels
+
+
+def test_vertices_across_a_cell_boundary_are_welded():
+    epsilon = 0.1
+    # Each pair straddles a boundary of the epsilon grid on one or more axes
+    vertices = np.array(
+        [
+            [0.1 - 1e-9, 0.0, 0.0],
+            [0.1 + 1e-9, 0.0, 0.0],
+            [1.0, 1.0 - 1e-9, 1.0 - 1e-9],
+            [1.0, 1.0 + 1e-9, 1.0 + 1e-9],
+            [-0.2 + 1e-9, -0.2 + 1e-9, -0.2 + 1e-9],
+            [-0.2 - 1e-9, -0.2 - 1e-9, -0.2 - 1e-9],
+        ]
+    )
+    welded, _, removed, _ = weld(vertices, np.zeros((0, 2)), epsilon)
+    assert removed == 3
+    np.testing.assert_array_equal(welded, vertices[[0, 2, 4]])
+
+
+def test_vertices_farther_than_epsilon_in_neighbouring_cells_are_kept():
+    epsilon = 0.1
+    # Neighbouring cells, but only the last two vertices are close enough
+    vertices = np.array([[0.0, 0.0, 0.0], [0.15, 0.0, 0.0], [0.15, 0.05, 0.0]])
+    i, j = close_pairs(vertices, epsilon)
+    assert {tuple(sorted(pair)) for pair in zip(i.tolist(), j.tolist())} == {(1, 2)}
+    welded, _, removed, _ = weld(vertices, np.zeros((0, 2)), epsilon)
+    assert removed == 1
+    np.testing.assert_array_equal(welded, vertices[:2])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_weld_matches_brute_force_near_boundaries(seed):
+    epsilon = 0.25
+    rng = np.random.default_rng(seed)
+    # Points crowded around the grid lines, where the neighbour cells matter most
+    boundaries = rng.integers(-4, 4, (300, 3)) * epsilon
+    vertices = boundaries + rng.normal(0, epsilon / 3, (300, 3))
+    edges = rng.integers(0, len(vertices), (400, 2))
+
+    welded, welded_edges, removed, removed_edges = weld(vertices, edges, epsilon)
+
+    labels = brute_force_labels(vertices, epsilon)
+    first = np.unique(labels)
+    np.testing.assert_array_equal(welded, vertices[first])
+    assert removed == len(vertices) - len(first)
+
+    rank = np.searchsorted(first, labels)
+    expected_edges = []
+    for a, b in np.sort(rank[edges], axis=1).tolist():
+        if a != b and (a, b) not in expected_edges:
+            expected_edges.append((a, b))
+    assert welded_edges.tolist() == [list(edge) for edge in expected_edges]
+    assert removed_edges == len(edges) - len(expected_edges)
+
+
+def test_epsilon_zero_merges_only_identical_vertices():
+    vertices = np.array([[0.0, 0.0, 0.0], [1e-12, 0.0, 0.0], [0.0, 0.0, 0.0]])
+    edges = np.array([[0, 1], [1, 2], [2, 0]])
+    welded, welded_edges, removed, removed_edges = weld(vertices, edges, 0)
+    assert removed == 1 and removed_edges == 2
+    np.testing.assert_array_equal(welded, vertices[:2])
+    assert welded_edges.tolist() == [[0, 1]]
@@ -1,8 +1,11 @@
 import numpy as np
-from PyQt6.QtCore import QPointF, Qt
-from PyQt6.QtGui import QPainter, QPen, QColor, QPalette
+from PyQt6.QtCore import QLine, QPointF, QRectF, Qt, QThreadPool, QTimer, pyqtSignal
+from PyQt6.QtGui import QBrush, QImage, QPainter, QPen, QColor, QPalette
 from PyQt6.QtWidgets import QWidget
+import copy
 import math
+import os
+import time
 
 from models.window import Window
 from models.wireframe import Wireframe
@@ -10,7 +13,27 @@ from models.wireframe_3d import Wireframe_3D
 from models.point_3d import Point3D
 from models.surface_3d import Surface3D
 from models.surface_BSpline import SurfaceBSplineFD
+from ui.performance_hud import PerformanceHud
+from ui.render_task import RenderTask
+from utils.bounds import FLAT_TYPES
 from utils.descritorOBJ import DescritorOBJ
+from utils.descritorScene import DescritorScene, create_scene_object
+from utils.frame_stats import FrameStats
+from utils.geometry_store import geometry_store
+from utils.journal import (
+    Journal,
+    JOURNALED_METHODS,
+    SESSION_ROOT,
+    journaled,
+    load_session,
+    mark_session,
+    unrecovered_sessions,
+)
+from utils.picking import point_in_polygon, point_segment_distance
+from utils.profiler import profiler
+from utils.scene_stream import SceneStream
+from utils.spatial_index import SpatialIndex
+from utils.tessellation_service import tessellation_service
 from utils.transformations import (
     create_bezier_matrix,
     forward_differences_matrix,
@@ -20,10 +43,22 @@ from utils.types import ObjectType
 
 
 class Canvas(QWidget):
-    def __init__(self, console):
+    # Emitted when streamed chunks add or remove objects of the display file
+    objects_changed = pyqtSignal()
+    # Emitted with the names of the selected objects when they are picked on the canvas
+    selection_changed = pyqtSignal(list)
+
+    def __init__(self, console, session_root: str | None = SESSION_ROOT, load_examples: bool = True):
         super().__init__()
         self.console = console
         self.descritor = DescritorOBJ()
+        self.scene_descritor = DescritorScene()
+
+        # Change journal of the display file, used for incremental saves and crash recovery
+        self.journal: Journal | None = Journal(session_root) if session_root else None
+        self.journal_depth = 0
+        # Journal entry of the import in progress, whose objects are not journaled one by one
+        self.import_seq: int | None = None
         self.setAutoFillBackground(True)
 
         # Set background color
@@ -36,6 +71,9 @@ class Canvas(QWidget):
         # List to store all wireframe objects (display file)
         self.objects: List[Wireframe|Wireframe_3D|Surface3D] = []
 
+        # Grid over the object bounds, used for visibility and hit tests
+        self.spatial_index = SpatialIndex()
+
         # Window and viewport setup
         self.window: Window = Window()
         self.border_width: int = 50
@@ -47,8 +85,50 @@ class Canvas(QWidget):
         self.step = 1.0  # Step size for panning
         self.zoom_factor = 1.2  # Zoom factor
 
+        # Progressive rendering: bounding boxes are drawn first, then the objects are drawn
+        # into a backbuffer in slices of frame_budget milliseconds between events
+        self.progressive = False
+        self.frame_budget = 30.0
+        self.frame_dirty = True
+        self.backbuffer: QImage | None = None
+        self.frame_items: list = []
+        self.frame_inside: list = []
+        self.frame_rects = np.zeros((0, 4))
+        # Visible objects of the last frame with their projected bounds, see screen_bounds,
+        # and the index over them used by pick, see screen_index
+        self.frame_bounds: tuple | None = None
+        self.frame_screen_index: SpatialIndex | None = None
+        self.frame_next = 0
+        self.frame_brush = QBrush()
+        self.refine_timer = QTimer(self)
+        self.refine_timer.setSingleShot(True)
+        self.refine_timer.setInterval(0)
+        self.refine_timer.timeout.connect(self.refine_frame)
+
+        # Background rendering: frames are drawn from snapshots on a worker thread
+        # and paintEvent shows the last completed one
+        self.threaded = False
+        self.render_pool = QThreadPool(self)
+        self.render_pool.setMaxThreadCount(1)
+        self.render_task: RenderTask | None = None
+        self.render_frame = 0
+        self.frame_image: QImage | None = None
+
+        # Surfaces tessellated on worker processes are picked up by this timer
+        self.tessellation_timer = QTimer(self)
+        self.tessellation_timer.setInterval(30)
+        self.tessellation_timer.timeout.connect(self.collect_tessellations)
+
         # Loads the example objects for better utilization of the software
-        self.load_example_objects()
+        if load_examples:
+            # Journaled as a single entry, written with the first change the user makes
+            journal, self.journal = self.journal, None
+            self.load_example_objects()
+            self.journal = journal
+            if journal is not None:
+                journal.start_entries.append({"op": "examples"})
+        if session_root and unrecovered_sessions(session_root):
+            self.console.log('A previous session was not closed; "Recover Session" restores it')
 
         # Setting the line clipping Algorithm
         self.line_clipping_algorithm = "Cohen-Sutherland"
@@ -59,9 +139,34 @@ class Canvas(QWidget):
         # setting the projection view
         self.projection = "Parallel Projection"
 
+        # Depth of the near and far clipping planes of the perspective projection
+        self.near_plane = 0.1
+        self.far_plane = 10000.0
+        # Segments of the last clip_segments call cut by a plane, counted by the frame statistics
+        self.clipped_segments = 0
+
         # Show the curves control points
         self.show_control_points = False
 
+        # Set while drawing an object whose bounds are entirely inside the window
+        self.trivially_accepted = False
+
+        # Streamed scene file, loaded around the window extent plus a margin (fraction of its size)
+        self.scene_stream: SceneStream | None = None
+        self.stream_margin = 0.25
+
+        # Per-stage timing of the frames drawn by paintEvent
+        self.frame_stats = FrameStats()
+        # Overlay with the frame statistics, drawn over the finished frame
+        self.hud = PerformanceHud()
+        # Profiler runs already reported on the console
+        self.profiles_logged = 0
+
+        # Mouse picking: distance in pixels for a click to hit an object, and the drag in progress
+        self.pick_tolerance = 4
+        self.drag_start: QPointF | None = None
+        self.selection_rect: QRectF | None = None
+
     def add_object(self, wireframe: Wireframe):
         """
         Add a new object to the canvas
@@ -72,10 +177,35 @@ class Canvas(QWidget):
                 raise ValueError
 
             self.objects.append(wireframe)
+            self.spatial_index.insert(wireframe, wireframe.get_bounds())
+            if self.journal is not None:
+                self.journal.record_add(wireframe)
+                self.check_journal()
             self.update()
         except ValueError:
             self.console.log(f"Object {wireframe.name} already exists")
 
+    def add_objects(self, objects: list, record: bool = True) -> list:
+        """
+        Adds a batch of objects with a single repaint, returning the ones that were added.
+        Objects of an import are added with record=False, as the import is journaled by file.
+        """
+        names = {obj.name for obj in self.objects}
+        added = []
+        for obj in objects:
+            if obj.name in names:
+                self.console.log(f"Object {obj.name} already exists")
+                continue
+            names.add(obj.name)
+            self.objects.append(obj)
+            self.spatial_index.insert(obj, obj.get_bounds())
+            added.append(obj)
+            if record and self.journal is not None:
+                self.journal.record_add(obj)
+        self.check_journal()
+        self.update()
+        return added
+
     def load_example_objects(self):
         """
         Preset objects to show this project funcionalities
@@ -232,7 +362,16 @@ class Canvas(QWidget):
         Removes the selected objects from the canvas
         """
 
+        for obj in self.objects:
+            if obj.name == name:
+                self.spatial_index.remove(obj)
+                geometry_store.release(obj)
         self.objects = [obj for obj in self.objects if obj.name != name]
+        if self.scene_stream is not None:
+            self.scene_stream.discard(name)
+        if self.journal is not None:
+            self.journal.record_remove(name)
+            self.check_journal()
         self.update()
 
     def clear(self):
@@ -240,9 +379,167 @@ class Canvas(QWidget):
         Removes all objects from the canvas
         """
 
+        for obj in self.objects:
+            geometry_store.release(obj)
         self.objects.clear()
+        self.spatial_index.clear()
+        self.scene_stream = None
+        if self.journal is not None:
+            self.journal.record_clear()
+        self.update()
+
+    def find_object(self, name: str):
+        return next((obj for obj in self.objects if obj.name == name), None)
+
+    def set_object_color(self, obj, color: QColor):
+        obj.set_color(color)
+        if self.scene_stream is not None:
+            self.scene_stream.pin(obj.name)
+        if self.journal is not None:
+            self.journal.record_color(obj.name, color.rgba())
+        self.update()
+
+    def set_object_fill(self, obj, fill: bool):
+        obj.set_fill(fill)
+        if self.scene_stream is not None:
+            self.scene_stream.pin(obj.name)
+        if self.journal is not None:
+            self.journal.record_fill(obj.name, fill)
+        self.update()
+
+    def record_transform(self, obj, method: str, args: tuple):
+        """
+        Called by the @journaled methods after a transformation
+        """
+        self.spatial_index.insert(obj, obj.get_bounds())
+        if self.scene_stream is not None:
+            self.scene_stream.pin(obj.name)
+        if self.journal is not None:
+            self.journal.record_transform(obj.name, method, args)
+            self.check_journal()
+
+    def check_journal(self):
+        """
+        Compacts the journal into a snapshot once enough changes were recorded
+        """
+        if self.journal is not None and self.journal.needs_compaction():
+            self.journal.compact(self.objects, self.stream_state())
+
+    def save_session(self) -> int:
+        """
+        Flushes the journal to disk, returning the number of changes since the last snapshot
+        """
+        if self.journal is None:
+            return 0
+        return self.journal.save()
+
+    def close_session(self):
+        """
+        Closes the journal when the program exits normally, so its session is not offered for recovery
+        """
+        if self.journal is not None:
+            self.journal.close()
+
+    def recover_session(self, directory: str | None = None) -> int:
+        """
+        Loads the latest snapshot of a session and replays its journal on top of it,
+        by default the newest session that was not closed or recovered yet.
+        Returns the number of replayed changes.
+        """
+        if directory is None:
+            sessions = unrecovered_sessions(self.journal.root if self.journal is not None else SESSION_ROOT)
+            if not sessions:
+                raise FileNotFoundError("no session to recover")
+            directory = sessions[0]
+        objects, entries, stream = load_session(directory)
+        journal, self.journal = self.journal, None
+        # Objects read by each replayed import, until its end entry tells how many to keep
+        imports = {}
+        try:
+            self.clear()
+            # The snapshot holds the streamed objects that were resident, the rest stays in the file
+            if stream is not None:
+                self.open_scene(stream["path"])
+                self.scene_stream.removed.update(stream["removed"])
+            self.add_objects(objects)
+            for entry in entries:
+                self.replay(entry, imports)
+        finally:
+            self.journal = journal
+        # The recovered scene becomes the starting snapshot of the current session,
+        # and the recovered one can be deleted once that snapshot is written
+        if self.journal is not None:
+            self.journal.compact(self.objects, self.stream_state(), recovered=directory)
+        else:
+            mark_session(directory, "recovered")
         self.update()
+        return len(entries)
 
+    def replay(self, entry: dict, imports: dict):
+        """
+        Applies a journal entry to the display file
+        """
+        op = entry["op"]
+        if op == "examples":
+            self.load_example_objects()
+        elif op == "add":
+            self.add_object(
+                create_scene_object(
+                    entry["name"],
+                    entry["obj_type"],
+                    entry["fill"],
+                    entry["color"],
+                    entry["vertices"],
+                    entry["edges"],
+                    entry["rows"],
+                    entry["cols"],
+                    entry["resolution"],
+                )
+            )
+        elif op == "remove":
+            self.remove_object(entry["name"])
+        elif op == "clear":
+            self.clear()
+        elif op == "stream":
+            self.open_scene(entry["path"])
+        elif op == "import":
+            imports[entry["seq"]] = self.replay_import(entry)
+        elif op == "import_end":
+            # Objects past the count were never handed over: the import was cancelled or failed
+            objects, added = imports.pop(entry["import"], ([], []))
+            dropped = set(map(id, objects[entry["count"]:]))
+            for obj in added:
+                if id(obj) in dropped:
+                    self.spatial_index.remove(obj)
+                    geometry_store.release(obj)
+            self.objects = [obj for obj in self.objects if id(obj) not in dropped]
+        else:
+            obj = self.find_object(entry["name"]) or self.load_streamed_object(entry["name"])
+            if obj is None:
+                return
+            if op == "transform" and entry["method"] in JOURNALED_METHODS:
+                getattr(self, entry["method"])(obj, *entry["args"])
+            elif op == "color":
+                self.set_object_color(obj, QColor.fromRgba(entry["color"]))
+            elif op == "fill":
+                self.set_object_fill(obj, entry["fill"])
+
+    def replay_import(self, entry: dict) -> tuple[list, list]:
+        """
+        Reads the file of a journaled import again, returning its objects and the ones added
+        """
+        path = entry["path"]
+        try:
+            stat = os.stat(path)
+            if (stat.st_size, stat.st_mtime_ns) != (entry["size"], entry["mtime_ns"]):
+                self.console.log(f"Warning: {path} changed since it was imported")
+            objects = self.read_objects(path, entry["fill"], entry["weld_epsilon"])
+        except (OSError, ValueError) as e:
+            self.console.log(f"Error: could not import {path} again: {e}")
+            return [], []
+        return objects, self.add_objects(objects)
+
+    @journaled
     def translate_objects(self, object: Wireframe | Wireframe_3D | Surface3D, dx: float, dy: float, dz: float = 0):
         """
         This method is responsible for 2D translation.
@@ -259,6 +556,7 @@ class Canvas(QWidget):
             object.translate(dx, dy, dz)
         self.update()
 
+    @journaled
     def transform_objects(
         self, object: Wireframe | Wireframe_3D, dx: float, dy: float, dz: float = 0
     ):
@@ -277,6 +575,7 @@ class Canvas(QWidget):
             object.translate(dx, dy, dz)
         self.update()
 
+    @journaled
     def rotate_objects(
         self,
         object: Wireframe | Wireframe_3D,
@@ -299,6 +598,7 @@ class Canvas(QWidget):
             object.translate(angle_x, angle_y, angle_z)
         self.update()
 
+    @journaled
     def rotateWithCenter(self, object: Wireframe | Wireframe_3D, angle: float):
         """
         This method is responsible for rotating a single object
@@ -322,6 +622,7 @@ class Canvas(QWidget):
 
         self.update()
 
+    @journaled
     def rotateInPoint(
         self,
         object: Wireframe | Wireframe_3D,
@@ -383,10 +684,438 @@ class Canvas(QWidget):
 
         return xvp, yvp
 
+    def normalized_coords(self, points: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized version of transform_coords up to the normalized coordinates,
+        for an (n, 3) array of world points. Returns the (n, 2) coordinates and a
+        mask of the points in front of the center of projection.
+        """
+        if self.projection == "Perspective Projection":
+            projection_matrix = self.window.perspective_projection()
+        else:
+            projection_matrix = self.window.parallel_orthogonal_projection()
+        homogeneous = np.hstack([points, np.ones((len(points), 1))]) @ np.asarray(projection_matrix)
+
+        w = np.where(homogeneous[:, 3] != 0, homogeneous[:, 3], 1)
+        projected = homogeneous[:, :3] / w[:, None]
+
+        xn, yn, zn = self.window.world_to_normalized(projected[:, 0], projected[:, 1], projected[:, 2])
+        normalized = np.column_stack([xn, yn, zn, np.ones(len(points))]) @ np.asarray(
+            self.window.get_transformation_matrix()
+        )
+        return normalized[:, :2], w > 0
+
+    def project_bounds(self, bounds: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Projects the corners of (xmin, ymin, zmin, xmax, ymax, zmax) boxes. Returns the (n, 2)
+        low and high normalized coordinates of each box and whether all or any of its corners
+        are in front of the center of projection.
+        """
+        count = len(bounds)
+        corners = np.stack(
+            [
+                bounds[:, [0 if x == 0 else 3, 1 if y == 0 else 4, 2 if z == 0 else 5]]
+                for x in (0, 1)
+                for y in (0, 1)
+                for z in (0, 1)
+            ],
+            axis=1,
+        ).reshape(-1, 3)
+        normalized, in_front = self.normalized_coords(corners)
+        normalized = normalized.reshape(count, 8, 2)
+        in_front = in_front.reshape(count, 8)
+        return normalized.min(axis=1), normalized.max(axis=1), in_front.all(axis=1), in_front.any(axis=1)
+
+    def classify_bounds(self, bounds: np.ndarray, margin: float = 0.0) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Tests (xmin, ymin, zmin, xmax, ymax, zmax) boxes against the window, grown by a margin
+        given as a fraction of the window size. Each box is tested through the projection
+        of its corners. Returns two masks: the boxes that may be visible, and the boxes
+        entirely inside the window, whose segments need no clipping.
+        Boxes partly behind the center of projection are only known to be visible.
+        """
+        if len(bounds) == 0:
+            return np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+        return self.classify_projected(*self.project_bounds(bounds), margin)
+
+    def classify_projected(self, low, high, all_in_front, any_in_front, margin: float = 0.0) -> tuple[np.ndarray, np.ndarray]:
+        """
+        classify_bounds for boxes already projected by project_bounds
+        """
+        limit = 1 + 2 * margin
+        overlaps = (low <= limit).all(axis=1) & (high >= -limit).all(axis=1)
+        visible = np.where(all_in_front, overlaps, any_in_front)
+        inside = all_in_front & (low >= -1).all(axis=1) & (high <= 1).all(axis=1)
+        return visible, inside
+
+    def world_region(self, xmin: float = -1, ymin: float = -1, xmax: float = 1, ymax: float = 1):
+        """
+        Returns the (xmin, ymin, xmax, ymax) world range of the objects that may be drawn in
+        a rectangle of normalized window coordinates, or None when it cannot be bounded.
+        The rectangle is swept along the view direction across the z extent of the indexed
+        objects, so this only applies to the parallel projection.
+        """
+        if self.projection != "Parallel Projection" or not len(self.spatial_index):
+            return None
+        matrix = (
+            np.asarray(self.window.parallel_orthogonal_projection())
+            @ self.window.get_normalization_matrix()
+            @ np.asarray(self.window.get_transformation_matrix())
+        )
+        inverse = np.linalg.inv(matrix)
+        # World z changes along the view direction as the normalized depth changes
+        dz = inverse[2, 2]
+        if abs(dz) < 1e-12:
+            return None
+
+        points = []
+        for x in (xmin, xmax):
+            for y in (ymin, ymax):
+                base = np.array([x, y, 0, 1]) @ inverse
+                for z in (self.spatial_index.zmin, self.spatial_index.zmax):
+                    points.append(base + (z - base[2]) / dz * inverse[2])
+        points = np.array(points)
+        if not np.all(np.isfinite(points)):
+            return None
+        low = points[:, :2].min(axis=0)
+        high = points[:, :2].max(axis=0)
+        # Padded against rounding, so boxes touching the border are still found
+        pad = 1e-9 * (1 + np.abs(points[:, :2]).max())
+        return low[0] - pad, low[1] - pad, high[0] + pad, high[1] + pad
+
+    def visible_candidates(self) -> list:
+        """
+        Returns the objects that may be visible, in display file order
+        """
+        region = self.world_region()
+        if region is None:
+            return self.objects
+        return self.spatial_index.query(*region)
+
+    def viewport_to_normalized(self, vx: float, vy: float) -> tuple[float, float]:
+        """
+        Inverse of the normalized to viewport step of transform_coords
+        """
+        xn = 2 * (vx - self.viewport_xmin) / (self.viewport_xmax - self.viewport_xmin) - 1
+        yn = 1 - 2 * (vy - self.viewport_ymin) / (self.viewport_ymax - self.viewport_ymin)
+        return xn, yn
+
+    def normalized_to_viewport(self, normalized: np.ndarray) -> np.ndarray:
+        """
+        Vectorized normalized to viewport step of transform_coords, for an (n, 2) array
+        """
+        viewport = np.empty_like(normalized)
+        viewport[:, 0] = self.viewport_xmin + (self.viewport_xmax - self.viewport_xmin) * (normalized[:, 0] + 1) / 2
+        viewport[:, 1] = self.viewport_ymin + (self.viewport_ymax - self.viewport_ymin) * (1 - (normalized[:, 1] + 1) / 2)
+        return viewport
+
+    def object_segments(self, obj, clip: bool = True) -> np.ndarray:
+        """
+        Returns the (m, 4) viewport segments (x1, y1, x2, y2) of an object as it is drawn, before
+        clipping against the viewport. A dot is a single segment of zero length.
+        Without clip, 3D objects in perspective are not clipped in homogeneous space either,
+        and only their segments entirely in front of the center of projection are kept.
+        """
+        coordinates = getattr(obj, "coordinates", None)
+        if obj.obj_type == ObjectType.DOT:
+            points = np.asarray(coordinates[:1], dtype=np.float64)
+            pairs = np.zeros((1, 2), dtype=np.int64)
+        elif obj.obj_type == ObjectType.LINE:
+            points = np.asarray(coordinates[:2], dtype=np.float64)
+            pairs = np.array([[0, 1]]) if len(points) == 2 else np.zeros((0, 2), dtype=np.int64)
+        elif obj.obj_type == ObjectType.POLYGON:
+            points = np.asarray(coordinates, dtype=np.float64)
+            indices = np.arange(len(points))
+            pairs = np.column_stack([indices, np.roll(indices, -1)])
+        elif obj.obj_type in [ObjectType.CURVE, ObjectType.CURVE_BSPLINE]:
+            if obj.obj_type == ObjectType.CURVE:
+                groups = [coordinates[i:i + 4] for i in range(0, len(coordinates) - 3, 4)]
+                curve = self.bezier
+            else:
+                groups = [coordinates[i:i + 4] for i in range(len(coordinates) - 3)]
+                curve = self.b_spline
+            points = np.array(
+                [point for group in groups for point in curve(*np.ravel(group))], dtype=np.float64
+            ).reshape(-1, 2)
+            # Consecutive samples, without joining the last sample of a group to the next group
+            indices = np.arange(len(points)).reshape(max(len(groups), 1), -1)
+            pairs = np.column_stack([indices[:, :-1].ravel(), indices[:, 1:].ravel()])
+        elif obj.obj_type == ObjectType.POLYGON_3D:
+            points = obj.vertices
+            pairs = np.asarray(obj.edges, dtype=np.int64).reshape(-1, 2)
+        else:
+            points = obj.mesh_vertices
+            pairs = obj.mesh_edges
+
+        points = np.asarray(points, dtype=np.float64)
+        if points.shape[1:] == (2,):
+            points = np.hstack([points, np.ones((len(points), 1))])
+        if len(pairs) == 0:
+            return np.zeros((0, 4))
+        if clip and self.projection == "Perspective Projection" and obj.obj_type.value not in FLAT_TYPES:
+            # Not clip_segments, so picking leaves the drawing counters alone
+            return self.project_segments(points[pairs[:, 0]], points[pairs[:, 1]])[0]
+
+        normalized, in_front = self.normalized_coords(points)
+        viewport = self.normalized_to_viewport(normalized)
+        pairs = pairs[in_front[pairs].all(axis=1)]
+        return np.hstack([viewport[pairs[:, 0]], viewport[pairs[:, 1]]])
+
+    def pick(self, vx: float, vy: float):
+        """
+        Returns the object drawn closest to a viewport point, within the pick tolerance, or None.
+        The screen index is searched outwards from the point, testing the segments of each
+        object met until no closer one can be found, and the last drawn object wins ties,
+        as it is the one on top.
+        """
+
+        def distance(obj) -> float:
+            segments = self.object_segments(obj)
+            if len(segments) == 0:
+                return math.inf
+            if obj.obj_type == ObjectType.POLYGON and obj.fill and point_in_polygon(vx, vy, segments):
+                return 0.0
+            distance = float(point_segment_distance(vx, vy, segments).min())
+            if obj.obj_type == ObjectType.DOT:
+                # Dots are drawn as circles of radius 3
+                distance = max(distance - 3, 0.0)
+            return distance
+
+        found = self.screen_index().nearest((vx, vy), self.pick_tolerance, distance)
+        return None if found is None else found[1]
+
+    def pick_rect(self, rect: QRectF) -> list:
+        """
+        Returns the objects drawn entirely inside a viewport rectangle, in display file order
+        """
+        x1, y1 = self.viewport_to_normalized(rect.left(), rect.bottom())
+        x2, y2 = self.viewport_to_normalized(rect.right(), rect.top())
+        objects, low, high, all_in_front, _ = self.screen_bounds()
+        # Objects partly behind the center of projection are never entirely inside
+        overlaps = all_in_front & (low <= (x2, y2)).all(axis=1) & (high >= (x1, y1)).all(axis=1)
+        # Boxes projected inside the rectangle contain objects inside it, with no further tests
+        contained = overlaps & (low >= (x1, y1)).all(axis=1) & (high <= (x2, y2)).all(axis=1)
+
+        picked = []
+        for obj, overlap, inside in zip(objects, overlaps.tolist(), contained.tolist()):
+            if inside:
+                picked.append(obj)
+            elif overlap:
+                segments = self.object_segments(obj, clip=False)
+                if (
+                    len(segments)
+                    and (segments[:, [0, 2]] >= rect.left()).all()
+                    and (segments[:, [0, 2]] <= rect.right()).all()
+                    and (segments[:, [1, 3]] >= rect.top()).all()
+                    and (segments[:, [1, 3]] <= rect.bottom()).all()
+                ):
+                    picked.append(obj)
+        return picked
+
+    def set_selection(self, names: list):
+        """
+        Marks the named objects as selected and every other object as not selected
+        """
+        names = set(names)
+        for obj in self.objects:
+            if obj.name in names:
+                obj.select()
+            else:
+                obj.deselect()
+        self.update()
+
+    def select_objects(self, objects: list, modifiers: Qt.KeyboardModifier):
+        """
+        Applies a pick to the selection: it replaces the selection, or with Shift it is added
+        to it, or with Ctrl each picked object is toggled
+        """
+        selected = [obj for obj in self.objects if obj.is_selected]
+        if modifiers & Qt.KeyboardModifier.ControlModifier:
+            toggled = set(map(id, objects))
+            selected = [obj for obj in selected if id(obj) not in toggled]
+            selected += [obj for obj in objects if not obj.is_selected]
+        elif modifiers & Qt.KeyboardModifier.ShiftModifier:
+            selected += [obj for obj in objects if not obj.is_selected]
+        else:
+            selected = objects
+        names = [obj.name for obj in selected]
+        self.set_selection(names)
+        self.selection_changed.emit(names)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.drag_start = event.position()
+            self.selection_rect = None
+
+    def mouseMoveEvent(self, event):
+        if self.drag_start is None:
+            return
+        rect = QRectF(self.drag_start, event.position()).normalized()
+        # Small drags are still clicks
+        if rect.width() > self.pick_tolerance or rect.height() > self.pick_tolerance:
+            self.selection_rect = rect
+            # Only the rubber band changed, so a progressive frame goes on
+            super().update()
+
+    def mouseReleaseEvent(self, event):
+        if event.button() != Qt.MouseButton.LeftButton or self.drag_start is None:
+            return
+        if self.selection_rect is not None:
+            objects = self.pick_rect(self.selection_rect)
+        else:
+            obj = self.pick(event.position().x(), event.position().y())
+            objects = [] if obj is None else [obj]
+        self.drag_start = None
+        self.selection_rect = None
+        self.select_objects(objects, event.modifiers())
+
+    def clip_segments(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        Projects and clips segments to be drawn with project_segments, keeping in
+        clipped_segments how many of them were cut, for the frame statistics
+        """
+        segments, self.clipped_segments = self.project_segments(starts, ends)
+        return segments
+
+    def project_segments(self, starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, int]:
+        """
+        Projects the (m, 3) world segments from starts to ends with the perspective projection,
+        clipping them in homogeneous clip space before the perspective divide: against the
+        near and far planes, then against the window sides, all segments at once.
+        Returns the (k, 4) viewport coordinates (x1, y1, x2, y2) of the visible parts and
+        how many of them were cut.
+        """
+        projection_matrix = np.asarray(self.window.perspective_projection())
+        clip_matrix = self.window.get_normalization_matrix() @ np.asarray(self.window.get_transformation_matrix())
+
+        h1 = np.hstack([starts, np.ones((len(starts), 1))]) @ projection_matrix
+        h2 = np.hstack([ends, np.ones((len(ends), 1))]) @ projection_matrix
+        c1 = h1 @ clip_matrix
+        c2 = h2 @ clip_matrix
+
+        # Signed distance to each plane, positive inside: left, right, bottom, top, near, far
+        def planes(h, c):
+            x, y, w = c[:, 0], c[:, 1], c[:, 3]
+            return np.column_stack([w + x, w - x, w + y, w - y, h[:, 2] - self.near_plane, self.far_plane - h[:, 2]])
+
+        d1 = planes(h1, c1)
+        d2 = planes(h2, c2)
+
+        # Liang-Barsky over the six planes
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = d1 / (d1 - d2)
+        t_enter = np.where(d1 < 0, t, 0.0).max(axis=1)
+        t_leave = np.where(d2 < 0, t, 1.0).min(axis=1)
+        visible = ~((d1 < 0) & (d2 < 0)).any(axis=1) & (t_enter <= t_leave)
+
+        c1, c2 = c1[visible], c2[visible]
+        t_enter, t_leave = t_enter[visible, None], t_leave[visible, None]
+        clipped = int(((t_enter > 0) | (t_leave < 1)).sum())
+        p1 = c1 + t_enter * (c2 - c1)
+        p2 = c1 + t_leave * (c2 - c1)
+
+        segments = np.column_stack([p1[:, :2] / p1[:, 3:], p2[:, :2] / p2[:, 3:]])
+        width = self.viewport_xmax - self.viewport_xmin
+        height = self.viewport_ymax - self.viewport_ymin
+        segments[:, [0, 2]] = self.viewport_xmin + width * (segments[:, [0, 2]] + 1) / 2
+        segments[:, [1, 3]] = self.viewport_ymin + height * (1 - (segments[:, [1, 3]] + 1) / 2)
+        return segments, clipped
+
+    def surface_edges(self, obj) -> list:
+        """
+        Returns the (Point3D, Point3D) mesh edges a surface is drawn with
+        """
+        return obj.get_wireframe_edges()
+
+    def draw_segments(self, painter: QPainter, segments: np.ndarray):
+        """
+        Draws (x1, y1, x2, y2) viewport segments with a single call
+        """
+        if len(segments):
+            painter.drawLines([QLine(*segment) for segment in segments.astype(np.int64).tolist()])
+
+    def update(self):
+        """
+        Schedules a repaint. Everything that changes the picture calls this, so it also
+        restarts the progressive frame, cancelling the refinement of the stale one.
+        """
+        self.frame_dirty = True
+        self.frame_bounds = None
+        self.frame_screen_index = None
+        self.refine_timer.stop()
+        super().update()
+
+    def set_progressive(self, progressive: bool):
+        self.progressive = progressive
+        self.update()
+
+    def set_threaded(self, threaded: bool):
+        self.threaded = threaded
+        if not threaded and self.render_task is not None:
+            self.render_task.cancel()
+            self.render_task = None
+        self.frame_image = None
+        self.update()
+
+    def set_frame_timing(self, enabled: bool):
+        """
+        Starts or stops timing the stages of each frame. Only frames drawn directly by
+        paintEvent are timed, not progressive or background ones.
+        """
+        if enabled == self.frame_stats.enabled:
+            return
+        self.frame_stats.enabled = enabled
+        if enabled:
+            self.frame_stats.reset()
+            self.frame_stats.attach(self)
+        else:
+            self.frame_stats.detach(self)
+        self.update()
+
+    def set_hud(self, enabled: bool):
+        """
+        Shows or hides the performance overlay. It displays what frame timing records,
+        so frame timing must be enabled for it to show more than a notice.
+        """
+        self.hud.enabled = enabled
+        if enabled:
+            self.hud.reset()
+        # Only the overlay changes, the scene does not need to be drawn again
+        super().update()
+
+    def set_parallel_tessellation(self, enabled: bool):
+        """
+        Tessellates surfaces on a process pool. Surfaces keep their previous mesh until
+        the new one arrives.
+        """
+        tessellation_service.enabled = enabled
+        if enabled:
+            tessellation_service.start()
+            self.tessellation_timer.start()
+        else:
+            self.tessellation_timer.stop()
+            self.apply_tessellations(tessellation_service.wait())
+
+    def collect_tessellations(self):
+        if tessellation_service.busy():
+            self.apply_tessellations(tessellation_service.collect())
+
+    def apply_tessellations(self, surfaces: list):
+        for surface in surfaces:
+            if surface in self.spatial_index:
+                self.spatial_index.insert(surface, surface.get_bounds())
+        if surfaces:
+            self.update()
+
     def resizeEvent(self, event):
+        viewport = (self.viewport_xmax, self.viewport_ymax)
         self.viewport_xmax = self.width() - self.border_width
         self.viewport_ymax = self.height() - self.border_width
-        self.update()
+        if viewport != (self.viewport_xmax, self.viewport_ymax):
+            self.update()
+        else:
+            # Resize events are also sent with the same size, which must not restart a frame
+            super().update()
 
     def move(self, dx, dy, dz):
         if self.movement_mode == "Move":
@@ -418,9 +1147,182 @@ class Canvas(QWidget):
         self.update()
 
     def paintEvent(self, event):
+        # Frames requested from the profiler are drawn back to back until they are all done
+        profiling = profiler.frames_left > 0
+        if profiling:
+            profiler.begin_frame()
+        try:
+            self.paint_frame()
+        finally:
+            if profiling:
+                self.end_profiled_frame()
+
+    def end_profiled_frame(self):
+        if profiler.end_frame() is None:
+            self.update()
+        else:
+            self.log_profiles()
+
+    def log_profiles(self):
+        """
+        Logs the files of the profiler runs that ended since the last call
+        """
+        for profile_path, text_path in profiler.written[self.profiles_logged:]:
+            self.console.log(f"Profile written to {profile_path} and {text_path}")
+        self.profiles_logged = len(profiler.written)
+
+    def paint_frame(self):
+        if self.threaded:
+            self.paint_threaded()
+            return
+        if self.progressive:
+            self.paint_progressive()
+            return
+
+        if self.scene_stream is not None:
+            self.update_scene_stream()
+
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.draw_border(painter)
+
+        stats = self.frame_stats if self.frame_stats.enabled else None
+        target = painter if stats is None else stats.begin_frame(painter)
+        objects, inside = self.frame_objects()
+        for obj, is_inside in zip(objects, inside):
+            self.draw_object(target, obj, is_inside)
+        if stats is not None:
+            stats.end_frame(len(self.objects), len(objects))
+        self.draw_selection_rect(painter)
+        self.draw_hud(painter)
+
+    def paint_threaded(self):
+        """
+        Shows the last frame completed by the render worker, requesting a new one if the
+        picture changed since
+        """
+        if self.frame_dirty:
+            self.request_frame()
+
+        painter = QPainter(self)
+        if self.frame_image is not None:
+            painter.drawImage(0, 0, self.frame_image)
+        self.draw_selection_rect(painter)
+        self.draw_hud(painter)
 
+    def request_frame(self):
+        """
+        Starts drawing a snapshot of the scene on the render worker, cancelling the frame
+        still being drawn, if any
+        """
+        if self.scene_stream is not None:
+            self.update_scene_stream()
+        if self.render_task is not None:
+            self.render_task.cancel()
+
+        self.render_frame += 1
+        self.render_task = RenderTask(self.render_frame, self.snapshot())
+        self.render_task.signals.finished.connect(self.render_finished)
+        self.frame_dirty = False
+        self.render_pool.start(self.render_task)
+
+    def snapshot(self) -> "FrameSnapshot":
+        objects, inside = self.frame_objects()
+        return FrameSnapshot(self, objects, inside)
+
+    def render_finished(self, frame: int, image: QImage, messages: list):
+        # Frames finished after a newer one was requested are stale
+        if frame != self.render_frame or not self.threaded:
+            return
+        self.render_task = None
+        self.frame_image = image
+        for message in messages:
+            self.console.log(message)
+        super().update()
+
+    def paint_progressive(self):
+        """
+        Shows the backbuffer with the objects drawn so far, and the bounding boxes of the
+        objects still to be drawn for as long as the frame budget allows
+        """
+        if self.frame_dirty:
+            self.start_frame()
+
+        painter = QPainter(self)
+        painter.drawImage(0, 0, self.backbuffer)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        deadline = time.perf_counter() + self.frame_budget / 1000
+        for i in range(self.frame_next, len(self.frame_items)):
+            if i % 64 == 0 and time.perf_counter() > deadline:
+                break
+            if np.isfinite(self.frame_rects[i, 0]):
+                painter.setPen(QPen(self.frame_items[i].color))
+                painter.drawRect(QRectF(*self.frame_rects[i]))
+        self.draw_selection_rect(painter)
+        self.draw_hud(painter)
+
+    def start_frame(self):
+        """
+        Starts a progressive frame: clears the backbuffer and lists the objects to draw,
+        with the viewport rectangles of their projected bounds for the coarse pass
+        """
+        if self.scene_stream is not None:
+            self.update_scene_stream()
+
+        ratio = self.devicePixelRatioF()
+        self.backbuffer = QImage(
+            int(self.width() * ratio), int(self.height() * ratio), QImage.Format.Format_ARGB32_Premultiplied
+        )
+        self.backbuffer.setDevicePixelRatio(ratio)
+        self.backbuffer.fill(self.palette().color(QPalette.ColorRole.Window))
+        painter = QPainter(self.backbuffer)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.draw_border(painter)
+        painter.end()
+
+        self.frame_items, self.frame_inside = self.frame_objects()
+        bounds = np.array([obj.get_bounds() for obj in self.frame_items]).reshape(-1, 6)
+        self.frame_rects = np.full((len(bounds), 4), np.nan)
+        if len(bounds):
+            low, high, all_in_front, _ = self.project_bounds(bounds)
+            # Boxes crossing the center of projection have no meaningful projection
+            corner1 = self.normalized_to_viewport(np.clip(low, -1, 1))
+            corner2 = self.normalized_to_viewport(np.clip(high, -1, 1))
+            rects = np.column_stack([corner1[:, 0], corner2[:, 1], corner2[:, 0] - corner1[:, 0], corner1[:, 1] - corner2[:, 1]])
+            self.frame_rects[all_in_front] = rects[all_in_front]
+
+        self.frame_next = 0
+        self.frame_brush = QBrush()
+        self.frame_dirty = False
+        if self.frame_items:
+            self.refine_timer.start()
+
+    def refine_frame(self):
+        """
+        Draws the next objects of the progressive frame into the backbuffer, for at least one
+        object and at most the frame budget, and schedules the rest for the next slice
+        """
+        if self.frame_dirty or self.backbuffer is None:
+            return
+        painter = QPainter(self.backbuffer)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        # Drawing goes on with the brush the previous slice left, as in a single pass
+        painter.setBrush(self.frame_brush)
+        deadline = time.perf_counter() + self.frame_budget / 1000
+        while self.frame_next < len(self.frame_items):
+            index = self.frame_next
+            self.draw_object(painter, self.frame_items[index], self.frame_inside[index])
+            self.frame_next += 1
+            if time.perf_counter() > deadline:
+                break
+        self.frame_brush = painter.brush()
+        painter.end()
+
+        if self.frame_next < len(self.frame_items):
+            self.refine_timer.start()
+        super().update()
+
+    def draw_border(self, painter: QPainter):
         # Desenha a borda vermelha
         border_pen = QPen(QColor("red"))
         border_pen.setWidth(2)  # border width
@@ -432,80 +1334,117 @@ class Canvas(QWidget):
             self.viewport_ymax - self.border_width,
         )
 
-        for obj in self.objects:
-            try:
-                pen = QPen(obj.color)
-                if obj.is_selected:
-                    pen.setWidth(2)
-                painter.setPen(pen)
-
-                if obj.obj_type == ObjectType.DOT:
-                    (x, y) = obj.coordinates[0]
-                    vx, vy = self.transform_coords(x, y)
-                    if vx and vy:
-                        self.point_clipping(painter, vx, vy)
-                elif obj.obj_type == ObjectType.LINE:
-                    if len(obj.coordinates) == 2:
-                        x1, y1 = obj.coordinates[0]
-                        x2, y2 = obj.coordinates[1]
-                        vx1, vy1 = self.transform_coords(x1, y1)
-                        vx2, vy2 = self.transform_coords(x2, y2)
-                        if (vx1 and vy1) and (vx2 and vy2):
-                            clipped_line = self.line_clipping(vx1, vy1, vx2, vy2)
-                            if clipped_line:
-                                vx1, vy1, vx2, vy2 = clipped_line
-                                painter.drawLine(int(vx1), int(vy1), int(vx2), int(vy2))
-
-                elif obj.obj_type == ObjectType.POLYGON:
-                    if len(obj.coordinates) >= 3:
-                        if obj.fill:
-                            painter.setBrush(obj.color)
-                        else:
-                            painter.setBrush(Qt.BrushStyle.NoBrush)
-                        painter.setPen(pen)
-                        self.polygon_clipping(painter, obj)
-                elif obj.obj_type == ObjectType.CURVE:
-                    if len(obj.coordinates) >= 4:
-                        self.check_bezier_continuity(obj.coordinates)
-
-                        for i in range(0, len(obj.coordinates) - 3, 4):
-                            x1, y1 = obj.coordinates[i]
-                            x2, y2 = obj.coordinates[i + 1]
-                            x3, y3 = obj.coordinates[i + 2]
-                            x4, y4 = obj.coordinates[i + 3]
-                            segment = self.bezier(x1, y1, x2, y2, x3, y3, x4, y4)
-                            if len(segment) >= 2:
-                                for j in range(len(segment) - 1):
-                                    vx1, vy1 = self.transform_coords(
-                                        segment[j][0], segment[j][1]
-                                    )
-                                    vx2, vy2 = self.transform_coords(
-                                        segment[j + 1][0], segment[j + 1][1]
-                                    )
-                                    if (vx1 and vy1) and (vx2 and vy2):
-                                        clipped_line = self.line_clipping(
-                                            vx1, vy1, vx2, vy2
-                                        )
-                                        if clipped_line:
-                                            vx1, vy1, vx2, vy2 = clipped_line
-                                            painter.drawLine(
-                                                int(vx1), int(vy1), int(vx2), int(vy2)
-                                            )
-                        if self.show_control_points:
-                            for x, y in obj.coordinates:
-                                vx, vy = self.transform_coords(x, y)
-                                if vx and vy:
-                                    painter.setBrush(QColor("Magenta"))
-                                    self.point_clipping(painter, vx, vy)
-                elif obj.obj_type == ObjectType.CURVE_BSPLINE:
-                    if len(obj.coordinates) >= 4:
-                        num_segments = len(obj.coordinates) - 3
-                        for i in range(num_segments):
-                            x1, y1 = obj.coordinates[i]
-                            x2, y2 = obj.coordinates[i + 1]
-                            x3, y3 = obj.coordinates[i + 2]
-                            x4, y4 = obj.coordinates[i + 3]
-                            segment = self.b_spline(x1, y1, x2, y2, x3, y3, x4, y4)
+    def draw_selection_rect(self, painter: QPainter):
+        # Rubber band of the box selection in progress
+        if self.selection_rect is not None:
+            painter.setPen(QPen(QColor("gray"), 1, Qt.PenStyle.DashLine))
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawRect(self.selection_rect)
+
+    def draw_hud(self, painter: QPainter):
+        # After the frame is closed, so the overlay is not part of what it measures
+        if self.hud.enabled:
+            self.hud.draw(painter, self.frame_stats, self.width())
+
+    def frame_objects(self) -> tuple[list, list]:
+        """
+        Returns the objects that may be visible, in display file order, and whether each one
+        is entirely inside the window. Objects outside the window are skipped, and the ones
+        entirely inside skip clipping.
+        """
+        objects = self.visible_candidates()
+        bounds = np.array([obj.get_bounds() for obj in objects]).reshape(-1, 6)
+        projected = self.project_bounds(bounds)
+        visible, inside = self.classify_projected(*projected)
+        objects = [obj for obj, is_visible in zip(objects, visible.tolist()) if is_visible]
+        # Kept until the picture changes, so picks test the projected boxes of this frame
+        self.frame_bounds = (objects, *(array[visible] for array in projected))
+        self.frame_screen_index = None
+        return objects, [is_inside for is_visible, is_inside in zip(visible.tolist(), inside.tolist()) if is_visible]
+
+    def screen_bounds(self) -> tuple[list, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the objects that may be visible, in display file order, with the projection of
+        their bounds by project_bounds. They are computed with the frame, so in perspective,
+        where the spatial index cannot bound the visible objects, a pick does not project the
+        bounds of every object again.
+        """
+        if self.frame_bounds is None:
+            self.frame_objects()
+        return self.frame_bounds
+
+    def screen_index(self) -> SpatialIndex:
+        """
+        Returns a spatial index over the viewport boxes of the objects of screen_bounds, grown
+        by the radius dots are drawn with, so a box is never farther from a point than what
+        is drawn of its object. It is built by the first pick after the picture changed.
+        """
+        if self.frame_screen_index is None:
+            objects, low, high, all_in_front, _ = self.screen_bounds()
+            corner1 = self.normalized_to_viewport(low)
+            corner2 = self.normalized_to_viewport(high)
+            boxes = np.column_stack([
+                np.minimum(corner1[:, 0], corner2[:, 0]) - 3,
+                np.minimum(corner1[:, 1], corner2[:, 1]) - 3,
+                np.zeros(len(objects)),
+                np.maximum(corner1[:, 0], corner2[:, 0]) + 3,
+                np.maximum(corner1[:, 1], corner2[:, 1]) + 3,
+                np.zeros(len(objects)),
+            ])
+            # Boxes crossing the center of projection have no meaningful projection: anywhere
+            boxes[~all_in_front] = [-math.inf, -math.inf, 0, math.inf, math.inf, 0]
+            index = SpatialIndex(cell_size=32)
+            index.insert_many(objects, boxes)
+            self.frame_screen_index = index
+        return self.frame_screen_index
+
+    def draw_object(self, painter: QPainter, obj, inside: bool = False):
+        """
+        Draws an object, clipping it against the viewport unless it is entirely inside the window
+        """
+        self.trivially_accepted = inside
+        try:
+            pen = QPen(obj.color)
+            if obj.is_selected:
+                pen.setWidth(2)
+            painter.setPen(pen)
+
+            if obj.obj_type == ObjectType.DOT:
+                (x, y) = obj.coordinates[0]
+                vx, vy = self.transform_coords(x, y)
+                if vx and vy:
+                    self.point_clipping(painter, vx, vy)
+            elif obj.obj_type == ObjectType.LINE:
+                if len(obj.coordinates) == 2:
+                    x1, y1 = obj.coordinates[0]
+                    x2, y2 = obj.coordinates[1]
+                    vx1, vy1 = self.transform_coords(x1, y1)
+                    vx2, vy2 = self.transform_coords(x2, y2)
+                    if (vx1 and vy1) and (vx2 and vy2):
+                        clipped_line = self.line_clipping(vx1, vy1, vx2, vy2)
+                        if clipped_line:
+                            vx1, vy1, vx2, vy2 = clipped_line
+                            painter.drawLine(int(vx1), int(vy1), int(vx2), int(vy2))
+
+            elif obj.obj_type == ObjectType.POLYGON:
+                if len(obj.coordinates) >= 3:
+                    if obj.fill:
+                        painter.setBrush(obj.color)
+                    else:
+                        painter.setBrush(Qt.BrushStyle.NoBrush)
+                    painter.setPen(pen)
+                    self.polygon_clipping(painter, obj)
+            elif obj.obj_type == ObjectType.CURVE:
+                if len(obj.coordinates) >= 4:
+                    self.check_bezier_continuity(obj.coordinates)
+
+                    for i in range(0, len(obj.coordinates) - 3, 4):
+                        x1, y1 = obj.coordinates[i]
+                        x2, y2 = obj.coordinates[i + 1]
+                        x3, y3 = obj.coordinates[i + 2]
+                        x4, y4 = obj.coordinates[i + 3]
+                        segment = self.bezier(x1, y1, x2, y2, x3, y3, x4, y4)
+                        if len(segment) >= 2:
                             for j in range(len(segment) - 1):
                                 vx1, vy1 = self.transform_coords(
                                     segment[j][0], segment[j][1]
@@ -522,89 +1461,232 @@ class Canvas(QWidget):
                                         painter.drawLine(
                                             int(vx1), int(vy1), int(vx2), int(vy2)
                                         )
-                        if self.show_control_points:
-                            for x, y in obj.coordinates:
-                                vx, vy = self.transform_coords(x, y)
-                                if vx and vy:
-                                    painter.setBrush(QColor("Magenta"))
-                                    self.point_clipping(painter, vx, vy)
-                elif obj.obj_type == ObjectType.POLYGON_3D:
-                    for edge in obj.edges:
-                        if len(obj.points[int(edge[0])].get_coordinates()) == 1:
-                            x1, y1, z1 = obj.points[int(edge[0])].get_coordinates()[0]
-                            x2, y2, z2 = obj.points[int(edge[1])].get_coordinates()[0]
-                        else:
-                            x1, y1, z1 = obj.points[int(edge[0])].get_coordinates()
-                            x2, y2, z2 = obj.points[int(edge[1])].get_coordinates()
-                        vx1, vy1 = self.transform_coords(x1, y1, z1)
-                        vx2, vy2 = self.transform_coords(x2, y2, z2)
-                        if (vx1 and vy1) and (vx2 and vy2):
-                            clipped_line = self.line_clipping(vx1, vy1, vx2, vy2)
-                            if clipped_line:
-                                vx1, vy1, vx2, vy2 = clipped_line
-                                painter.drawLine(
-                                    int(vx1), int(vy1), int(vx2), int(vy2)
+                    if self.show_control_points:
+                        for x, y in obj.coordinates:
+                            vx, vy = self.transform_coords(x, y)
+                            if vx and vy:
+                                painter.setBrush(QColor("Magenta"))
+                                self.point_clipping(painter, vx, vy)
+            elif obj.obj_type == ObjectType.CURVE_BSPLINE:
+                if len(obj.coordinates) >= 4:
+                    num_segments = len(obj.coordinates) - 3
+                    for i in range(num_segments):
+                        x1, y1 = obj.coordinates[i]
+                        x2, y2 = obj.coordinates[i + 1]
+                        x3, y3 = obj.coordinates[i + 2]
+                        x4, y4 = obj.coordinates[i + 3]
+                        segment = self.b_spline(x1, y1, x2, y2, x3, y3, x4, y4)
+                        for j in range(len(segment) - 1):
+                            vx1, vy1 = self.transform_coords(
+                                segment[j][0], segment[j][1]
+                            )
+                            vx2, vy2 = self.transform_coords(
+                                segment[j + 1][0], segment[j + 1][1]
+                            )
+                            if (vx1 and vy1) and (vx2 and vy2):
+                                clipped_line = self.line_clipping(
+                                    vx1, vy1, vx2, vy2
                                 )
-                elif obj.obj_type in [ObjectType.SURFACE_BEZIER, ObjectType.SURFACE_BSPLINE]:
-                    edges = obj.get_wireframe_edges()
-                    for p1, p2 in edges:
-                        coords1 = p1.get_coordinates()
-                        coords2 = p2.get_coordinates()
+                                if clipped_line:
+                                    vx1, vy1, vx2, vy2 = clipped_line
+                                    painter.drawLine(
+                                        int(vx1), int(vy1), int(vx2), int(vy2)
+                                    )
+                    if self.show_control_points:
+                        for x, y in obj.coordinates:
+                            vx, vy = self.transform_coords(x, y)
+                            if vx and vy:
+                                painter.setBrush(QColor("Magenta"))
+                                self.point_clipping(painter, vx, vy)
+            elif obj.obj_type == ObjectType.POLYGON_3D and self.projection == "Perspective Projection":
+                edges = np.asarray(obj.edges, dtype=np.int64).reshape(-1, 2)
+                self.draw_segments(
+                    painter, self.clip_segments(obj.vertices[edges[:, 0]], obj.vertices[edges[:, 1]])
+                )
+            elif obj.obj_type == ObjectType.POLYGON_3D:
+                for edge in obj.edges:
+                    if len(obj.points[int(edge[0])].get_coordinates()) == 1:
+                        x1, y1, z1 = obj.points[int(edge[0])].get_coordinates()[0]
+                        x2, y2, z2 = obj.points[int(edge[1])].get_coordinates()[0]
+                    else:
+                        x1, y1, z1 = obj.points[int(edge[0])].get_coordinates()
+                        x2, y2, z2 = obj.points[int(edge[1])].get_coordinates()
+                    vx1, vy1 = self.transform_coords(x1, y1, z1)
+                    vx2, vy2 = self.transform_coords(x2, y2, z2)
+                    if (vx1 and vy1) and (vx2 and vy2):
+                        clipped_line = self.line_clipping(vx1, vy1, vx2, vy2)
+                        if clipped_line:
+                            vx1, vy1, vx2, vy2 = clipped_line
+                            painter.drawLine(
+                                int(vx1), int(vy1), int(vx2), int(vy2)
+                            )
+            elif (
+                obj.obj_type in [ObjectType.SURFACE_BEZIER, ObjectType.SURFACE_BSPLINE, ObjectType.SURFACE_BSPLINE_FD]
+                and self.projection == "Perspective Projection"
+            ):
+                self.draw_segments(
+                    painter,
+                    self.clip_segments(obj.mesh_vertices[obj.mesh_edges[:, 0]], obj.mesh_vertices[obj.mesh_edges[:, 1]]),
+                )
+            elif obj.obj_type in [ObjectType.SURFACE_BEZIER, ObjectType.SURFACE_BSPLINE]:
+                edges = self.surface_edges(obj)
+                for p1, p2 in edges:
+                    coords1 = p1.get_coordinates()
+                    coords2 = p2.get_coordinates()
                         
-                        if isinstance(coords1, list):
-                            x1, y1, z1 = coords1[0]
-                        else:
-                            x1, y1, z1 = coords1
+                    if isinstance(coords1, list):
+                        x1, y1, z1 = coords1[0]
+                    else:
+                        x1, y1, z1 = coords1
                             
-                        if isinstance(coords2, list):
-                            x2, y2, z2 = coords2[0]
-                        else:
-                            x2, y2, z2 = coords2
+                    if isinstance(coords2, list):
+                        x2, y2, z2 = coords2[0]
+                    else:
+                        x2, y2, z2 = coords2
                         
-                        vx1, vy1 = self.transform_coords(x1, y1, z1)
-                        vx2, vy2 = self.transform_coords(x2, y2, z2)
+                    vx1, vy1 = self.transform_coords(x1, y1, z1)
+                    vx2, vy2 = self.transform_coords(x2, y2, z2)
                         
-                        if (vx1 and vy1) and (vx2 and vy2):
-                            clipped_line = self.line_clipping(vx1, vy1, vx2, vy2)
-                            if clipped_line:
-                                vx1, vy1, vx2, vy2 = clipped_line
-                                painter.drawLine(int(vx1), int(vy1), int(vx2), int(vy2))
-                elif obj.obj_type == ObjectType.SURFACE_BSPLINE_FD:
-                    edges = obj.get_wireframe_edges()
-                    for p1, p2 in edges:
-                        coords1 = p1.get_coordinates()
-                        coords2 = p2.get_coordinates()
+                    if (vx1 and vy1) and (vx2 and vy2):
+                        clipped_line = self.line_clipping(vx1, vy1, vx2, vy2)
+                        if clipped_line:
+                            vx1, vy1, vx2, vy2 = clipped_line
+                            painter.drawLine(int(vx1), int(vy1), int(vx2), int(vy2))
+            elif obj.obj_type == ObjectType.SURFACE_BSPLINE_FD:
+                edges = self.surface_edges(obj)
+                for p1, p2 in edges:
+                    coords1 = p1.get_coordinates()
+                    coords2 = p2.get_coordinates()
                         
-                        if isinstance(coords1, list):
-                            x1, y1, z1 = coords1[0]
-                        else:
-                            x1, y1, z1 = coords1
+                    if isinstance(coords1, list):
+                        x1, y1, z1 = coords1[0]
+                    else:
+                        x1, y1, z1 = coords1
                             
-                        if isinstance(coords2, list):
-                            x2, y2, z2 = coords2[0]
-                        else:
-                            x2, y2, z2 = coords2
+                    if isinstance(coords2, list):
+                        x2, y2, z2 = coords2[0]
+                    else:
+                        x2, y2, z2 = coords2
                         
-                        vx1, vy1 = self.transform_coords(x1, y1, z1)
-                        vx2, vy2 = self.transform_coords(x2, y2, z2)
+                    vx1, vy1 = self.transform_coords(x1, y1, z1)
+                    vx2, vy2 = self.transform_coords(x2, y2, z2)
                         
-                        if (vx1 and vy1) and (vx2 and vy2):
-                            clipped_line = self.line_clipping(vx1, vy1, vx2, vy2)
-                            if clipped_line:
-                                vx1, vy1, vx2, vy2 = clipped_line
-                                painter.drawLine(int(vx1), int(vy1), int(vx2), int(vy2))
+                    if (vx1 and vy1) and (vx2 and vy2):
+                        clipped_line = self.line_clipping(vx1, vy1, vx2, vy2)
+                        if clipped_line:
+                            vx1, vy1, vx2, vy2 = clipped_line
+                            painter.drawLine(int(vx1), int(vy1), int(vx2), int(vy2))
 
-            except OverflowError:
-                self.console.log(f"{obj.name} was not added due to an overflow error.")
+        except OverflowError:
+            self.console.log(f"{obj.name} was not added due to an overflow error.")
+        self.trivially_accepted = False
 
     def export_objects(self):
-        self.descritor.objs = self.objects.copy()
+        self.descritor.objs = self.all_objects()
         self.descritor.export_file()
 
-    def import_objects(self, path, fill: bool = False):
-        new_objects = self.descritor.import_file(path, fill)
-        for new_object in new_objects:
-            self.add_object(new_object)
+    def export_scene(self, path: str = "files/export.scene"):
+        self.scene_descritor.objs = self.all_objects()
+        self.scene_descritor.export_file(path)
+
+    def import_objects(self, path, fill: bool = False, weld_epsilon: float | None = None):
+        self.begin_import(path, fill, weld_epsilon)
+        objects = []
+        try:
+            objects = self.read_objects(path, fill, weld_epsilon)
+            self.add_objects(objects, record=False)
+        finally:
+            self.end_import(len(objects))
+
+    def read_objects(self, path: str, fill: bool = False, weld_epsilon: float | None = None) -> list:
+        """
+        Reads the objects of an OBJ or scene file, as an import of it does
+        """
+        if path.endswith(".scene"):
+            return DescritorScene().import_file(path)
+        descritor = DescritorOBJ()
+        descritor.weld_epsilon = weld_epsilon
+        return descritor.import_file(path, fill)
+
+    def begin_import(self, path: str, fill: bool = False, weld_epsilon: float | None = None):
+        """
+        Journals an import by reference to its file. Its objects are then added with
+        add_objects(objects, record=False), and end_import closes it.
+        """
+        if self.journal is not None:
+            self.import_seq = self.journal.record_import(path, fill, weld_epsilon)
+
+    def end_import(self, count: int):
+        """
+        Closes the import in progress, given how many objects of the file it handed over
+        """
+        if self.journal is not None and self.import_seq is not None:
+            self.journal.record_import_end(self.import_seq, count)
+            self.check_journal()
+        self.import_seq = None
+
+    def open_scene(self, path: str, memory_cap: int | None = None):
+        """
+        Streams a scene file: only the chunks near the window are kept in the display file
+        """
+        stream = SceneStream(path) if memory_cap is None else SceneStream(path, memory_cap)
+        self.scene_stream = stream
+        if self.journal is not None:
+            self.journal.record_stream(path)
+        self.update()
+
+    def load_streamed_object(self, name: str):
+        """
+        Loads the chunk of an object of the streamed scene that is not resident, returning
+        the object, or None if the scene has no such object
+        """
+        stream = self.scene_stream
+        if stream is None:
+            return None
+        chunk = stream.find_chunk(name)
+        if chunk is None or chunk in stream.loaded:
+            return None
+        loaded = stream.load_chunk(chunk, {obj.name for obj in self.objects})
+        self.objects.extend(loaded)
+        for obj in loaded:
+            self.spatial_index.insert(obj, obj.get_bounds())
+        return next((obj for obj in loaded if obj.name == name), None)
+
+    def all_objects(self) -> list:
+        """
+        Returns the display file plus, while a scene is streamed, the objects of the scene
+        that are not resident, so exports write the whole scene
+        """
+        if self.scene_stream is None:
+            return self.objects.copy()
+        return self.objects + self.scene_stream.non_resident_objects({obj.name for obj in self.objects})
+
+    def stream_state(self) -> dict | None:
+        """
+        The streamed scene and the objects removed from it, kept with journal snapshots
+        """
+        if self.scene_stream is None:
+            return None
+        return {"path": self.scene_stream.path, "removed": sorted(self.scene_stream.removed)}
+
+    def update_scene_stream(self):
+        """
+        Loads the chunks of the streamed scene that entered the window and evicts far away ones
+        """
+        stream = self.scene_stream
+        visible, _ = self.classify_bounds(stream.get_bounds(), self.stream_margin)
+        loaded, evicted = stream.update(visible, {obj.name for obj in self.objects})
+        if evicted:
+            for obj in evicted:
+                self.spatial_index.remove(obj)
+                geometry_store.release(obj)
+            evicted = set(map(id, evicted))
+            self.objects = [obj for obj in self.objects if id(obj) not in evicted]
+        self.objects.extend(loaded)
+        for obj in loaded:
+            self.spatial_index.insert(obj, obj.get_bounds())
+        if loaded or evicted:
+            self.objects_changed.emit()
 
     def point_clipping(self, painter: QPainter, vx: float, vy: float):
         """
@@ -619,7 +1701,10 @@ class Canvas(QWidget):
     def line_clipping(self, vx1: float, vy1: float, vx2: float, vy2: float):
         """
         Applies the selected line clipping algorithm to the line defined by (vx1, vy1) and (vx2, vy2).
+        Lines of objects entirely inside the window are returned unchanged.
         """
+        if self.trivially_accepted:
+            return vx1, vy1, vx2, vy2
         if self.line_clipping_algorithm == "Cohen-Sutherland":
             return self.cohen_sutherland(vx1, vy1, vx2, vy2)
         elif self.line_clipping_algorithm == "Liang-Barsky":
@@ -760,7 +1845,9 @@ class Canvas(QWidget):
         Sutherland-Hodgman polygon clipping algorithm.
         """
         points = [self.transform_coords(x, y) for x, y in obj.coordinates]
-        if all(point != (None, None) for point in points):
+        if self.trivially_accepted and all(point != (None, None) for point in points):
+            painter.drawPolygon(*[QPointF(x, y) for x, y in points])
+        elif all(point != (None, None) for point in points):
             edges = ["LEFT", "RIGHT", "BOTTOM", "TOP"]
 
             clipped_points = points
@@ -905,3 +1992,110 @@ class Canvas(QWidget):
             dy2 += dy3
 
         return points
+
+
+def build_point_lists(obj) -> None:
+    """
+    Builds the lazy Point3D lists the parallel projection draws an object with.
+    They are cached on the model until its geometry changes.
+    """
+    if obj.obj_type == ObjectType.POLYGON_3D:
+        obj.points
+    elif obj.obj_type in (ObjectType.SURFACE_BEZIER, ObjectType.SURFACE_BSPLINE):
+        obj.surface_points
+    elif obj.obj_type == ObjectType.SURFACE_BSPLINE_FD:
+        obj.surface_patches
+
+
+class FrameSnapshot():
+    """
+    Copy of everything a frame depends on, drawn by a RenderTask off the GUI thread.
+    The objects are shallow copies, as the models replace their geometry on every
+    transformation instead of changing it in place. The lazy Point3D lists of the models
+    are built before the copy, so the copies share them read-only instead of rebuilding
+    them on every frame. The drawing methods of the Canvas only read the attributes
+    copied here, so they are reused as they are.
+    """
+
+    draw_border = Canvas.draw_border
+    draw_object = Canvas.draw_object
+    draw_segments = Canvas.draw_segments
+    surface_edges = Canvas.surface_edges
+    transform_coords = Canvas.transform_coords
+    clip_segments = Canvas.clip_segments
+    project_segments = Canvas.project_segments
+    point_clipping = Canvas.point_clipping
+    line_clipping = Canvas.line_clipping
+    cohen_sutherland = Canvas.cohen_sutherland
+    cohen_sutherland_point = Canvas.cohen_sutherland_point
+    cohen_sutherland_redraw = Canvas.cohen_sutherland_redraw
+    liang_barsky = Canvas.liang_barsky
+    polygon_clipping = Canvas.polygon_clipping
+    sutherland_hodgman = Canvas.sutherland_hodgman
+    sutherland_hogdman_inside = Canvas.sutherland_hogdman_inside
+    sutherland_hodgman_redraw = Canvas.sutherland_hodgman_redraw
+    bezier = Canvas.bezier
+    check_bezier_continuity = Canvas.check_bezier_continuity
+    b_spline = Canvas.b_spline
+
+    def __init__(self, canvas: Canvas, objects: list, inside: list):
+        self.window = copy.copy(canvas.window)
+        self.projection = canvas.projection
+        self.line_clipping_algorithm = canvas.line_clipping_algorithm
+        self.show_control_points = canvas.show_control_points
+        self.near_plane = canvas.near_plane
+        self.far_plane = canvas.far_plane
+        self.border_width = canvas.border_width
+        self.viewport_xmin = canvas.viewport_xmin
+        self.viewport_ymin = canvas.viewport_ymin
+        self.viewport_xmax = canvas.viewport_xmax
+        self.viewport_ymax = canvas.viewport_ymax
+        self.width = canvas.width()
+        self.height = canvas.height()
+        self.ratio = canvas.devicePixelRatioF()
+        self.background = canvas.palette().color(QPalette.ColorRole.Window)
+        if self.projection != "Perspective Projection":
+            for obj in objects:
+                build_point_lists(obj)
+        self.objects = [copy.copy(obj) for obj in objects]
+        self.inside = list(inside)
+        self.trivially_accepted = False
+
+        # Messages logged while drawing, shown on the console when the frame is done
+        self.messages: list[str] = []
+        self.console = self
+
+    def resize(self, width: int, height: int):
+        """
+        Draws the frame at another size, scaling the border along with the picture
+        """
+        scale = min(width / self.width, height / self.height)
+        self.border_width = round(self.border_width * scale)
+        self.viewport_xmin = self.border_width
+        self.viewport_ymin = self.border_width
+        self.viewport_xmax = width - self.border_width
+        self.viewport_ymax = height - self.border_width
+        self.width = width
+        self.height = height
+        self.ratio = 1.0
+
+    def render(self, cancelled=None) -> QImage:
+        """
+        Draws the frame into a new image, stopping early once cancelled() returns True
+        """
+        image = QImage(int(self.width * self.ratio), int(self.height * self.ratio), QImage.Format.Format_ARGB32_Premultiplied)
+        image.setDevicePixelRatio(self.ratio)
+        image.fill(self.background)
+
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.draw_border(painter)
+        for obj, inside in zip(self.objects, self.inside):
+            if cancelled is not None and cancelled():
+                break
+            self.draw_object(painter, obj, inside)
+        painter.end()
+        return image
+
+    def log(self, message: str):
+        self.messages.append(message)
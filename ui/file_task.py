@@ -0,0 +1,122 @@
+import threading
+import time
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from ui.tile_renderer import render_snapshot_tiles
+from utils.descritorOBJ import DescritorOBJ
+from utils.descritorScene import DescritorScene
+
+
+class FileTaskSignals(QObject):
+    """
+    Signals of a FileTask. They are emitted from the worker thread and
+    delivered to the GUI thread through queued connections.
+    """
+
+    progress = pyqtSignal(int, int)
+    batch = pyqtSignal(list)
+    finished = pyqtSignal(bool)
+    failed = pyqtSignal(str)
+
+
+class FileTask(QRunnable):
+    """
+    Imports or exports a file on a QThreadPool worker, so the window keeps
+    responding during large file operations.
+    Imported objects are handed back in batches through the batch signal.
+    """
+
+    # Minimum interval between two progress/batch emissions, in seconds
+    emit_interval = 0.05
+
+    def __init__(
+        self,
+        operation: str,
+        path: str,
+        objects: list | None = None,
+        fill: bool = False,
+        weld_epsilon: float | None = None,
+    ):
+        super().__init__()
+        self.operation = operation
+        self.path = path
+        self.objects = objects or []
+        self.fill = fill
+        self.weld_epsilon = weld_epsilon
+        self.signals = FileTaskSignals()
+        self.cancel_event = threading.Event()
+        self.emitted = 0
+        self.last_emit = 0.0
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def run(self):
+        try:
+            if self.path.endswith(".scene"):
+                self.descritor = DescritorScene()
+            else:
+                self.descritor = DescritorOBJ()
+
+            if self.operation == "import":
+                if isinstance(self.descritor, DescritorScene):
+                    self.descritor.import_file(self.path, self.report_progress, self.cancel_event)
+                else:
+                    self.descritor.weld_epsilon = self.weld_epsilon
+                    self.descritor.import_file(self.path, self.fill, self.report_progress, self.cancel_event)
+                self.emit_batch()
+            else:
+                self.descritor.objs = self.objects
+                self.descritor.export_file(self.path, self.report_progress, self.cancel_event)
+            self.signals.finished.emit(self.is_cancelled())
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+
+    def report_progress(self, done: int, total: int) -> None:
+        now = time.monotonic()
+        if now - self.last_emit < self.emit_interval and done != total:
+            return
+        self.last_emit = now
+        self.signals.progress.emit(done, total)
+        if self.operation == "import":
+            self.emit_batch()
+
+    def emit_batch(self) -> None:
+        """
+        Sends the objects created since the last batch to the GUI thread
+        """
+        batch = self.descritor.objs[self.emitted:]
+        if batch:
+            self.emitted += len(batch)
+            self.signals.batch.emit(batch)
+
+
+class CaptureTask(FileTask):
+    """
+    Renders a high resolution capture of a frame snapshot of the canvas on a
+    QThreadPool worker and saves it, with the progress and cancel of a FileTask.
+    """
+
+    def __init__(self, snapshot, path: str, width: int, height: int):
+        super().__init__("capture", path)
+        self.snapshot = snapshot
+        self.width = width
+        self.height = height
+        self.elapsed = 0.0
+
+    def run(self):
+        try:
+            start = time.perf_counter()
+            image = render_snapshot_tiles(
+                self.snapshot, self.width, self.height, progress=self.report_progress, cancel=self.cancel_event
+            )
+            if image is not None and not image.save(self.path):
+                raise OSError("the image could not be written")
+            self.elapsed = time.perf_counter() - start
+            self.signals.finished.emit(image is None)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
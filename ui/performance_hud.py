@@ -0,0 +1,120 @@
+from PyQt6.QtCore import QRectF, Qt
+from PyQt6.QtGui import QColor, QFont, QFontMetrics, QPainter, QPen
+
+from utils.bounds import CachedBounds
+from utils.frame_stats import FrameStats
+from utils.tessellation_cache import tessellation_cache
+
+# Frame times of the sparkline thresholds: 60 and 30 frames per second
+FAST_FRAME_MS = 1000 / 60
+SLOW_FRAME_MS = 1000 / 30
+
+
+class PerformanceHud():
+    """
+    Overlay drawn in a corner of the canvas with the frame statistics: FPS, last frame
+    time, a sparkline of the recent frame times, objects and segments of the last frame
+    and the hit rates of the caches since the overlay was shown.
+    It only reads what FrameStats recorded, and is drawn after the frame is closed, so its
+    own drawing is never part of the measured frame.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.margin = 10
+        self.padding = 6
+        self.spark_height = 28
+        self.font = QFont("monospace", 8)
+        self.font.setStyleHint(QFont.StyleHint.Monospace)
+        self.reset()
+
+    def reset(self):
+        # Cache counters when the overlay was shown, so its rates cover only that period
+        self.bounds_start = (CachedBounds.hits, CachedBounds.misses)
+        self.tessellation_start = (tessellation_cache.hits, tessellation_cache.misses)
+
+    @staticmethod
+    def hit_rate(current: tuple[int, int], start: tuple[int, int]) -> str:
+        hits, misses = current[0] - start[0], current[1] - start[1]
+        if hits + misses == 0:
+            return "-"
+        return f"{hits / (hits + misses):.0%}"
+
+    @staticmethod
+    def fps(frames) -> float:
+        """
+        Frames started during the second before the last one started
+        """
+        last = frames[-1]["start"]
+        starts = [frame["start"] for frame in frames if frame["start"] >= last - 1.0]
+        if len(starts) < 2 or starts[-1] == starts[0]:
+            return 0.0
+        return (len(starts) - 1) / (starts[-1] - starts[0])
+
+    def lines(self, stats: FrameStats) -> list[str]:
+        if not stats.enabled:
+            return ["Frame timing off"]
+        if not stats.frames:
+            return ["No frames timed"]
+        last = stats.frames[-1]
+        counts = last["counts"]
+        return [
+            f"FPS {self.fps(stats.frames):5.1f}  frame {last['total_ms']:6.1f} ms",
+            f"Objects   {counts['visible']} / {counts['objects']} visible",
+            f"Segments  {counts['submitted']} submitted",
+            f"Cache     bounds {self.hit_rate((CachedBounds.hits, CachedBounds.misses), self.bounds_start)}"
+            f"  tess. {self.hit_rate((tessellation_cache.hits, tessellation_cache.misses), self.tessellation_start)}",
+        ]
+
+    def draw(self, painter: QPainter, stats: FrameStats, width: int):
+        """
+        Draws the overlay in the top right corner of a canvas width pixels wide
+        """
+        lines = self.lines(stats)
+        metrics = QFontMetrics(self.font)
+        line_height = metrics.height()
+        # At least 32 columns wide, so the panel does not jump as the numbers change
+        text_width = max(metrics.horizontalAdvance(line) for line in [*lines, "0" * 32])
+        spark = self.spark_height if stats.enabled and stats.frames else 0
+        panel = QRectF(
+            width - self.margin - text_width - 2 * self.padding,
+            self.margin,
+            text_width + 2 * self.padding,
+            len(lines) * line_height + spark + 2 * self.padding + (self.padding if spark else 0),
+        )
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(0, 0, 0, 170))
+        painter.drawRect(panel)
+        painter.setFont(self.font)
+        painter.setPen(QColor("white"))
+        x, y = panel.left() + self.padding, panel.top() + self.padding
+        for i, line in enumerate(lines):
+            painter.drawText(QRectF(x, y + i * line_height, text_width, line_height), Qt.AlignmentFlag.AlignLeft, line)
+        if spark:
+            self.draw_sparkline(painter, stats, QRectF(x, y + len(lines) * line_height + self.padding, text_width, spark))
+        painter.restore()
+
+    def draw_sparkline(self, painter: QPainter, stats: FrameStats, rect: QRectF):
+        """
+        One bar per recorded frame, scaled to the slowest one (at least a 30 FPS frame),
+        with a line at the time of a 60 FPS frame
+        """
+        totals = [frame["total_ms"] for frame in stats.frames]
+        scale = rect.height() / max(max(totals), SLOW_FRAME_MS)
+        bar = rect.width() / stats.history
+        left = rect.right() - bar * len(totals)
+        for i, total in enumerate(totals):
+            if total <= FAST_FRAME_MS:
+                color = QColor(80, 200, 120)
+            elif total <= SLOW_FRAME_MS:
+                color = QColor(230, 190, 60)
+            else:
+                color = QColor(230, 80, 70)
+            height = max(total * scale, 1.0)
+            painter.fillRect(QRectF(left + i * bar, rect.bottom() - height, max(bar - 0.5, 0.5), height), color)
+        painter.setPen(QPen(QColor(255, 255, 255, 120), 1, Qt.PenStyle.DotLine))
+        target = rect.bottom() - FAST_FRAME_MS * scale
+        painter.drawLine(int(rect.left()), int(target), int(rect.right()), int(target))
@@ -0,0 +1,47 @@
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+from PyQt6.QtGui import QImage
+
+
+class RenderTaskSignals(QObject):
+    """
+    Signals of a RenderTask. They are emitted from the worker thread and
+    delivered to the GUI thread through queued connections.
+    """
+
+    # Frame number, rendered image and the messages logged while drawing
+    finished = pyqtSignal(int, QImage, list)
+
+
+class RenderTask(QRunnable):
+    """
+    Draws a frame snapshot into a QImage on a QThreadPool worker, so the
+    window keeps responding while heavy frames are drawn.
+    """
+
+    def __init__(self, frame: int, snapshot):
+        super().__init__()
+        self.frame = frame
+        self.snapshot = snapshot
+        self.signals = RenderTaskSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def run(self):
+        snapshot = self.snapshot
+        image = snapshot.render(self.is_cancelled)
+
+        # A cancelled frame is stale, so it is never shown
+        if self.is_cancelled():
+            return
+        try:
+            self.signals.finished.emit(self.frame, image, snapshot.messages)
+        except RuntimeError:
+            # The canvas was destroyed while the frame was drawn
+            pass
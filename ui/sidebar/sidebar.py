@@ -1,3 +1,4 @@
+from PyQt6.QtCore import QThreadPool
 from PyQt6.QtGui import QColor, QPalette
 from PyQt6.QtWidgets import QCheckBox, QFileDialog, QRadioButton, QAbstractItemView
 from PyQt6.QtWidgets import (
@@ -12,6 +13,7 @@ from PyQt6.QtWidgets import (
     QHBoxLayout,
     QListWidget,
     QListWidgetItem,
+    QProgressBar,
 )
 
 from models.wireframe import Wireframe
@@ -22,7 +24,10 @@ from models.surface_BSpline import SurfaceBSplineFD
 from ui.canvas import Canvas
 from ui.color import Color
 from ui.console import Console
+from ui.file_task import CaptureTask, FileTask
 from ui.sidebar.transformation_window import TransformationWindow
+from utils.descritorOBJ import DescritorOBJ
+from utils.profiler import OPERATIONS, profiler
 from utils.types import ObjectType
 
 
@@ -33,6 +38,7 @@ class SideBar(QWidget):
         self.console = console
         self.tw = None
         self.add_obj_w = None
+        self.file_task = None
         self.setAutoFillBackground(True)
 
         # Set background color
@@ -149,12 +155,20 @@ class SideBar(QWidget):
             item = QListWidgetItem(obj.name)
             self.obj_list.addItem(item)
         self.obj_list_layout.addWidget(self.obj_list)
+        # Objects picked on the canvas and selected in the list are kept in sync
+        self.obj_list.itemSelectionChanged.connect(self.list_selection_changed)
+        self.canvas.selection_changed.connect(self.select_in_list)
 
         # Remove object button
         self.rmv_obj_btn = QPushButton("Remove Object")
         self.rmv_obj_btn.clicked.connect(self.remove_object)
         self.obj_list_layout.addWidget(self.rmv_obj_btn)
 
+        # Applies the chosen color and fill option to the selected objects
+        self.apply_color_btn = QPushButton("Apply Color and Fill")
+        self.apply_color_btn.clicked.connect(self.apply_color)
+        self.obj_list_layout.addWidget(self.apply_color_btn)
+
         # Clear all button
         self.clear_btn = QPushButton("Clear All")
         self.obj_list_layout.addWidget(self.clear_btn)
@@ -164,11 +178,51 @@ class SideBar(QWidget):
         self.export_btn.clicked.connect(self.export_objects)
         self.obj_list_layout.addWidget(self.export_btn)
 
+        # Export scene (native binary format)
+        self.export_scene_btn = QPushButton("Export Scene")
+        self.export_scene_btn.clicked.connect(self.export_scene)
+        self.obj_list_layout.addWidget(self.export_scene_btn)
+
+        # High resolution capture of the canvas, rendered in tiles by worker processes
+        self.capture_btn = QPushButton("Capture 8K Image")
+        self.capture_btn.clicked.connect(self.capture_image)
+        self.obj_list_layout.addWidget(self.capture_btn)
+
+        # Merges coincident vertices and duplicate edges of new 3D wireframes
+        self.weld_checkbox = QCheckBox("Weld Vertices")
+        self.obj_list_layout.addWidget(self.weld_checkbox)
+        self.weld_epsilon = 1e-6
+
         # Import objects
         self.import_btn = QPushButton("Import File")
         self.import_btn.clicked.connect(self.import_objects)
         self.obj_list_layout.addWidget(self.import_btn)
 
+        # Stream a scene file around the window instead of importing all of it
+        self.stream_scene_btn = QPushButton("Stream Scene")
+        self.stream_scene_btn.clicked.connect(self.stream_scene)
+        self.obj_list_layout.addWidget(self.stream_scene_btn)
+        self.canvas.objects_changed.connect(self.update_object_list)
+
+        # Session journal
+        session_layout = QHBoxLayout()
+        self.save_session_btn = QPushButton("Save Session")
+        self.save_session_btn.clicked.connect(self.save_session)
+        self.recover_session_btn = QPushButton("Recover Session")
+        self.recover_session_btn.clicked.connect(self.recover_session)
+        session_layout.addWidget(self.save_session_btn)
+        session_layout.addWidget(self.recover_session_btn)
+        self.obj_list_layout.addLayout(session_layout)
+
+        # Progress of the background import/export
+        self.file_progress = QProgressBar()
+        self.file_progress.setVisible(False)
+        self.obj_list_layout.addWidget(self.file_progress)
+        self.cancel_file_btn = QPushButton("Cancel")
+        self.cancel_file_btn.clicked.connect(self.cancel_file_task)
+        self.cancel_file_btn.setVisible(False)
+        self.obj_list_layout.addWidget(self.cancel_file_btn)
+
         self.obj_list_group.setLayout(self.obj_list_layout)
         layout.addWidget(self.obj_list_group)
 
@@ -223,9 +277,61 @@ class SideBar(QWidget):
         self.options_layout.addWidget(self.see_curve_points_label)
         self.options_layout.addWidget(self.see_curve_points_checkbox)
 
+        # Progressive rendering of large scenes
+        self.progressive_checkbox = QCheckBox("Progressive Rendering")
+        self.progressive_checkbox.toggled.connect(self.progressive_toggled)
+        self.options_layout.addWidget(self.progressive_checkbox)
+
+        # Rendering on a background thread
+        self.threaded_checkbox = QCheckBox("Background Rendering")
+        self.threaded_checkbox.toggled.connect(self.threaded_toggled)
+        self.options_layout.addWidget(self.threaded_checkbox)
+
+        # Surface tessellation on worker processes
+        self.parallel_tessellation_checkbox = QCheckBox("Parallel Tessellation")
+        self.parallel_tessellation_checkbox.toggled.connect(self.parallel_tessellation_toggled)
+        self.options_layout.addWidget(self.parallel_tessellation_checkbox)
+
+        # Per-stage timing of the frames, reported on the console when turned off
+        self.frame_timing_checkbox = QCheckBox("Frame Timing")
+        self.frame_timing_checkbox.toggled.connect(self.frame_timing_toggled)
+        self.options_layout.addWidget(self.frame_timing_checkbox)
+
+        # Overlay with the frame statistics, which turns frame timing on
+        self.hud_checkbox = QCheckBox("Performance HUD")
+        self.hud_checkbox.toggled.connect(self.hud_toggled)
+        self.options_layout.addWidget(self.hud_checkbox)
+
         self.options_group.setLayout(self.options_layout)
         layout.addWidget(self.options_group)
 
+        # cProfile runs written under profiles/, as .prof files and text summaries
+        self.profiling_group = QGroupBox("Profiling")
+        self.profiling_layout = QVBoxLayout()
+
+        self.profile_memory_checkbox = QCheckBox("Trace Memory")
+        self.profile_memory_checkbox.toggled.connect(self.profile_memory_toggled)
+        self.profiling_layout.addWidget(self.profile_memory_checkbox)
+
+        # Each import, export and surface generation is profiled on its own
+        self.profile_operations_checkbox = QCheckBox("Profile Operations")
+        self.profile_operations_checkbox.toggled.connect(self.profile_operations_toggled)
+        self.profiling_layout.addWidget(self.profile_operations_checkbox)
+
+        self.profile_frame_count = 30
+        self.profile_frames_btn = QPushButton(f"Profile {self.profile_frame_count} Frames")
+        self.profile_frames_btn.clicked.connect(self.profile_frames)
+        self.profiling_layout.addWidget(self.profile_frames_btn)
+
+        # Profiles everything done on the interface thread until stopped
+        self.profile_btn = QPushButton("Start Profiling")
+        self.profile_btn.setCheckable(True)
+        self.profile_btn.toggled.connect(self.profile_toggled)
+        self.profiling_layout.addWidget(self.profile_btn)
+
+        self.profiling_group.setLayout(self.profiling_layout)
+        layout.addWidget(self.profiling_group)
+
         # Projection selection
         self.projection_group = QGroupBox("Projection")
         self.projection_layout = QVBoxLayout()
@@ -456,7 +562,11 @@ class SideBar(QWidget):
                     points.append(Point3D(coord))
                 if len(edges) == 2 and type(edges[0]) != tuple:
                     edges = [edges]
-                new_obj = Wireframe_3D(name, obj_type, points, edges)
+                new_obj = Wireframe_3D(name, obj_type, points, edges, weld_epsilon=self.get_weld_epsilon())
+                if any(new_obj.welded):
+                    self.console.log(
+                        f"Welding removed {new_obj.welded[0]} vertices and {new_obj.welded[1]} edges"
+                    )
             new_obj.set_color(self.selected_color)  # Apply selected color
             new_obj.set_fill(self.fill_checkbox.isChecked())  # Apply fill option
             try:
@@ -466,6 +576,7 @@ class SideBar(QWidget):
                 self.canvas.add_object(new_obj)
                 self.console.log(f"Added {type_str.lower()}: {name}")
                 self.obj_list.addItem(QListWidgetItem(name))
+                self.canvas.log_profiles()
             except ValueError:
                 self.console.log(f"Error adding object, object {name} already exists")
 
@@ -477,10 +588,24 @@ class SideBar(QWidget):
             self.console.log("Error: failed to give an object type to the object")
 
     def update_object_list(self):
+        self.obj_list.blockSignals(True)
         self.obj_list.clear()
         for obj in self.canvas.objects:
             item = QListWidgetItem(obj.name)
             self.obj_list.addItem(item)
+            item.setSelected(obj.is_selected)
+        self.obj_list.blockSignals(False)
+
+    def list_selection_changed(self):
+        self.canvas.set_selection([item.text() for item in self.obj_list.selectedItems()])
+
+    def select_in_list(self, names: list):
+        names = set(names)
+        self.obj_list.blockSignals(True)
+        for row in range(self.obj_list.count()):
+            item = self.obj_list.item(row)
+            item.setSelected(item.text() in names)
+        self.obj_list.blockSignals(False)
 
     def remove_object(self):
         selected_items = self.obj_list.selectedItems()
@@ -493,6 +618,22 @@ class SideBar(QWidget):
             self.obj_list.takeItem(self.obj_list.row(item))
             self.console.log(f"Removed object: {name}")
 
+    def apply_color(self):
+        selected_items = self.obj_list.selectedItems()
+        if not selected_items:
+            self.console.log("Error: No object selected.")
+            return
+        fill = self.fill_checkbox.isChecked()
+        for item in selected_items:
+            obj = self.canvas.find_object(item.text())
+            if obj is None:
+                continue
+            self.canvas.set_object_color(obj, self.selected_color)
+            self.canvas.set_object_fill(obj, fill)
+            self.console.log(
+                f"Set {obj.name} to {self.selected_color.name()}, {'filled' if fill else 'not filled'}"
+            )
+
     def show_transformations_window(self):
         self.tw = TransformationWindow(self.canvas, self.console, self.obj_list)
         self.tw.show()
@@ -531,27 +672,156 @@ class SideBar(QWidget):
             return
 
     def export_objects(self):
-        if len(self.canvas.objects) > 0:
+        # While a scene is streamed, its objects that are not resident are exported too
+        objects = self.canvas.all_objects()
+        if len(objects) > 0:
             self.console.log("Exporting objects")
-            self.canvas.export_objects()
+            self.start_file_task(FileTask("export", "files/export.obj", objects))
         else:
             self.console.log("No objects to be exported.")
 
+    def export_scene(self):
+        objects = self.canvas.all_objects()
+        if len(objects) > 0:
+            self.console.log("Exporting scene")
+            self.start_file_task(FileTask("export", "files/export.scene", objects))
+        else:
+            self.console.log("No objects to be exported.")
+
+    def capture_image(self):
+        self.console.log("Rendering 7680x4320 capture")
+        self.start_file_task(CaptureTask(self.canvas.snapshot(), "files/capture.png", 7680, 4320))
+
     def import_objects(self):
         file_dialog = QFileDialog(self)
         file_dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
-        file_dialog.setNameFilter("Wavefront Files (*.obj);;All Files (*)")
+        file_dialog.setNameFilter(
+            "Wavefront Files (*.obj);;Scene Files (*.scene);;All Files (*)"
+        )
 
         if file_dialog.exec():
             selected_file = file_dialog.selectedFiles()[0]
-            if selected_file.endswith(".obj"):
-                self.canvas.import_objects(
-                    selected_file, self.fill_checkbox.isChecked()
+            if selected_file.endswith(".obj") or selected_file.endswith(".scene"):
+                self.console.log(f"Importing objects from {selected_file}")
+                self.start_file_task(
+                    FileTask(
+                        "import",
+                        selected_file,
+                        fill=self.fill_checkbox.isChecked(),
+                        weld_epsilon=self.get_weld_epsilon(),
+                    )
                 )
-                self.console.log(f"Imported objects from {selected_file}")
-                self.update_object_list()
             else:
-                self.console.log("Error: Selected file is not a .obj file.")
+                self.console.log("Error: Selected file is not a .obj or .scene file.")
+
+    def stream_scene(self):
+        file_dialog = QFileDialog(self)
+        file_dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
+        file_dialog.setNameFilter("Scene Files (*.scene)")
+
+        if file_dialog.exec():
+            selected_file = file_dialog.selectedFiles()[0]
+            try:
+                self.canvas.open_scene(selected_file)
+            except (OSError, ValueError) as e:
+                self.console.log(f"Error: could not stream {selected_file}: {e}")
+                return
+            self.console.log(
+                f"Streaming {selected_file} ({len(self.canvas.scene_stream.scene.table)} objects"
+                f" in {len(self.canvas.scene_stream.scene.chunks)} chunks)"
+            )
+
+    def get_weld_epsilon(self) -> float | None:
+        return self.weld_epsilon if self.weld_checkbox.isChecked() else None
+
+    def save_session(self):
+        pending = self.canvas.save_session()
+        self.console.log(f"Session saved ({pending} changes since the last snapshot)")
+
+    def recover_session(self):
+        try:
+            replayed = self.canvas.recover_session()
+        except (OSError, ValueError) as e:
+            self.console.log(f"Error: could not recover the previous session: {e}")
+            return
+        self.update_object_list()
+        self.console.log(
+            f"Recovered {len(self.canvas.objects)} objects ({replayed} changes replayed)"
+        )
+
+    def start_file_task(self, task: FileTask):
+        """
+        Runs an import/export or a capture on the thread pool, showing its progress
+        """
+        if self.file_task is not None:
+            self.console.log("Error: Another file operation is still running.")
+            return
+        self.file_task = task
+        task.signals.progress.connect(self.file_task_progress)
+        task.signals.batch.connect(self.file_task_batch)
+        task.signals.finished.connect(self.file_task_finished)
+        task.signals.failed.connect(self.file_task_failed)
+        self.file_progress.setValue(0)
+        self.file_progress.setVisible(True)
+        self.cancel_file_btn.setVisible(True)
+        self.import_btn.setEnabled(False)
+        self.export_btn.setEnabled(False)
+        self.export_scene_btn.setEnabled(False)
+        self.capture_btn.setEnabled(False)
+        if task.operation == "import":
+            self.canvas.begin_import(task.path, task.fill, task.weld_epsilon)
+        QThreadPool.globalInstance().start(task)
+
+    def cancel_file_task(self):
+        if self.file_task is not None:
+            self.file_task.cancel()
+            self.console.log("Cancelling file operation")
+
+    def file_task_progress(self, done: int, total: int):
+        self.file_progress.setMaximum(total)
+        self.file_progress.setValue(done)
+
+    def file_task_batch(self, objects: list):
+        for obj in self.canvas.add_objects(objects, record=False):
+            self.obj_list.addItem(QListWidgetItem(obj.name))
+
+    def file_task_finished(self, cancelled: bool):
+        task = self.end_file_task()
+        if cancelled:
+            self.console.log(f"{task.operation.capitalize()} of {task.path} cancelled")
+        elif task.operation == "import":
+            self.console.log(f"Imported {task.emitted} objects from {task.path}")
+            if task.weld_epsilon is not None and isinstance(task.descritor, DescritorOBJ):
+                self.console.log(
+                    f"Welding removed {task.descritor.removed_vertices} vertices"
+                    f" and {task.descritor.removed_edges} edges"
+                )
+        elif task.operation == "capture":
+            self.console.log(f"Capture saved to {task.path} ({task.elapsed:.1f}s)")
+        else:
+            self.console.log(f"Exported {len(task.objects)} objects to {task.path}")
+        self.canvas.log_profiles()
+
+    def file_task_failed(self, message: str):
+        task = self.end_file_task()
+        self.console.log(f"Error: could not {task.operation} {task.path}: {message}")
+        self.canvas.log_profiles()
+
+    def end_file_task(self) -> FileTask:
+        task = self.file_task
+        self.file_task = None
+        if task.operation == "capture":
+            for message in task.snapshot.messages:
+                self.console.log(message)
+        if task.operation == "import":
+            self.canvas.end_import(task.emitted)
+        self.file_progress.setVisible(False)
+        self.cancel_file_btn.setVisible(False)
+        self.import_btn.setEnabled(True)
+        self.export_btn.setEnabled(True)
+        self.export_scene_btn.setEnabled(True)
+        self.capture_btn.setEnabled(True)
+        return task
 
     def set_line_clipping_algorithm(self, checked):
         line_clipping_algorithm = self.sender()
@@ -573,6 +843,85 @@ class SideBar(QWidget):
         else:
             self.console.log("Fill color option disabled")
 
+    def progressive_toggled(self, checked):
+        self.canvas.set_progressive(checked)
+        if checked:
+            self.console.log(f"Progressive rendering on, {self.canvas.frame_budget:g} ms per slice")
+        else:
+            self.console.log("Progressive rendering off")
+
+    def threaded_toggled(self, checked):
+        self.canvas.set_threaded(checked)
+        if checked:
+            self.console.log("Background rendering on")
+        else:
+            self.console.log("Background rendering off")
+
+    def parallel_tessellation_toggled(self, checked):
+        self.canvas.set_parallel_tessellation(checked)
+        if checked:
+            self.console.log("Tessellating surfaces on worker processes")
+        else:
+            self.console.log("Tessellating surfaces on the main thread")
+
+    def frame_timing_toggled(self, checked):
+        if checked:
+            self.canvas.set_frame_timing(True)
+            self.console.log("Timing frames")
+        else:
+            self.console.log(self.canvas.frame_stats.report())
+            self.canvas.set_frame_timing(False)
+            self.hud_checkbox.setChecked(False)
+
+    def hud_toggled(self, checked):
+        if checked:
+            self.frame_timing_checkbox.setChecked(True)
+            self.console.log("Showing performance HUD")
+        else:
+            self.console.log("Hiding performance HUD")
+        self.canvas.set_hud(checked)
+
+    def profile_memory_toggled(self, checked):
+        profiler.memory = checked
+        if checked:
+            self.console.log("Profiles will trace memory allocations")
+        else:
+            self.console.log("Profiles will not trace memory allocations")
+
+    def profile_operations_toggled(self, checked):
+        profiler.operations = set(OPERATIONS) if checked else set()
+        if checked:
+            self.console.log(f"Profiling each {', '.join(OPERATIONS)} operation")
+        else:
+            self.console.log("Stopped profiling operations")
+
+    def profile_frames(self):
+        try:
+            profiler.profile_frames(self.profile_frame_count)
+        except RuntimeError as e:
+            self.console.log(f"Error: {e}")
+            return
+        self.console.log(f"Profiling the next {self.profile_frame_count} frames")
+        self.canvas.update()
+
+    def profile_toggled(self, checked):
+        if checked:
+            try:
+                profiler.start("session")
+            except RuntimeError as e:
+                self.console.log(f"Error: {e}")
+                self.profile_btn.blockSignals(True)
+                self.profile_btn.setChecked(False)
+                self.profile_btn.blockSignals(False)
+                return
+            self.profile_btn.setText("Stop Profiling")
+            self.console.log("Profiling started")
+        else:
+            self.profile_btn.setText("Start Profiling")
+            if profiler.running and profiler.session.label == "session":
+                profiler.stop()
+            self.canvas.log_profiles()
+
     def see_curve_points_toggled(self, checked):
         self.canvas.show_control_points = checked
         self.canvas.update()
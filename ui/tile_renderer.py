@@ -0,0 +1,256 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+
+import numpy as np
+from PyQt6 import sip
+from PyQt6.QtCore import QLineF, QRect, Qt
+from PyQt6.QtGui import QBrush, QColor, QImage, QPainter, QPen
+
+from ui.canvas import Canvas
+
+# Tiles are clipped this many pixels beyond their bounds, so antialiased lines crossing
+# a border are drawn the same way on both sides of it
+TILE_MARGIN = 2
+
+
+class RecordingPainter():
+    """
+    Stands in for a QPainter while the canvas draws a frame, keeping what would be drawn
+    as primitives in viewport coordinates: (kind, (pen rgba, pen width), brush rgba or
+    None, data). Consecutive lines with the same pen are kept as a single primitive.
+    """
+
+    def __init__(self):
+        self.primitives: list = []
+        self.current_pen = (QColor("black").rgba(), 1)
+        self.current_brush = QBrush()
+
+    def setRenderHint(self, hint, on: bool = True):
+        pass
+
+    def setPen(self, pen: QPen):
+        self.current_pen = (pen.color().rgba(), pen.width())
+
+    def setBrush(self, brush):
+        self.current_brush = QBrush(brush)
+
+    def brush(self) -> QBrush:
+        return self.current_brush
+
+    def record(self, kind: str, data):
+        brush = None
+        if self.current_brush.style() != Qt.BrushStyle.NoBrush:
+            brush = self.current_brush.color().rgba()
+        self.primitives.append((kind, self.current_pen, brush, data))
+
+    def drawLine(self, x1, y1, x2, y2):
+        last = self.primitives[-1] if self.primitives else None
+        if last is not None and last[0] == "lines" and last[1] == self.current_pen:
+            last[3].append((x1, y1, x2, y2))
+        else:
+            self.record("lines", [(x1, y1, x2, y2)])
+
+    def drawLines(self, lines: list):
+        for line in lines:
+            self.drawLine(line.x1(), line.y1(), line.x2(), line.y2())
+
+    def drawPolygon(self, *points):
+        self.record("polygon", np.array([(point.x(), point.y()) for point in points], dtype=np.float64))
+
+    def drawEllipse(self, x, y, width, height):
+        self.record("ellipse", (x, y, width, height))
+
+    def drawRect(self, x, y, width, height):
+        self.record("rect", (x, y, width, height))
+
+    def finish(self) -> tuple[list, np.ndarray]:
+        """
+        Returns the primitives, with their line lists as (n, 4) arrays, and their
+        (n, 4) xmin, ymin, xmax, ymax bounds grown by the pen width
+        """
+        primitives = []
+        bounds = np.zeros((len(self.primitives), 4))
+        for i, (kind, pen, brush, data) in enumerate(self.primitives):
+            if kind == "lines":
+                data = np.array(data, dtype=np.float64).reshape(-1, 4)
+                xs, ys = data[:, [0, 2]], data[:, [1, 3]]
+                box = (xs.min(), ys.min(), xs.max(), ys.max())
+            elif kind == "polygon":
+                box = (*data.min(axis=0), *data.max(axis=0))
+            else:
+                x, y, width, height = data
+                box = (x, y, x + width, y + height)
+            bounds[i] = box
+            bounds[i, :2] -= pen[1]
+            bounds[i, 2:] += pen[1]
+            primitives.append((kind, pen, brush, data))
+        return primitives, bounds
+
+
+class TileClipper():
+    """
+    Clips to the bounds of a tile with the line and polygon clipping algorithms of the
+    Canvas. Polygons are given in viewport coordinates, so transform_coords is the identity.
+    """
+
+    line_clipping = Canvas.line_clipping
+    cohen_sutherland = Canvas.cohen_sutherland
+    cohen_sutherland_point = Canvas.cohen_sutherland_point
+    cohen_sutherland_redraw = Canvas.cohen_sutherland_redraw
+    liang_barsky = Canvas.liang_barsky
+    sutherland_hodgman = Canvas.sutherland_hodgman
+    sutherland_hogdman_inside = Canvas.sutherland_hogdman_inside
+    sutherland_hodgman_redraw = Canvas.sutherland_hodgman_redraw
+
+    def __init__(self, bounds: tuple, line_clipping_algorithm: str):
+        self.viewport_xmin, self.viewport_ymin, self.viewport_xmax, self.viewport_ymax = bounds
+        self.line_clipping_algorithm = line_clipping_algorithm
+        self.trivially_accepted = False
+
+    def transform_coords(self, x, y):
+        return x, y
+
+
+def render_tile(task: tuple):
+    """
+    Draws the primitives of a tile straight into the shared image buffer.
+    Runs on a worker process; only the pixels of the tile are written.
+    """
+    name, width, height, tile, algorithm, primitives = task
+    x0, y0, x1, y1 = tile
+    buffer = shared_memory.SharedMemory(name)
+    pixels = np.ndarray((height, width, 4), dtype=np.uint8, buffer=buffer.buf)
+    image = QImage(sip.voidptr(pixels.ctypes.data), width, height, width * 4, QImage.Format.Format_RGBA8888_Premultiplied)
+
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setClipRect(QRect(x0, y0, x1 - x0, y1 - y0))
+    bounds = (x0 - TILE_MARGIN, y0 - TILE_MARGIN, x1 + TILE_MARGIN, y1 + TILE_MARGIN)
+    clipper = TileClipper(bounds, algorithm)
+
+    for kind, (color, pen_width), brush, data in primitives:
+        pen = QPen(QColor.fromRgba(color))
+        pen.setWidth(pen_width)
+        painter.setPen(pen)
+        painter.setBrush(QColor.fromRgba(brush) if brush is not None else Qt.BrushStyle.NoBrush)
+        if kind == "lines":
+            # Lines away from the tile are skipped before running the clipping algorithm on each one
+            near = (
+                (np.minimum(data[:, 0], data[:, 2]) <= bounds[2])
+                & (np.maximum(data[:, 0], data[:, 2]) >= bounds[0])
+                & (np.minimum(data[:, 1], data[:, 3]) <= bounds[3])
+                & (np.maximum(data[:, 1], data[:, 3]) >= bounds[1])
+            )
+            for line in data[near].tolist():
+                # The clipping algorithm decides whether a line crosses the tile, but the
+                # whole line is drawn, as the antialiasing of a clipped one steps differently
+                if clipper.line_clipping(*line):
+                    painter.drawLine(QLineF(*line))
+        elif kind == "polygon":
+            clipper.sutherland_hodgman(painter, SimpleNamespace(coordinates=data.tolist()))
+        elif kind == "ellipse":
+            painter.drawEllipse(*data)
+        elif kind == "rect":
+            painter.drawRect(*data)
+    painter.end()
+
+    del image, pixels
+    buffer.close()
+
+
+def render_tiles(
+    canvas: Canvas,
+    width: int,
+    height: int,
+    tile_size: int = 512,
+    processes: int | None = None,
+    progress=None,
+    cancel=None,
+) -> QImage | None:
+    """
+    Renders the canvas scene at width x height, split into tiles drawn by worker processes
+    into a single shared RGBA buffer. See render_snapshot_tiles.
+    """
+    snapshot = canvas.snapshot()
+    image = render_snapshot_tiles(snapshot, width, height, tile_size, processes, progress, cancel)
+    for message in snapshot.messages:
+        canvas.console.log(message)
+    return image
+
+
+def render_snapshot_tiles(
+    snapshot,
+    width: int,
+    height: int,
+    tile_size: int = 512,
+    processes: int | None = None,
+    progress=None,
+    cancel=None,
+) -> QImage | None:
+    """
+    Renders a frame snapshot of the canvas at width x height. The frame is first drawn by
+    the canvas code into primitives, which are then sent to the tiles they overlap.
+    Can run off the GUI thread; progress(done, total) is called as the tiles are drawn,
+    and None is returned if the cancel event is set before the last tile.
+    """
+    snapshot.resize(width, height)
+    recorder = RecordingPainter()
+    snapshot.draw_border(recorder)
+    for obj, inside in zip(snapshot.objects, snapshot.inside):
+        snapshot.draw_object(recorder, obj, inside)
+    primitives, bounds = recorder.finish()
+
+    processes = processes or os.cpu_count() or 1
+    buffer = shared_memory.SharedMemory(create=True, size=width * height * 4)
+    try:
+        pixels = np.ndarray((height, width, 4), dtype=np.uint8, buffer=buffer.buf)
+        background = snapshot.background
+        pixels[:] = (background.red(), background.green(), background.blue(), background.alpha())
+
+        tasks = []
+        margin = TILE_MARGIN + 1
+        for y0 in range(0, height, tile_size):
+            for x0 in range(0, width, tile_size):
+                x1, y1 = min(x0 + tile_size, width), min(y0 + tile_size, height)
+                overlaps = (
+                    (bounds[:, 0] <= x1 + margin)
+                    & (bounds[:, 2] >= x0 - margin)
+                    & (bounds[:, 1] <= y1 + margin)
+                    & (bounds[:, 3] >= y0 - margin)
+                )
+                tile_primitives = [primitives[i] for i in np.flatnonzero(overlaps)]
+                if tile_primitives:
+                    tasks.append((buffer.name, width, height, (x0, y0, x1, y1), snapshot.line_clipping_algorithm, tile_primitives))
+
+        if processes == 1 or len(tasks) <= 1:
+            complete = drawn_tiles((render_tile(task) for task in tasks), len(tasks), progress, cancel)
+        else:
+            # Leaving the pool terminates the workers, so a cancelled capture stops right away
+            with multiprocessing.get_context("spawn").Pool(processes) as pool:
+                complete = drawn_tiles(pool.imap_unordered(render_tile, tasks), len(tasks), progress, cancel)
+
+        # The only copy of the picture, out of the shared buffer before it is released
+        image = None
+        if complete:
+            image = QImage(
+                sip.voidptr(pixels.ctypes.data), width, height, width * 4, QImage.Format.Format_RGBA8888_Premultiplied
+            ).copy()
+        del pixels
+    finally:
+        buffer.close()
+        buffer.unlink()
+    return image
+
+
+def drawn_tiles(drawn, total: int, progress=None, cancel=None) -> bool:
+    """
+    Waits for the tiles being drawn, reporting the progress. Returns False if cancelled.
+    """
+    for done, _ in enumerate(drawn, 1):
+        if cancel is not None and cancel.is_set():
+            return False
+        if progress is not None:
+            progress(done, total)
+    return cancel is None or not cancel.is_set()
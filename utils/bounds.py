@@ -0,0 +1,54 @@
+import numpy as np
+
+from utils.types import ObjectType
+
+# Types drawn on the z = 1 plane by the canvas
+FLAT_TYPES = {
+    ObjectType.DOT.value,
+    ObjectType.LINE.value,
+    ObjectType.POLYGON.value,
+    ObjectType.CURVE.value,
+    ObjectType.CURVE_BSPLINE.value,
+}
+
+
+def object_bounds(vertices: np.ndarray, obj_type: int) -> np.ndarray:
+    """
+    Returns (xmin, ymin, zmin, xmax, ymax, zmax) of an object's vertices as the canvas
+    draws them. Curves and surfaces lie inside the hull of their control points.
+    """
+    if len(vertices) == 0:
+        return np.zeros(6)
+    vertices = np.asarray(vertices, dtype=np.float64)
+    bounds = np.concatenate([vertices.min(axis=0), vertices.max(axis=0)])
+    if obj_type in FLAT_TYPES:
+        bounds[[2, 5]] = 1.0
+    return bounds
+
+
+class CachedBounds():
+    """
+    Bounding box of an object, recomputed only when the geometry it was
+    computed from is replaced. The models replace their coordinate arrays
+    and lists on every transformation, so an identity check is enough.
+    """
+
+    # Lookups answered from the cache and recomputed, over all objects
+    hits = 0
+    misses = 0
+
+    def __init__(self):
+        self.source = None
+        self.bounds = np.zeros(6)
+
+    def get(self, source, obj_type: ObjectType, columns: int = 3) -> np.ndarray:
+        if source is not self.source:
+            CachedBounds.misses += 1
+            vertices = np.asarray(source, dtype=np.float64).reshape(-1, columns)
+            if columns == 2:
+                vertices = np.hstack([vertices, np.ones((len(vertices), 1))])
+            self.bounds = object_bounds(vertices, obj_type.value)
+            self.source = source
+        else:
+            CachedBounds.hits += 1
+        return self.bounds
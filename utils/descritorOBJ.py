@@ -1,154 +1,184 @@
-from operator import is_
+import bisect
+import functools
+import mmap
+import multiprocessing
+import os
+import re
+import warnings
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from PyQt6.QtGui import QColor
 
 from models.wireframe import Wireframe
 from models.wireframe_3d import Wireframe_3D
-from models.point_3d import Point3D
 from models.surface_3d import Surface3D
 from models.surface_BSpline import SurfaceBSplineFD
+from utils.profiler import profiled
 from utils.types import ObjectType
 
 
 class DescritorOBJ():
     def __init__(self):
         self.objs = []
+        # Files smaller than this are always parsed in the calling process
+        self.parallel_min_size = 16 * 1024 * 1024
+        self.workers = os.cpu_count() or 1
+        # Parsed files are cached in a "<file>.cache.npz" sidecar next to them
+        self.use_sidecar = True
+        # When set, imported 3D wireframes are welded with this epsilon
+        self.weld_epsilon: float | None = None
+        self.removed_vertices = 0
+        self.removed_edges = 0
 
-    def export_file(self):
-        f = open("files/export.obj", "w")
-        f.write("#Sistema Gráfico Alfeu e Caio\n")
-        f.write("mtllib material.mtl\n\n")
-        for obj in self.objs:
-            f.write(f"o {obj.get_name().replace(' ', '_')}\n")
+    @profiled("export")
+    def export_file(self, path: str = "files/export.obj", progress=None, cancel=None) -> bool:
+        """
+        Writes the objects to an OBJ file.
+        progress(done, total) is called after each object, and setting the
+        cancel event stops the export before anything is written.
+        Returns whether the file was written.
+        """
+        names = color_names()
+        used_materials = {}
+        parts = ["#Sistema Gráfico Alfeu e Caio\n", "mtllib material.mtl\n\n"]
+        for i, obj in enumerate(self.objs):
+            if cancel is not None and cancel.is_set():
+                return False
+            parts.append(f"o {obj.get_name().replace(' ', '_')}\n")
             color = obj.get_color()
-            color_name = next((name for name in QColor.colorNames() if QColor(name).name() == color), color)
+            color_name = names.get(color, color)
+            used_materials[color_name] = color
             if isinstance(obj, Wireframe):
                 coordinates = obj.export_coordinates()
-                for coordinate in coordinates:
-                    f.write("v ")
-                    x, y = coordinate
-                    f.write(f"{x:.6f} {y:.6f} ")
-                    f.write("0.000000\n")
-                f.write(f"usemtl {color_name}\n")
+                vertices = np.zeros((len(coordinates), 3))
+                vertices[:, :2] = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+                parts.append(format_vertices(vertices))
+                parts.append(f"usemtl {color_name}\n")
                 if obj.get_obj_type().name == "DOT":
-                    f.write("p ")
+                    parts.append("p ")
                 elif obj.get_obj_type().name == "POLYGON":
-                    f.write("f ")
+                    parts.append("f ")
                 elif obj.get_obj_type().name == "CURVE":
-                    f.write("c ")
+                    parts.append("c ")
                 elif obj.get_obj_type().name == "CURVE_BSPLINE":
-                    f.write("b ")
+                    parts.append("b ")
                 else:
-                    f.write("l ")
-                counter = len(coordinates)
-                for c in coordinates:
-                    f.write(f"-{counter} ")
-                    counter -= 1
+                    parts.append("l ")
+                parts.append("".join(f"-{counter} " for counter in range(len(coordinates), 0, -1)))
             elif isinstance(obj, Wireframe_3D):
-                points = obj.export_coordinates()
-                edges = obj.get_edges()
-                for point in points:
-                   x, y, z = point.get_coordinates()
-                   f.write(f"v {x:.6f} {y:.6f} {z:.6f}\n")
-                f.write(f"usemtl {color_name}\n")
-                for edge in edges:
-                    f.write(f"l {edge[0]} {edge[1]}\n")
+                edges = np.asarray(obj.get_edges()).reshape(-1, 2).astype(np.int64)
+                parts.append(format_vertices(obj.vertices))
+                parts.append(f"usemtl {color_name}\n")
+                parts.append(("l %d %d\n" * len(edges)) % tuple(edges.ravel().tolist()))
             elif isinstance(obj, Surface3D):
                 points = obj.get_control_points_flat()
-                for point in points:
-                    coords = point.get_coordinates()
-                    if isinstance(coords, list):
-                        x, y, z = coords[0]
-                    else:
-                        x, y, z = coords
-                    f.write(f"v {x:.6f} {y:.6f} {z:.6f}\n")
-                f.write(f"usemtl {color_name}\n")
+                parts.append(format_vertices(np.array([point.get_xyz() for point in points])))
+                parts.append(f"usemtl {color_name}\n")
                 if obj.get_obj_type() == ObjectType.SURFACE_BEZIER:
-                    f.write("# Bézier surface - 4x4 control points\n")
+                    parts.append("# Bézier surface - 4x4 control points\n")
                 elif obj.get_obj_type() == ObjectType.SURFACE_BSPLINE:
-                    f.write("# B-Spline surface - 4x4 control points\n")
+                    parts.append("# B-Spline surface - 4x4 control points\n")
             elif isinstance(obj, SurfaceBSplineFD):
                 points = obj.get_control_points_flat()
-                for point in points:
-                    coords = point.get_coordinates()
-                    if isinstance(coords, list):
-                        x, y, z = coords[0]
-                    else:
-                        x, y, z = coords
-                    f.write(f"v {x:.6f} {y:.6f} {z:.6f}\n")
-                f.write(f"usemtl {color_name}\n")
+                parts.append(format_vertices(np.array([point.get_xyz() for point in points])))
+                parts.append(f"usemtl {color_name}\n")
                 rows, cols = obj.get_dimensions()
-                f.write(f"# B-Spline FD surface - {rows}x{cols} control points\n")
+                parts.append(f"# B-Spline FD surface - {rows}x{cols} control points\n")
 
-            f.write("\n\n")
+            parts.append("\n\n")
+            if progress is not None:
+                progress(i + 1, len(self.objs))
 
-        f.close()
+        # The whole file is written with a single call
+        with open(path, "w") as f:
+            f.write("".join(parts))
 
-        f = open("files/material.mtl", "w")
-        for color_name in QColor.colorNames():
-            color = QColor(color_name)
-            f.write(f"newmtl {color_name}\n")
-            f.write(f"Kd {color.redF():.6f} {color.greenF():.6f} {color.blueF():.6f}\n")
-            f.write("\n")
+        # Only the materials used by the exported objects are written
+        parts = []
+        for color_name, color in used_materials.items():
+            color = QColor(color)
+            parts.append(f"newmtl {color_name}\n")
+            parts.append(f"Kd {color.redF():.6f} {color.greenF():.6f} {color.blueF():.6f}\n")
+            parts.append("\n")
+        with open(os.path.join(os.path.dirname(path), "material.mtl"), "w") as f:
+            f.write("".join(parts))
+        return True
 
-    def import_file(self, path, fill:bool = False):
+    @profiled("import")
+    def import_file(self, path, fill:bool = False, progress=None, cancel=None):
+        """
+        Reads the objects of an OBJ file.
+        progress(done, total) is called after each object is created, and
+        setting the cancel event stops the import, keeping the objects
+        created so far.
+        Vertices and edges removed by welding are counted in removed_vertices and removed_edges.
+        """
         self.objs = []
-        f = open(path, "r")
-        lines = f.readlines()
-        f.close()
-
-        name = "unnamed_object"
-        type = ""
-        coordinates = []
-        coordinates_3d = []
-        edges = []
-        color = ""
-        is_3d = False
-
-        for line in lines:
-            if line.startswith("o "):
+        self.removed_vertices = 0
+        self.removed_edges = 0
+
+        # A sidecar written by a previous import of the same file skips the parsing entirely
+        stat = os.stat(path)
+        cached = load_sidecar(path, stat) if self.use_sidecar else None
+        if cached is not None:
+            batches = [cached]
+            total = max(len(cached), 1)
+        else:
+            offsets = scan_object_offsets(path)
+            batches = self.parse_file(path, offsets, cancel)
+            total = max(len(offsets), 1)
+        parsed = []
+        done = 0
+
+        for records in batches:
+            parsed.extend(records)
+            for name, type, vertices, edges, color, is_3d in records:
+                if cancel is not None and cancel.is_set():
+                    return self.objs
                 if is_3d:
-                    self.create_object(name, type, coordinates_3d, edges, color, fill)
+                    self.create_object(name, type, np.trunc(vertices), edges, color, fill)
                 else:
+                    coordinates = list(map(tuple, vertices[:, :2].tolist()))
                     self.create_object(name, type, coordinates, color=color, fill=fill)
-                name = " ".join(line.split()[1:])
-                type = ""
-                color = ""
-                coordinates = []
-                coordinates_3d = []
-                edges: list[tuple[float, float]] = []
-                is_3d = False
-            elif line.startswith("v "):
-                coordinates.append((float(line.split()[1]), float(line.split()[2])))
-                coordinates_3d.append(Point3D([(int(float(line.split()[1])), int(float(line.split()[2])), int(float(line.split()[3])))]))
-                if int(float(line.split()[3])) != 0:
-                    is_3d = True
-            elif line.startswith("p "):
-                type = "DOT"
-            elif line.startswith("l "):
-                if is_3d:
-                    edges.append((float(line.split()[1]), float(line.split()[2])))
-                    type = "POLYGON_3D"
-                else:
-                    type = "LINE"
-            elif line.startswith("f "):
-                type = "POLYGON"
-            elif line.startswith("c "):
-                type = "CURVE"
-            elif line.startswith("b "):
-                type = "CURVE_BSPLINE"
-            elif line.startswith("usemtl "):
-                color = line.split()[1]
-
-        print(is_3d)
-        if is_3d:
-            self.create_object(name, type, coordinates_3d, edges, color, fill)
-        else:
-            self.create_object(name, type, coordinates, color=color, fill=fill)
+                done += 1
+                if progress is not None:
+                    progress(done, total)
 
+        if cached is None and self.use_sidecar and not (cancel is not None and cancel.is_set()):
+            write_sidecar(path, stat, parsed)
         return self.objs
 
+    def parse_file(self, path, offsets: list[int], cancel=None):
+        """
+        Yields the records of an OBJ file in their original order, one list per parsed range.
+        Large files with many objects are split at their "o " lines and the
+        ranges are parsed in parallel by a process pool.
+        """
+        size = os.path.getsize(path)
+        if size < self.parallel_min_size or self.workers < 2 or len(offsets) < 2:
+            yield parse_obj_range(path, 0, size)
+            return
+
+        ranges = split_obj_ranges(offsets, size, self.workers * 4)
+        # spawn instead of fork, since imports may run on a thread of the GUI process
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(ranges)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [executor.submit(parse_obj_range, path, start, end) for start, end in ranges]
+            try:
+                for future in futures:
+                    if cancel is not None and cancel.is_set():
+                        return
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
     def create_object(self, name, type, coordinates, edges = [], color = "", fill:bool = False):
-        if coordinates and type:
+        if len(coordinates) and type:
             obj = None
             if type == "DOT":
                 obj = Wireframe(name, ObjectType.DOT, coordinates)
@@ -157,14 +187,238 @@ class DescritorOBJ():
             elif type == "POLYGON":
                 obj = Wireframe(name, ObjectType.POLYGON, coordinates, fill)
             elif type == "POLYGON_3D":
-                obj = Wireframe_3D(name, ObjectType.POLYGON_3D, coordinates, edges, fill)
+                obj = Wireframe_3D(name, ObjectType.POLYGON_3D, coordinates, edges, fill, self.weld_epsilon)
+                self.removed_vertices += obj.welded[0]
+                self.removed_edges += obj.welded[1]
             elif type == "CURVE":
                 obj = Wireframe(name, ObjectType.CURVE, coordinates, fill)
             elif type == "CURVE_BSPLINE":
                 obj = Wireframe(name, ObjectType.CURVE_BSPLINE, coordinates, fill)
-            print(color)
             if color != "":
                 obj.set_color(QColor(color))
             else:
                 obj.set_color(QColor("grey"))
             self.objs.append(obj)
+
+
+# Bumped whenever the parsed records change, so older sidecars are ignored
+SIDECAR_VERSION = 1
+
+
+def sidecar_path(path) -> str:
+    return f"{path}.cache.npz"
+
+
+def load_sidecar(path, stat: os.stat_result) -> list[tuple] | None:
+    """
+    Returns the records cached next to an OBJ file, or None if there is no
+    sidecar or it was written for a different mtime or size of the file
+    """
+    try:
+        with np.load(sidecar_path(path)) as data:
+            if (
+                int(data["version"]) != SIDECAR_VERSION
+                or int(data["mtime_ns"]) != stat.st_mtime_ns
+                or int(data["size"]) != stat.st_size
+            ):
+                return None
+            vertex_ends = np.cumsum(data["vertex_counts"])
+            edge_ends = np.cumsum(data["edge_counts"])
+            vertices = np.split(data["vertices"], vertex_ends[:-1])
+            edges = np.split(data["edges"], edge_ends[:-1])
+            return list(
+                zip(
+                    data["names"].tolist(),
+                    data["types"].tolist(),
+                    vertices,
+                    edges,
+                    data["colors"].tolist(),
+                    data["is_3d"].tolist(),
+                )
+            )
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+def write_sidecar(path, stat: os.stat_result, records: list[tuple]) -> None:
+    """
+    Caches the parsed records of an OBJ file next to it, unless the file changed while it was parsed
+    """
+    try:
+        current = os.stat(path)
+        if current.st_mtime_ns != stat.st_mtime_ns or current.st_size != stat.st_size:
+            return
+        temporary_path = f"{sidecar_path(path)}.tmp"
+        with open(temporary_path, "wb") as f:
+            np.savez(
+                f,
+                version=SIDECAR_VERSION,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                names=np.array([record[0] for record in records], dtype=str),
+                types=np.array([record[1] for record in records], dtype=str),
+                colors=np.array([record[4] for record in records], dtype=str),
+                is_3d=np.array([record[5] for record in records], dtype=bool),
+                vertex_counts=np.array([len(record[2]) for record in records], dtype=np.int64),
+                edge_counts=np.array([len(record[3]) for record in records], dtype=np.int64),
+                vertices=np.concatenate([record[2] for record in records] or [np.zeros((0, 3))]),
+                edges=np.concatenate([record[3] for record in records] or [np.zeros((0, 2), dtype=np.int32)]),
+            )
+        os.replace(temporary_path, sidecar_path(path))
+    except OSError:
+        pass
+
+
+def scan_object_offsets(path) -> list[int]:
+    """
+    Returns the byte offset of every "o " line of an OBJ file
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return [match.start() for match in re.finditer(rb"^o ", data, re.M)]
+
+
+def split_obj_ranges(offsets: list[int], size: int, parts: int) -> list[tuple[int, int]]:
+    """
+    Splits a file of the given size into about `parts` byte ranges of similar size.
+    Every range but the first starts at an object offset, so the ranges can be parsed independently.
+    """
+    starts = [0]
+    for k in range(1, parts):
+        i = bisect.bisect_left(offsets, size * k // parts)
+        if i < len(offsets) and offsets[i] > starts[-1]:
+            starts.append(offsets[i])
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def parse_obj_range(path, start: int, end: int) -> list[tuple]:
+    """
+    Parses the objects between two byte offsets of an OBJ file.
+    It runs in the worker processes, returning compact arrays to the parent.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    return parse_obj_text(text)
+
+
+# A run of consecutive "v" lines, a run of consecutive "l" lines or any other single line
+OBJ_RUN_PATTERN = re.compile(r"(?:^v [^\n]*(?:\n|$))+|(?:^l [^\n]*(?:\n|$))+|^[^\n]*(?:\n|$)", re.M)
+
+
+@functools.cache
+def color_names() -> dict[str, str]:
+    """
+    Maps the hex code of every named Qt color to its first name, built only once
+    """
+    names = {}
+    for name in QColor.colorNames():
+        names.setdefault(QColor(name).name(), name)
+    return names
+
+
+def format_vertices(vertices: np.ndarray) -> str:
+    """
+    Formats a (n, 3) array as "v" lines with a single string operation
+    """
+    return ("v %.6f %.6f %.6f\n" * len(vertices)) % tuple(vertices.ravel().tolist())
+
+
+def parse_obj_text(text: str) -> list[tuple]:
+    """
+    Parses the text of an OBJ file into one record per object:
+    (name, type, vertices, edges, color, is_3d).
+    Runs of consecutive "v" and "l" lines are located with a single regex
+    scan and converted in bulk into compact arrays, so only the few
+    remaining lines are handled one by one in Python.
+    """
+    records = []
+
+    name = "unnamed_object"
+    type = ""
+    vertex_blocks = []
+    edge_blocks = []
+    color = ""
+    is_3d = False
+
+    for match in OBJ_RUN_PATTERN.finditer(text):
+        line = match.group()
+        if not line:
+            continue
+        if line.startswith("v "):
+            block = parse_block(line, "v", 3)
+            vertex_blocks.append(block)
+            if np.any(np.trunc(block[:, 2]) != 0):
+                is_3d = True
+        elif line.startswith("l "):
+            if is_3d:
+                edge_blocks.append(parse_block(line, "l", 2).astype(np.int32))
+                type = "POLYGON_3D"
+            else:
+                type = "LINE"
+        elif line.startswith("o "):
+            records.append(
+                build_record(name, type, vertex_blocks, edge_blocks, color, is_3d)
+            )
+            name = " ".join(line.split()[1:])
+            type = ""
+            color = ""
+            vertex_blocks = []
+            edge_blocks = []
+            is_3d = False
+        elif line.startswith("p "):
+            type = "DOT"
+        elif line.startswith("f "):
+            type = "POLYGON"
+        elif line.startswith("c "):
+            type = "CURVE"
+        elif line.startswith("b "):
+            type = "CURVE_BSPLINE"
+        elif line.startswith("usemtl "):
+            color = line.split()[1]
+
+    records.append(build_record(name, type, vertex_blocks, edge_blocks, color, is_3d))
+
+    return [record for record in records if record[1] and len(record[2])]
+
+
+def parse_block(block: str, prefix: str, columns: int) -> np.ndarray:
+    """
+    Converts a run of "v"/"l" lines into a (lines, columns) array.
+    The whole run is converted by numpy at once; runs where some line has
+    a different number of values (comments, "w" coordinates, missing "z")
+    fall back to the line by line conversion.
+    The prefix of each line is converted as a NaN, so a line with missing
+    values followed by one with extra values can not go unnoticed: the
+    NaNs must be exactly the first column of every row.
+    """
+    rows = block.count("\n") + (not block.endswith("\n"))
+    with warnings.catch_warnings():
+        # numpy warns when the text has values it can not convert
+        warnings.simplefilter("ignore", DeprecationWarning)
+        values = np.fromstring(block.replace(prefix, "nan"), dtype=np.float64, sep=" ")
+    if values.size == rows * (columns + 1):
+        values = values.reshape(rows, columns + 1)
+        if np.isnan(values[:, 0]).all() and not np.isnan(values[:, 1:]).any():
+            return np.ascontiguousarray(values[:, 1:])
+
+    values = np.zeros((rows, columns))
+    for row, line in enumerate(block.splitlines()):
+        fields = line.split("#")[0].split()[1:columns + 1]
+        values[row, :len(fields)] = [float(field) for field in fields]
+    return values
+
+
+def build_record(name, type, vertex_blocks, edge_blocks, color, is_3d) -> tuple:
+    """
+    Joins the blocks of an object into its final compact arrays
+    """
+    vertices = np.concatenate(vertex_blocks) if vertex_blocks else np.zeros((0, 3))
+    edges = (
+        np.concatenate(edge_blocks)
+        if edge_blocks
+        else np.zeros((0, 2), dtype=np.int32)
+    )
+    return name, type, vertices, edges, color, is_3d
@@ -0,0 +1,422 @@
+import os
+
+import numpy as np
+from PyQt6.QtGui import QColor
+
+from models.wireframe import Wireframe
+from models.wireframe_3d import Wireframe_3D
+from models.point_3d import Point3D
+from models.surface_3d import Surface3D
+from models.surface_BSpline import SurfaceBSplineFD
+from utils.bounds import object_bounds
+from utils.profiler import profiled
+from utils.types import ObjectType
+
+# Layout of a scene file (little endian, every section aligned to 8 bytes):
+#   header | object table | object bounds (float64, n x 6) | chunk table
+#   | display order (uint64, n) | names (utf-8) | vertices (float64, n x 3) | edges (int32, m x 2)
+# The objects are grouped in spatially close chunks, and the bounds of the objects and
+# of the chunks let a scene be streamed without reading the vertices of far away objects.
+# The display order section lists the entries of the table in the order of the display file.
+# Version 1 files have no bounds or chunk sections, and version 2 files no display order,
+# their table is read in display order.
+SCENE_MAGIC = b"SGAC"
+SCENE_VERSION = 3
+
+HEADER_V1_DTYPE = np.dtype(
+    [
+        ("magic", "S4"),
+        ("version", "<u4"),
+        ("object_count", "<u8"),
+        ("names_size", "<u8"),
+        ("vertex_count", "<u8"),
+        ("edge_count", "<u8"),
+        ("table_offset", "<u8"),
+        ("names_offset", "<u8"),
+        ("vertex_offset", "<u8"),
+        ("edge_offset", "<u8"),
+    ]
+)
+
+HEADER_V2_DTYPE = np.dtype(
+    HEADER_V1_DTYPE.descr
+    + [
+        ("bounds_offset", "<u8"),
+        ("chunk_count", "<u8"),
+        ("chunk_offset", "<u8"),
+    ]
+)
+
+HEADER_DTYPE = np.dtype(HEADER_V2_DTYPE.descr + [("order_offset", "<u8")])
+
+OBJECT_DTYPE = np.dtype(
+    [
+        ("name_start", "<u8"),
+        ("name_size", "<u4"),
+        ("obj_type", "u1"),
+        ("fill", "u1"),
+        ("rows", "<u2"),
+        ("color", "<u4"),
+        ("cols", "<u2"),
+        ("resolution", "<u2"),
+        ("vertex_start", "<u8"),
+        ("vertex_count", "<u8"),
+        ("edge_start", "<u8"),
+        ("edge_count", "<u8"),
+    ]
+)
+
+# Bounds are (xmin, ymin, zmin, xmax, ymax, zmax) of every object of the chunk
+CHUNK_DTYPE = np.dtype(
+    [
+        ("bounds", "<f8", (6,)),
+        ("object_start", "<u8"),
+        ("object_count", "<u8"),
+        ("vertex_count", "<u8"),
+        ("edge_count", "<u8"),
+    ]
+)
+
+def align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class DescritorScene():
+    """
+    Reads and writes the native binary scene format.
+    Unlike the OBJ files it keeps the surfaces as control grids with their
+    resolution, and the arrays can be memory mapped straight from the file.
+    """
+
+    def __init__(self):
+        self.objs = []
+        # Target number of objects of each spatial chunk
+        self.objects_per_chunk = 256
+
+    @profiled("export")
+    def export_file(self, path: str = "files/export.scene", progress=None, cancel=None) -> bool:
+        """
+        Writes the objects to a scene file, with the same progress and
+        cancel arguments as DescritorOBJ.export_file.
+        """
+        records = []
+        for i, obj in enumerate(self.objs):
+            if cancel is not None and cancel.is_set():
+                return False
+            records.append(scene_record(obj))
+            if progress is not None:
+                progress(i + 1, len(self.objs))
+        return self.export_records(path, records)
+
+    def export_records(self, path: str, records: list[tuple]) -> bool:
+        """
+        Writes records made by scene_record to a scene file
+        """
+        bounds = np.array([record_bounds(record) for record in records], dtype=np.float64).reshape(-1, 6)
+        chunks = chunk_objects(bounds, self.objects_per_chunk)
+        order = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+        records = [records[i] for i in order]
+        bounds = bounds[order]
+        # Entry of the table of each object of the display file
+        display_order = np.argsort(order).astype("<u8")
+
+        table = np.zeros(len(records), dtype=OBJECT_DTYPE)
+        names = []
+        vertex_blocks = []
+        edge_blocks = []
+        names_size = vertex_count = edge_count = 0
+
+        for i, (name, obj_type, fill, color, vertices, edges, rows, cols, resolution) in enumerate(records):
+            name = name.encode("utf-8")
+            table[i] = (
+                names_size,
+                len(name),
+                obj_type,
+                fill,
+                rows,
+                color,
+                cols,
+                resolution,
+                vertex_count,
+                len(vertices),
+                edge_count,
+                len(edges),
+            )
+            names.append(name)
+            vertex_blocks.append(vertices)
+            edge_blocks.append(edges)
+            names_size += len(name)
+            vertex_count += len(vertices)
+            edge_count += len(edges)
+
+        chunk_table = np.zeros(len(chunks), dtype=CHUNK_DTYPE)
+        start = 0
+        for i, chunk in enumerate(chunks):
+            end = start + len(chunk)
+            chunk_bounds = bounds[start:end]
+            chunk_table[i] = (
+                np.concatenate([chunk_bounds[:, :3].min(axis=0), chunk_bounds[:, 3:].max(axis=0)]),
+                start,
+                len(chunk),
+                table["vertex_count"][start:end].sum(),
+                table["edge_count"][start:end].sum(),
+            )
+            start = end
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = SCENE_MAGIC
+        header["version"] = SCENE_VERSION
+        header["object_count"] = len(records)
+        header["names_size"] = names_size
+        header["vertex_count"] = vertex_count
+        header["edge_count"] = edge_count
+        header["chunk_count"] = len(chunks)
+        header["table_offset"] = align(HEADER_DTYPE.itemsize)
+        header["bounds_offset"] = align(int(header["table_offset"][0]) + table.nbytes)
+        header["chunk_offset"] = align(int(header["bounds_offset"][0]) + bounds.nbytes)
+        header["order_offset"] = align(int(header["chunk_offset"][0]) + chunk_table.nbytes)
+        header["names_offset"] = align(int(header["order_offset"][0]) + display_order.nbytes)
+        header["vertex_offset"] = align(int(header["names_offset"][0]) + names_size)
+        header["edge_offset"] = align(int(header["vertex_offset"][0]) + vertex_count * 24)
+
+        sections = [
+            (0, header.tobytes()),
+            (int(header["table_offset"][0]), table.tobytes()),
+            (int(header["bounds_offset"][0]), bounds.astype("<f8").tobytes()),
+            (int(header["chunk_offset"][0]), chunk_table.tobytes()),
+            (int(header["order_offset"][0]), display_order.tobytes()),
+            (int(header["names_offset"][0]), b"".join(names)),
+            (int(header["vertex_offset"][0]), b"".join(v.astype("<f8").tobytes() for v in vertex_blocks)),
+            (int(header["edge_offset"][0]), b"".join(e.astype("<i4").tobytes() for e in edge_blocks)),
+        ]
+
+        # Writes to a temporary file first, so scenes that are still memory mapped keep their pages
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as f:
+            for offset, data in sections:
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(data)
+        os.replace(temporary_path, path)
+        return True
+
+    @profiled("import")
+    def import_file(self, path: str, progress=None, cancel=None) -> list:
+        """
+        Reads the objects of a scene file, with the same progress and
+        cancel arguments as DescritorOBJ.import_file.
+        """
+        self.objs = []
+        scene = SceneArrays(path)
+        for count, i in enumerate(scene.order, 1):
+            if cancel is not None and cancel.is_set():
+                break
+            self.objs.append(scene.create_object(int(i)))
+            if progress is not None:
+                progress(count, len(scene.table))
+        return self.objs
+
+
+class SceneArrays():
+    """
+    Memory mapped view over a scene file. The header, the object table and
+    the vertex and edge arrays are all views of the same mapping, so nothing
+    is read until it is accessed and the pages are shared between processes.
+    The table is grouped by chunk, order has its entries in display order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        header = data[:HEADER_V1_DTYPE.itemsize].view(HEADER_V1_DTYPE)[0]
+        if header["magic"] != SCENE_MAGIC:
+            raise ValueError(f"{path} is not a scene file")
+        if header["version"] > SCENE_VERSION:
+            raise ValueError(f"{path} uses an unsupported scene version {header['version']}")
+        if header["version"] >= 3:
+            header = data[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+        elif header["version"] == 2:
+            header = data[:HEADER_V2_DTYPE.itemsize].view(HEADER_V2_DTYPE)[0]
+
+        table_offset = int(header["table_offset"])
+        names_offset = int(header["names_offset"])
+        vertex_offset = int(header["vertex_offset"])
+        edge_offset = int(header["edge_offset"])
+        object_count = int(header["object_count"])
+        vertex_count = int(header["vertex_count"])
+        edge_count = int(header["edge_count"])
+
+        self.table = data[table_offset:table_offset + object_count * OBJECT_DTYPE.itemsize].view(OBJECT_DTYPE)
+        self.names = data[names_offset:names_offset + int(header["names_size"])]
+        self.vertices = data[vertex_offset:vertex_offset + vertex_count * 24].view("<f8").reshape(-1, 3)
+        self.edges = data[edge_offset:edge_offset + edge_count * 8].view("<i4").reshape(-1, 2)
+
+        if header["version"] >= 2:
+            bounds_offset = int(header["bounds_offset"])
+            chunk_offset = int(header["chunk_offset"])
+            self.bounds = data[bounds_offset:bounds_offset + object_count * 48].view("<f8").reshape(-1, 6)
+            self.chunks = data[
+                chunk_offset:chunk_offset + int(header["chunk_count"]) * CHUNK_DTYPE.itemsize
+            ].view(CHUNK_DTYPE)
+        else:
+            # Older files are read as a single chunk, with the bounds computed from the vertices
+            self.bounds = np.array(
+                [object_bounds(self.get_vertices(i), int(self.table[i]["obj_type"])) for i in range(object_count)],
+                dtype=np.float64,
+            ).reshape(-1, 6)
+            self.chunks = np.zeros(1 if object_count else 0, dtype=CHUNK_DTYPE)
+            if object_count:
+                self.chunks[0] = (
+                    np.concatenate([self.bounds[:, :3].min(axis=0), self.bounds[:, 3:].max(axis=0)]),
+                    0,
+                    object_count,
+                    vertex_count,
+                    edge_count,
+                )
+
+        if header["version"] >= 3:
+            order_offset = int(header["order_offset"])
+            self.order = data[order_offset:order_offset + object_count * 8].view("<u8")
+        else:
+            self.order = np.arange(object_count, dtype=np.uint64)
+        self.display_position = None
+
+    def get_name(self, i: int) -> str:
+        entry = self.table[i]
+        start = int(entry["name_start"])
+        return self.names[start:start + int(entry["name_size"])].tobytes().decode("utf-8")
+
+    def get_vertices(self, i: int) -> np.ndarray:
+        entry = self.table[i]
+        start = int(entry["vertex_start"])
+        return self.vertices[start:start + int(entry["vertex_count"])]
+
+    def get_edges(self, i: int) -> np.ndarray:
+        entry = self.table[i]
+        start = int(entry["edge_start"])
+        return self.edges[start:start + int(entry["edge_count"])]
+
+    def get_chunk_range(self, chunk: int) -> range:
+        """
+        Returns the indices of the objects of a chunk
+        """
+        start = int(self.chunks[chunk]["object_start"])
+        return range(start, start + int(self.chunks[chunk]["object_count"]))
+
+    def get_chunk_objects(self, chunk: int) -> list[int]:
+        """
+        Returns the indices of the objects of a chunk in display order
+        """
+        if self.display_position is None:
+            self.display_position = np.empty(len(self.order), dtype=np.int64)
+            self.display_position[self.order.astype(np.int64)] = np.arange(len(self.order))
+        return sorted(self.get_chunk_range(chunk), key=lambda i: self.display_position[i])
+
+    def create_object(self, i: int):
+        """
+        Builds the model of the i-th object of the table
+        """
+        entry = self.table[i]
+        return create_scene_object(
+            self.get_name(i),
+            int(entry["obj_type"]),
+            bool(entry["fill"]),
+            int(entry["color"]),
+            self.get_vertices(i),
+            self.get_edges(i),
+            int(entry["rows"]),
+            int(entry["cols"]),
+            int(entry["resolution"]),
+        )
+
+
+def create_scene_object(name, obj_type, fill, color, vertices, edges, rows, cols, resolution):
+    """
+    Builds a model from the fields of a scene record
+    """
+    obj_type = ObjectType(obj_type)
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+
+    if obj_type == ObjectType.POLYGON_3D:
+        obj = Wireframe_3D(name, obj_type, vertices, np.asarray(edges, dtype=np.int32).reshape(-1, 2), fill)
+    elif obj_type in [ObjectType.SURFACE_BEZIER, ObjectType.SURFACE_BSPLINE, ObjectType.SURFACE_BSPLINE_FD]:
+        control_points = [
+            [Point3D((x, y, z)) for x, y, z in row]
+            for row in vertices.reshape(rows, cols, 3).tolist()
+        ]
+        if obj_type == ObjectType.SURFACE_BSPLINE_FD:
+            obj = SurfaceBSplineFD(name, control_points, resolution, fill)
+        else:
+            obj = Surface3D(name, obj_type, control_points, resolution, fill)
+    else:
+        obj = Wireframe(name, obj_type, list(map(tuple, vertices[:, :2].tolist())), fill)
+
+    obj.set_color(QColor.fromRgba(color))
+    return obj
+
+
+def scene_record(obj) -> tuple:
+    """
+    Returns (name, obj_type, fill, color, vertices, edges, rows, cols, resolution)
+    of an object, with the same fields of a scene file entry
+    """
+    vertices, edges, rows, cols, resolution = scene_arrays(obj)
+    return (
+        obj.get_name(),
+        obj.get_obj_type().value,
+        bool(obj.fill),
+        obj.color.rgba(),
+        vertices,
+        edges,
+        rows,
+        cols,
+        resolution,
+    )
+
+
+def scene_arrays(obj) -> tuple[np.ndarray, np.ndarray, int, int, int]:
+    """
+    Returns (vertices, edges, rows, cols, resolution) of an object as stored in a scene file
+    """
+    no_edges = np.zeros((0, 2), dtype=np.int32)
+    if isinstance(obj, Wireframe_3D):
+        edges = np.asarray(obj.get_edges(), dtype=np.int32).reshape(-1, 2)
+        return obj.vertices, edges, 0, 0, 0
+    if isinstance(obj, Surface3D) or isinstance(obj, SurfaceBSplineFD):
+        grid = obj.control_points if isinstance(obj, Surface3D) else obj.control_points_matrix
+        vertices = np.array(
+            [[point.get_xyz() for point in row] for row in grid], dtype=np.float64
+        )
+        rows, cols = vertices.shape[:2]
+        return vertices.reshape(-1, 3), no_edges, rows, cols, obj.resolution
+
+    coordinates = np.array(obj.export_coordinates(), dtype=np.float64).reshape(-1, 2)
+    vertices = np.hstack([coordinates, np.zeros((len(coordinates), 1))])
+    return vertices, no_edges, 0, 0, 0
+
+
+def record_bounds(record: tuple) -> np.ndarray:
+    return object_bounds(record[4], record[1])
+
+
+def chunk_objects(bounds: np.ndarray, objects_per_chunk: int) -> list[np.ndarray]:
+    """
+    Groups the objects in chunks of spatially close objects with the sort-tile-recursive
+    packing: the objects are sorted by x into vertical slices, then each slice is sorted
+    by y and cut into chunks. The objects of a chunk keep their original order.
+    """
+    count = len(bounds)
+    if count <= objects_per_chunk:
+        return [np.arange(count)] if count else []
+
+    centers = (bounds[:, :3] + bounds[:, 3:]) / 2
+    slice_count = int(np.ceil(np.sqrt(np.ceil(count / objects_per_chunk))))
+    slice_size = slice_count * objects_per_chunk
+
+    chunks = []
+    by_x = np.argsort(centers[:, 0], kind="stable")
+    for start in range(0, count, slice_size):
+        objects = by_x[start:start + slice_size]
+        objects = objects[np.argsort(centers[objects, 1], kind="stable")]
+        for chunk_start in range(0, len(objects), objects_per_chunk):
+            chunks.append(np.sort(objects[chunk_start:chunk_start + objects_per_chunk]))
+    return chunks
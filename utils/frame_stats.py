@@ -0,0 +1,271 @@
+import time
+from collections import deque
+
+import numpy as np
+
+STAGES = ("culling", "tessellation", "projection", "clipping", "painting", "other")
+COUNTERS = ("submitted", "drawn", "clipped", "culled")
+
+# Canvas method -> stage its time is accounted to. Nested stages are subtracted, so the
+# time of polygon_clipping does not include the transform_coords and drawPolygon it calls.
+# clip_segments projects and clips in clip space at once, so it is accounted as clipping.
+TIMED_METHODS = {
+    "frame_objects": "culling",
+    "bezier": "tessellation",
+    "b_spline": "tessellation",
+    "surface_edges": "tessellation",
+    "transform_coords": "projection",
+    "polygon_clipping": "clipping",
+    "point_clipping": "clipping",
+}
+# Methods with their own wrappers, which also count segments
+COUNTED_METHODS = ("line_clipping", "clip_segments", "draw_object")
+
+
+class TimedPainter():
+    """
+    Forwards everything to a QPainter, timing its draw calls as the painting stage
+    and counting the segments they draw
+    """
+
+    def __init__(self, painter, stats: "FrameStats"):
+        self.painter = painter
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.painter, name)
+
+    def drawLine(self, *args):
+        self.stats.enter("painting")
+        self.painter.drawLine(*args)
+        self.stats.leave()
+        self.stats.counts["drawn"] += 1
+
+    def drawLines(self, lines):
+        self.stats.enter("painting")
+        self.painter.drawLines(lines)
+        self.stats.leave()
+        self.stats.counts["drawn"] += len(lines)
+
+    def drawPolygon(self, *points):
+        self.stats.enter("painting")
+        self.painter.drawPolygon(*points)
+        self.stats.leave()
+        self.stats.counts["drawn"] += len(points)
+
+    def drawEllipse(self, *args):
+        self.stats.enter("painting")
+        self.painter.drawEllipse(*args)
+        self.stats.leave()
+
+    def drawRect(self, *args):
+        self.stats.enter("painting")
+        self.painter.drawRect(*args)
+        self.stats.leave()
+
+
+class FrameStats():
+    """
+    Per-stage timing of the frames drawn by Canvas.paintEvent, aggregated per object type
+    and per object, with rolling statistics over the last frames.
+    While enabled, the canvas methods of each stage are replaced on the instance by timed
+    wrappers; while disabled nothing is wrapped, so drawing runs the plain methods.
+    """
+
+    def __init__(self, history: int = 120):
+        self.enabled = False
+        self.history = history
+        self.frames: deque = deque(maxlen=history)
+        # Accumulated time of each object since the last reset: name -> (ms, frames)
+        self.object_totals: dict[str, tuple[float, int]] = {}
+        self.start_frame_state()
+
+    def start_frame_state(self):
+        self.stack: list[str] = []
+        self.mark = 0.0
+        self.frame_start = 0.0
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        # Object type -> stage -> seconds; the culling of the frame goes under "frame"
+        self.type_times: dict[str, dict[str, float]] = {}
+        self.type_objects: dict[str, int] = {}
+        self.current = self.stage_times("frame")
+        self.object_times: dict[str, float] = {}
+
+    def reset(self):
+        self.frames.clear()
+        self.object_totals.clear()
+        self.start_frame_state()
+
+    def stage_times(self, key: str) -> dict[str, float]:
+        times = self.type_times.get(key)
+        if times is None:
+            times = self.type_times[key] = dict.fromkeys(STAGES, 0.0)
+        return times
+
+    def attach(self, canvas):
+        """
+        Replaces the drawing methods of the canvas by timed wrappers
+        """
+        for name, stage in TIMED_METHODS.items():
+            setattr(canvas, name, self.timed(stage, getattr(canvas, name)))
+        canvas.line_clipping = self.timed_line_clipping(canvas.line_clipping)
+        canvas.clip_segments = self.timed_clip_segments(canvas, canvas.clip_segments)
+        canvas.draw_object = self.timed_draw_object(canvas.draw_object)
+
+    def detach(self, canvas):
+        for name in (*TIMED_METHODS, *COUNTED_METHODS):
+            canvas.__dict__.pop(name, None)
+
+    def enter(self, stage: str):
+        now = time.perf_counter()
+        if self.stack:
+            self.current[self.stack[-1]] += now - self.mark
+        self.stack.append(stage)
+        self.mark = now
+
+    def leave(self):
+        now = time.perf_counter()
+        self.current[self.stack.pop()] += now - self.mark
+        self.mark = now
+
+    def timed(self, stage: str, function):
+        def wrapper(*args, **kwargs):
+            self.enter(stage)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.leave()
+        return wrapper
+
+    def timed_line_clipping(self, function):
+        def wrapper(vx1, vy1, vx2, vy2):
+            self.enter("clipping")
+            try:
+                clipped = function(vx1, vy1, vx2, vy2)
+            finally:
+                self.leave()
+            self.counts["submitted"] += 1
+            if not clipped:
+                self.counts["culled"] += 1
+            elif clipped != (vx1, vy1, vx2, vy2):
+                self.counts["clipped"] += 1
+            return clipped
+        return wrapper
+
+    def timed_clip_segments(self, canvas, function):
+        def wrapper(starts, ends):
+            self.enter("clipping")
+            try:
+                segments = function(starts, ends)
+            finally:
+                self.leave()
+            self.counts["submitted"] += len(starts)
+            self.counts["culled"] += len(starts) - len(segments)
+            self.counts["clipped"] += canvas.clipped_segments
+            return segments
+        return wrapper
+
+    def timed_draw_object(self, function):
+        def wrapper(painter, obj, inside=False):
+            key = obj.obj_type.name
+            previous = self.current
+            self.current = self.stage_times(key)
+            self.type_objects[key] = self.type_objects.get(key, 0) + 1
+            start = time.perf_counter()
+            self.enter("other")
+            try:
+                function(painter, obj, inside)
+            finally:
+                self.leave()
+                self.current = previous
+                self.object_times[obj.name] = self.object_times.get(obj.name, 0.0) + time.perf_counter() - start
+        return wrapper
+
+    def begin_frame(self, painter) -> TimedPainter:
+        """
+        Starts timing a frame, returning the painter the objects must be drawn with
+        """
+        self.start_frame_state()
+        self.frame_start = time.perf_counter()
+        return TimedPainter(painter, self)
+
+    def end_frame(self, objects: int, visible: int):
+        """
+        Closes the frame, given how many objects the display file has and how many were drawn
+        """
+        end = time.perf_counter()
+        types = {
+            key: {stage: seconds * 1000 for stage, seconds in times.items() if seconds}
+            for key, times in self.type_times.items()
+        }
+        stages = dict.fromkeys(STAGES, 0.0)
+        for times in types.values():
+            for stage, ms in times.items():
+                stages[stage] += ms
+        for name, seconds in self.object_times.items():
+            total, frames = self.object_totals.get(name, (0.0, 0))
+            self.object_totals[name] = (total + seconds * 1000, frames + 1)
+
+        self.frames.append({
+            "start": self.frame_start,
+            "total_ms": (end - self.frame_start) * 1000,
+            "stages_ms": stages,
+            "types_ms": types,
+            "type_objects": dict(self.type_objects),
+            "counts": {**self.counts, "objects": objects, "visible": visible, "objects_culled": objects - visible},
+            "objects_ms": {name: seconds * 1000 for name, seconds in self.object_times.items()},
+        })
+
+    def summary(self, slowest: int = 10) -> dict:
+        """
+        Rolling statistics of the recorded frames: p50/p95 frame times, mean time of each
+        stage and object type, counts of the last frame and its slowest objects
+        """
+        if not self.frames:
+            return {"frames": 0}
+        totals = np.array([frame["total_ms"] for frame in self.frames])
+        last = self.frames[-1]
+        stages = {stage: float(np.mean([frame["stages_ms"][stage] for frame in self.frames])) for stage in STAGES}
+        types: dict[str, dict[str, float]] = {}
+        for frame in self.frames:
+            for key, times in frame["types_ms"].items():
+                entry = types.setdefault(key, {})
+                for stage, ms in times.items():
+                    entry[stage] = entry.get(stage, 0.0) + ms / len(self.frames)
+        starts = [frame["start"] for frame in self.frames]
+        return {
+            "frames": len(self.frames),
+            "frame_ms": {
+                "last": last["total_ms"],
+                "p50": float(np.percentile(totals, 50)),
+                "p95": float(np.percentile(totals, 95)),
+                "mean": float(totals.mean()),
+            },
+            "fps": (len(starts) - 1) / (starts[-1] - starts[0]) if len(starts) > 1 and starts[-1] > starts[0] else 0.0,
+            "stages_ms": stages,
+            "types_ms": types,
+            "counts": last["counts"],
+            "slowest_objects_ms": dict(sorted(last["objects_ms"].items(), key=lambda item: -item[1])[:slowest]),
+        }
+
+    def report(self) -> str:
+        """
+        The summary as text, for the console
+        """
+        summary = self.summary()
+        if not summary["frames"]:
+            return "No frames recorded"
+        frame = summary["frame_ms"]
+        counts = summary["counts"]
+        lines = [
+            f"Frames: {summary['frames']}  last {frame['last']:.1f} ms  p50 {frame['p50']:.1f} ms  p95 {frame['p95']:.1f} ms",
+            "Stages: " + "  ".join(f"{stage} {ms:.1f}" for stage, ms in summary["stages_ms"].items()),
+            f"Segments: {counts['submitted']} submitted, {counts['drawn']} drawn, "
+            f"{counts['clipped']} clipped, {counts['culled']} culled",
+            f"Objects: {counts['visible']} drawn, {counts['objects_culled']} culled",
+        ]
+        for key, times in summary["types_ms"].items():
+            lines.append(f"  {key}: " + "  ".join(f"{stage} {ms:.1f}" for stage, ms in times.items()))
+        if summary["slowest_objects_ms"]:
+            lines.append("Slowest: " + ", ".join(f"{name} {ms:.1f}" for name, ms in summary["slowest_objects_ms"].items()))
+        return "\n".join(lines)
@@ -0,0 +1,174 @@
+import atexit
+import contextlib
+import threading
+import weakref
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+
+from utils.types import ObjectType
+
+# Arrays packed into a segment start at multiples of this many bytes
+ALIGNMENT = 64
+
+
+class GeometryHandle(NamedTuple):
+    """
+    Locates an array inside a shared memory segment. Handles are small and picklable,
+    so they are what gets sent to worker processes instead of the geometry itself.
+    """
+
+    name: str
+    shape: tuple
+    dtype: str
+    offset: int
+
+
+def geometry_arrays(obj, mesh: bool = False) -> tuple[dict[str, np.ndarray], tuple]:
+    """
+    Returns the arrays of an object to be shared and the attributes they were built
+    from, which the models replace whenever the geometry changes:
+    - 2D wireframes: vertices (n, 2)
+    - 3D wireframes: vertices (n, 3) and edges (m, 2)
+    - Surfaces: control (rows, cols, 3), and with mesh also the vertices (n, 3) and
+      edges (m, 2) of the tessellated mesh
+    """
+    if obj.obj_type in (ObjectType.SURFACE_BEZIER, ObjectType.SURFACE_BSPLINE, ObjectType.SURFACE_BSPLINE_FD):
+        control = obj.get_control_array()
+        arrays = {"control": control}
+        # The control points are moved in place, so they are compared by value
+        sources = (control.tobytes(),)
+        if mesh:
+            arrays["vertices"] = np.asarray(obj.mesh_vertices, dtype=np.float64)
+            arrays["edges"] = np.asarray(obj.mesh_edges, dtype=np.int32).reshape(-1, 2)
+            sources += (obj.mesh_vertices, obj.mesh_edges)
+        return arrays, sources
+    if obj.obj_type == ObjectType.POLYGON_3D:
+        arrays = {
+            "vertices": obj.vertices,
+            "edges": np.asarray(obj.edges, dtype=np.int32).reshape(-1, 2),
+        }
+        return arrays, (obj.vertices, obj.edges)
+    arrays = {"vertices": np.asarray(obj.coordinates, dtype=np.float64).reshape(-1, 2)}
+    return arrays, (obj.coordinates,)
+
+
+def same_sources(old: tuple, new: tuple) -> bool:
+    return len(old) == len(new) and all(
+        a == b if isinstance(a, bytes) else a is b for a, b in zip(old, new)
+    )
+
+
+def release_segment(segment: shared_memory.SharedMemory) -> None:
+    try:
+        segment.close()
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class GeometryStore():
+    """
+    Places the vertex and edge arrays of objects in named shared memory segments, one
+    segment per object, so worker processes can read them without the Point3D lists
+    being pickled for every task.
+    Publishing an object again after its geometry changed moves it to a new segment.
+    A segment is released when its object is released, when the object is garbage
+    collected and, at the latest, when the process exits. Workers that already attached
+    to a released segment keep a valid view until they close it.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # id(obj) -> (sources, handles, segment, finalizer)
+        self.entries: dict[int, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def publish(self, obj, mesh: bool = False) -> dict[str, GeometryHandle]:
+        """
+        Returns the handles of the shared geometry of the object, copying it to shared
+        memory only if it is not there yet or it changed since it was published.
+        The mesh of a surface is only published when asked for.
+        """
+        arrays, sources = geometry_arrays(obj, mesh)
+        with self.lock:
+            entry = self.entries.get(id(obj))
+            # A surface published with its mesh also serves the tasks that only read the control grid
+            if entry is not None and same_sources(entry[0][:len(sources)], sources):
+                handles = entry[1]
+                return handles if len(handles) == len(arrays) else {key: handles[key] for key in arrays}
+
+        offsets = {}
+        size = 0
+        for key, array in arrays.items():
+            offsets[key] = size
+            size += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        segment = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        handles = {}
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf, offset=offsets[key])
+            view[...] = array
+            del view
+            handles[key] = GeometryHandle(segment.name, array.shape, array.dtype.str, offsets[key])
+
+        finalizer = weakref.finalize(obj, self.release_key, id(obj))
+        with self.lock:
+            previous = self.entries.pop(id(obj), None)
+            self.entries[id(obj)] = (sources, handles, segment, finalizer)
+        if previous is not None:
+            previous[3].detach()
+            release_segment(previous[2])
+        return handles
+
+    def release(self, obj) -> None:
+        """
+        Releases the shared geometry of an object, if it was published
+        """
+        self.release_key(id(obj))
+
+    def release_key(self, key: int) -> None:
+        with self.lock:
+            entry = self.entries.pop(key, None)
+        if entry is not None:
+            entry[3].detach()
+            release_segment(entry[2])
+
+    def release_all(self) -> None:
+        with self.lock:
+            keys = list(self.entries)
+        for key in keys:
+            self.release_key(key)
+
+
+@contextlib.contextmanager
+def attach(handles: dict[str, GeometryHandle]):
+    """
+    Opens published geometry, usually on a worker process, yielding read-only arrays
+    by the same keys as the handles. The arrays must not be used after the block.
+    """
+    segments = {}
+    arrays = {}
+    try:
+        for key, handle in handles.items():
+            if handle.name not in segments:
+                segments[handle.name] = shared_memory.SharedMemory(handle.name)
+            array = np.ndarray(handle.shape, dtype=handle.dtype, buffer=segments[handle.name].buf, offset=handle.offset)
+            array.flags.writeable = False
+            arrays[key] = array
+        yield arrays
+    finally:
+        arrays.clear()
+        for segment in segments.values():
+            try:
+                segment.close()
+            except BufferError:
+                # A view kept beyond the block holds the mapping until it is collected
+                pass
+
+
+geometry_store = GeometryStore()
+atexit.register(geometry_store.release_all)
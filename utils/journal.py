@@ -0,0 +1,417 @@
+import functools
+import glob
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from models.surface_3d import Surface3D
+from models.surface_BSpline import SurfaceBSplineFD
+from models.wireframe_3d import Wireframe_3D
+from utils.descritorScene import DescritorScene, SceneArrays, scene_record
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+SESSION_ROOT = "files/sessions"
+# Added objects with more vertex and edge values than this are written to a binary blob
+BLOB_VALUES = 1024
+
+# Canvas methods whose calls are recorded as "transform" entries
+JOURNALED_METHODS = {
+    "translate_objects",
+    "transform_objects",
+    "rotate_objects",
+    "rotateWithCenter",
+    "rotateInPoint",
+}
+
+
+def journaled(method):
+    """
+    Records a call of a Canvas transformation method in its change journal.
+    Calls made from inside another journaled method are not recorded, since
+    replaying the outer call already repeats them.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, obj, *args):
+        self.journal_depth += 1
+        try:
+            result = method(self, obj, *args)
+        finally:
+            self.journal_depth -= 1
+        if self.journal_depth == 0:
+            self.record_transform(obj, method.__name__, args)
+        return result
+
+    return wrapper
+
+
+class Journal():
+    """
+    Append-only log of the changes made to the display file.
+    Every entry is written as a JSON line as soon as the change happens,
+    so saving only has to flush the latest entries. Imported files are
+    recorded by reference and large objects as binary blobs next to the log.
+    Once enough entries pile up, the scene is compacted into a snapshot on a
+    background thread and the entries it already contains are dropped from the log.
+    Each run writes to its own session directory under root, created with the
+    first change and locked while the run lasts. Sessions of runs that did not
+    close cleanly are kept until they are recovered.
+    """
+
+    def __init__(self, root: str = SESSION_ROOT):
+        self.root = root
+        self.directory = os.path.join(root, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.entries_since_snapshot = 0
+        self.compact_every = 5000
+        self.compacting = False
+        # Imports still adding objects; a snapshot taken meanwhile would miss their later batches
+        self.imports = 0
+        # Entries written first once the session directory is created, such as the
+        # examples the scene started from
+        self.start_entries: list[dict] = []
+        self.file = None
+        self.lock_file = None
+        prune_sessions(root)
+
+    @staticmethod
+    def journal_path(directory: str) -> str:
+        return os.path.join(directory, "journal.log")
+
+    def open(self) -> None:
+        """
+        Creates and locks the session directory, if it was not created yet. Called with the lock held.
+        """
+        if self.file is not None:
+            return
+        os.makedirs(os.path.join(self.directory, "blobs"), exist_ok=True)
+        self.lock_file = open(os.path.join(self.directory, "lock"), "a")
+        lock_session(self.lock_file)
+        self.file = open(self.journal_path(self.directory), "a", encoding="utf-8")
+        for entry in self.start_entries:
+            self.write(entry)
+
+    def write(self, entry: dict) -> None:
+        self.seq += 1
+        entry["seq"] = self.seq
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        self.entries_since_snapshot += 1
+
+    def append(self, entry: dict) -> None:
+        with self.lock:
+            self.open()
+            self.write(entry)
+
+    def record_add(self, obj) -> None:
+        name, obj_type, fill, color, vertices, edges, rows, cols, resolution = scene_record(obj)
+        entry = {
+            "op": "add",
+            "name": name,
+            "obj_type": obj_type,
+            "fill": fill,
+            "color": color,
+            "rows": rows,
+            "cols": cols,
+            "resolution": resolution,
+        }
+        if vertices.size + edges.size <= BLOB_VALUES:
+            entry["vertices"] = vertices.tolist()
+            entry["edges"] = edges.tolist()
+            self.append(entry)
+            return
+        # The arrays are written as they are, so the entry costs the same as a copy of them
+        with self.lock:
+            self.open()
+            entry["blob"] = f"add-{self.seq + 1}.npz"
+            with open(os.path.join(self.directory, "blobs", entry["blob"]), "wb") as f:
+                np.savez(f, vertices=vertices, edges=edges)
+            self.write(entry)
+
+    def record_import(self, path: str, fill: bool, weld_epsilon: float | None) -> int:
+        """
+        Records an import by reference to its file instead of one entry per object,
+        returning the sequence number that identifies it. The size and modification
+        time tell, on recovery, whether the file changed since.
+        """
+        try:
+            stat = os.stat(path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size = mtime_ns = None
+        entry = {
+            "op": "import",
+            "path": os.path.abspath(path),
+            "fill": fill,
+            "weld_epsilon": weld_epsilon,
+            "size": size,
+            "mtime_ns": mtime_ns,
+        }
+        self.append(entry)
+        self.imports += 1
+        return entry["seq"]
+
+    def record_import_end(self, seq: int, count: int) -> None:
+        """
+        Records how many objects of the file the import at seq handed over before it
+        finished, was cancelled or failed
+        """
+        self.append({"op": "import_end", "import": seq, "count": count})
+        self.imports -= 1
+
+    def record_remove(self, name: str) -> None:
+        self.append({"op": "remove", "name": name})
+
+    def record_clear(self) -> None:
+        self.append({"op": "clear"})
+
+    def record_transform(self, name: str, method: str, args: tuple) -> None:
+        self.append({"op": "transform", "name": name, "method": method, "args": [float(arg) for arg in args]})
+
+    def record_stream(self, path: str) -> None:
+        self.append({"op": "stream", "path": path})
+
+    def record_color(self, name: str, color: int) -> None:
+        self.append({"op": "color", "name": name, "color": color})
+
+    def record_fill(self, name: str, fill: bool) -> None:
+        self.append({"op": "fill", "name": name, "fill": fill})
+
+    def save(self) -> int:
+        """
+        Makes sure every entry is on disk, returning how many changes are not in a snapshot yet
+        """
+        with self.lock:
+            if self.file is None:
+                return 0
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            return self.entries_since_snapshot
+
+    def needs_compaction(self) -> bool:
+        return not self.compacting and not self.imports and self.entries_since_snapshot >= self.compact_every
+
+    def compact(self, objects: list, stream: dict | None = None, recovered: str | None = None) -> threading.Thread:
+        """
+        Writes a snapshot of the objects on a background thread.
+        Only references to their geometry are captured here, see capture_record, and the
+        records are built on the thread, so later changes only go to the log.
+        stream is the scene being streamed, if any, as {"path", "removed"}: only its
+        resident objects are in objects, the rest is read from its file on recovery.
+        recovered is a session the objects were recovered from, marked as such once
+        the snapshot is written.
+        """
+        captured = [capture_record(obj) for obj in objects]
+        with self.lock:
+            self.open()
+            seq = self.seq
+            self.entries_since_snapshot = 0
+            self.compacting = True
+        thread = threading.Thread(target=self.write_snapshot, args=(captured, seq, stream, recovered), daemon=True)
+        thread.start()
+        return thread
+
+    def write_snapshot(self, captured: list[tuple], seq: int, stream: dict | None = None, recovered: str | None = None) -> None:
+        try:
+            records = [finish_record(record) for record in captured]
+            # The sequence number is part of the name, so a crash at any point leaves a consistent pair.
+            # The stream state is written first: a snapshot exists once its scene file does.
+            if stream is not None:
+                with open(stream_path(self.directory, seq), "w", encoding="utf-8") as f:
+                    json.dump(stream, f)
+            path = os.path.join(self.directory, f"snapshot-{seq}.scene")
+            DescritorScene().export_records(path, records)
+
+            with self.lock:
+                self.file.close()
+                journal_path = self.journal_path(self.directory)
+                kept = [entry for entry in read_entries(journal_path) if entry["seq"] > seq]
+                with open(f"{journal_path}.tmp", "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(entry) + "\n" for entry in kept)
+                os.replace(f"{journal_path}.tmp", journal_path)
+                self.file = open(journal_path, "a", encoding="utf-8")
+
+            for old_path in glob.glob(os.path.join(self.directory, "snapshot-*.scene")):
+                if snapshot_seq(old_path) < seq:
+                    os.remove(old_path)
+                    if os.path.exists(stream_path(self.directory, snapshot_seq(old_path))):
+                        os.remove(stream_path(self.directory, snapshot_seq(old_path)))
+            # Blobs of the entries now in the snapshot
+            for blob in glob.glob(os.path.join(self.directory, "blobs", "add-*.npz")):
+                if int(os.path.basename(blob)[len("add-"):-len(".npz")]) <= seq:
+                    os.remove(blob)
+            if recovered is not None:
+                mark_session(recovered, "recovered")
+        finally:
+            self.compacting = False
+
+    def close(self) -> None:
+        """
+        Ends the run cleanly: its session does not need to be recovered
+        """
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.close()
+            self.file = None
+            mark_session(self.directory, "closed")
+            self.lock_file.close()
+            self.lock_file = None
+
+
+def capture_record(obj) -> tuple:
+    """
+    Captures an object for finish_record on another thread. The models replace their
+    vertex arrays, edge lists and coordinate lists on every change instead of changing
+    them, so references to them are an immutable copy. Control points of surfaces are
+    moved in place, so their (small) record is built here.
+    """
+    head = (obj.get_name(), obj.get_obj_type().value, bool(obj.fill), obj.color.rgba())
+    if isinstance(obj, (Surface3D, SurfaceBSplineFD)):
+        return head + ("record", scene_record(obj))
+    if isinstance(obj, Wireframe_3D):
+        return head + ("3d", (obj.vertices, obj.get_edges()))
+    return head + ("2d", obj.export_coordinates())
+
+
+def finish_record(captured: tuple) -> tuple:
+    """
+    Builds the scene_record of an object captured by capture_record
+    """
+    name, obj_type, fill, color, kind, data = captured
+    if kind == "record":
+        return data
+    if kind == "3d":
+        vertices, edges = data
+        return name, obj_type, fill, color, vertices, np.asarray(edges, dtype=np.int32).reshape(-1, 2), 0, 0, 0
+    coordinates = np.array(data, dtype=np.float64).reshape(-1, 2)
+    vertices = np.hstack([coordinates, np.zeros((len(coordinates), 1))])
+    return name, obj_type, fill, color, vertices, np.zeros((0, 2), dtype=np.int32), 0, 0, 0
+
+
+def lock_session(file) -> bool:
+    """
+    Locks the lock file of a session without waiting, returning whether it could.
+    The lock is released when the file is closed, also when the process dies.
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def session_in_use(directory: str) -> bool:
+    """
+    Whether the run that writes a session is still going
+    """
+    path = os.path.join(directory, "lock")
+    if not os.path.exists(path):
+        return False
+    with open(path, "a") as f:
+        return not lock_session(f)
+
+
+def mark_session(directory: str, marker: str) -> None:
+    """
+    Marks a session as "closed" by its run or "recovered" by a later one
+    """
+    open(os.path.join(directory, marker), "w").close()
+
+
+def unrecovered_sessions(root: str = SESSION_ROOT) -> list[str]:
+    """
+    Returns the sessions of runs that ended without closing them and were not recovered
+    yet, newest first
+    """
+    if not os.path.isdir(root):
+        return []
+    sessions = []
+    for name in sorted(os.listdir(root), reverse=True):
+        directory = os.path.join(root, name)
+        if (
+            os.path.isdir(directory)
+            and not os.path.exists(os.path.join(directory, "closed"))
+            and not os.path.exists(os.path.join(directory, "recovered"))
+            and not session_in_use(directory)
+        ):
+            sessions.append(directory)
+    return sessions
+
+
+def prune_sessions(root: str) -> None:
+    """
+    Deletes the sessions that were closed cleanly or already recovered; the others are
+    only deleted by recovering them first
+    """
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        directory = os.path.join(root, name)
+        if not os.path.isdir(directory) or session_in_use(directory):
+            continue
+        if os.path.exists(os.path.join(directory, "closed")) or os.path.exists(os.path.join(directory, "recovered")):
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def snapshot_seq(path: str) -> int:
+    return int(os.path.basename(path)[len("snapshot-"):-len(".scene")])
+
+
+def stream_path(directory: str, seq: int) -> str:
+    return os.path.join(directory, f"snapshot-{seq}.stream.json")
+
+
+def read_entries(journal_path: str) -> list[dict]:
+    """
+    Reads the entries of a journal, ignoring a last line cut short by a crash
+    """
+    entries = []
+    if not os.path.exists(journal_path):
+        return entries
+    with open(journal_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return entries
+
+
+def load_session(directory: str) -> tuple[list, list[dict], dict | None]:
+    """
+    Returns the objects of the latest snapshot of a session, the scene that was being
+    streamed when it was taken, if any, and the journal entries made after it
+    """
+    objects = []
+    stream = None
+    seq = 0
+    snapshots = glob.glob(os.path.join(directory, "snapshot-*.scene"))
+    if snapshots:
+        path = max(snapshots, key=snapshot_seq)
+        seq = snapshot_seq(path)
+        scene = SceneArrays(path)
+        objects = [scene.create_object(int(i)) for i in scene.order]
+        if os.path.exists(stream_path(directory, seq)):
+            with open(stream_path(directory, seq), encoding="utf-8") as f:
+                stream = json.load(f)
+    entries = [entry for entry in read_entries(Journal.journal_path(directory)) if entry["seq"] > seq]
+    for entry in entries:
+        if "blob" in entry:
+            with np.load(os.path.join(directory, "blobs", entry["blob"])) as blob:
+                entry["vertices"], entry["edges"] = blob["vertices"], blob["edges"]
+    return objects, entries, stream
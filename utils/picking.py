@@ -0,0 +1,26 @@
+import numpy as np
+
+
+def point_segment_distance(x: float, y: float, segments: np.ndarray) -> np.ndarray:
+    """
+    Returns the distance from (x, y) to each (x1, y1, x2, y2) segment
+    """
+    start = segments[:, :2]
+    direction = segments[:, 2:] - start
+    length = (direction ** 2).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = ((np.array([x, y]) - start) * direction).sum(axis=1) / length
+    t = np.clip(np.nan_to_num(t), 0.0, 1.0)
+    closest = start + t[:, None] * direction
+    return np.hypot(closest[:, 0] - x, closest[:, 1] - y)
+
+
+def point_in_polygon(x: float, y: float, segments: np.ndarray) -> bool:
+    """
+    Even-odd test of (x, y) against the closed polygon made by the segments
+    """
+    x1, y1, x2, y2 = segments.T
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xs = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return bool(np.count_nonzero(crosses & (x < xs)) % 2)
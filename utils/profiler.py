@@ -0,0 +1,193 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PROFILE_DIRECTORY = "profiles"
+# Operations that can be profiled each time they run
+OPERATIONS = ("import", "export", "surface")
+
+
+class ProfileSession():
+    """
+    A cProfile run in progress, optionally tracing memory allocations
+    """
+
+    def __init__(self, label: str, memory: bool, depth: int = 1):
+        self.label = label
+        self.profile = cProfile.Profile()
+        self.start = time.perf_counter()
+        self.frames = 0
+        # Allocations are only traced if no one else was already tracing them
+        self.memory = memory and not tracemalloc.is_tracing()
+        if self.memory:
+            tracemalloc.start(depth)
+
+
+class Profiler():
+    """
+    Profiles a number of frames drawn by the canvas, the operations listed in operations
+    or anything between start and stop with cProfile, and optionally tracemalloc.
+    Each run writes a .prof file, readable by pstats and snakeviz, and a text summary
+    under directory. A single run can be in progress at a time; cProfile only sees the
+    thread that started it.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIRECTORY, top: int = 40, memory_depth: int = 1):
+        self.directory = directory
+        # Functions listed in the text summaries, and whether allocations are traced
+        self.top = top
+        self.memory = False
+        # Frames stored for each traced allocation; every extra frame slows down the
+        # traced code further, and the summary groups allocations by their innermost line
+        self.memory_depth = memory_depth
+        self.operations: set[str] = set()
+        self.session: ProfileSession | None = None
+        self.frames_left = 0
+        # (.prof, text summary) paths of every run, in the order they ended
+        self.written: list[tuple[str, str]] = []
+        self.lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.session is not None
+
+    def start(self, label: str):
+        with self.lock:
+            if self.session is not None:
+                raise RuntimeError(f"Already profiling {self.session.label}")
+            self.session = ProfileSession(label, self.memory, self.memory_depth)
+        self.session.profile.enable()
+
+    def stop(self) -> tuple[str, str]:
+        """
+        Ends the run in progress, returning the paths of its .prof file and text summary
+        """
+        session = self.session
+        if session is None:
+            raise RuntimeError("Not profiling")
+        session.profile.disable()
+        elapsed = time.perf_counter() - session.start
+        snapshot = peak = None
+        if session.memory:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ])
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        self.frames_left = 0
+        self.session = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        stem = self.unique_stem(session.label)
+        profile_path = stem + ".prof"
+        text_path = stem + ".txt"
+        session.profile.dump_stats(profile_path)
+        with open(text_path, "w") as f:
+            f.write(self.summary(session, elapsed, snapshot, peak))
+        self.written.append((profile_path, text_path))
+        return profile_path, text_path
+
+    def unique_stem(self, label: str) -> str:
+        name = time.strftime("%Y%m%d-%H%M%S") + "_" + "".join(c if c.isalnum() or c in "-_" else "_" for c in label)
+        stem = os.path.join(self.directory, name)
+        suffix = 1
+        while os.path.exists(stem + ".prof"):
+            suffix += 1
+            stem = os.path.join(self.directory, f"{name}_{suffix}")
+        return stem
+
+    def summary(self, session: ProfileSession, elapsed: float, snapshot, peak: int | None) -> str:
+        stream = io.StringIO()
+        stream.write(f"Profile: {session.label}\n")
+        stream.write(f"Elapsed: {elapsed:.3f} s")
+        if session.frames:
+            stream.write(f", {session.frames} frames")
+        stream.write("\n\n")
+        stats = pstats.Stats(session.profile, stream=stream)
+        stats.strip_dirs()
+        for key in (pstats.SortKey.CUMULATIVE, pstats.SortKey.TIME):
+            stream.write(f"--- Top {self.top} by {key.value} time ---\n")
+            stats.sort_stats(key).print_stats(self.top)
+        if snapshot is not None:
+            stream.write(f"--- Memory: peak {peak / 2**20:.2f} MiB, top {self.top} allocations still alive ---\n")
+            for entry in snapshot.statistics("lineno")[:self.top]:
+                stream.write(f"{entry}\n")
+        return stream.getvalue()
+
+    @contextmanager
+    def profile(self, label: str):
+        """
+        Profiles the body of the with statement
+        """
+        self.start(label)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    @contextmanager
+    def operation(self, kind: str, label: str | None = None):
+        """
+        Profiles the body of the with statement if operations of kind are being profiled.
+        Operations started while something else is being profiled are part of that run.
+        """
+        if kind in self.operations:
+            try:
+                self.start(f"{kind}_{label}" if label else kind)
+            except RuntimeError:
+                pass
+            else:
+                try:
+                    yield
+                finally:
+                    self.stop()
+                return
+        yield
+
+    def profile_frames(self, frames: int, label: str = "frames"):
+        """
+        Profiles the next frames drawn by the canvas; only the time spent drawing them is
+        profiled, not the time between them
+        """
+        self.start(label)
+        self.session.profile.disable()
+        self.frames_left = frames
+
+    def begin_frame(self):
+        self.session.profile.enable()
+
+    def end_frame(self) -> tuple[str, str] | None:
+        """
+        Closes a profiled frame, returning the paths written once the last one is done
+        """
+        self.session.profile.disable()
+        self.session.frames += 1
+        self.frames_left -= 1
+        if self.frames_left <= 0:
+            return self.stop()
+        return None
+
+
+def profiled(kind: str):
+    """
+    Decorator profiling each call of a method when operations of kind are being profiled
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(self, *args, **kwargs):
+            if kind not in profiler.operations:
+                return function(self, *args, **kwargs)
+            with profiler.operation(kind, type(self).__name__):
+                return function(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+profiler = Profiler()
@@ -0,0 +1,128 @@
+import numpy as np
+
+from utils.descritorScene import SceneArrays
+
+
+class SceneStream():
+    """
+    Keeps resident only the chunks of a scene file that are close to the window.
+    Chunks are loaded when they become visible and, once the resident vertex and
+    edge data goes over the memory cap, the least recently visible ones are evicted.
+    Chunks with objects changed by the user are pinned and never evicted.
+    """
+
+    def __init__(self, path: str, memory_cap: int = 256 * 1024 * 1024):
+        self.path = path
+        self.scene = SceneArrays(path)
+        self.memory_cap = memory_cap
+
+        # Resident objects of each loaded chunk
+        self.loaded: dict[int, list] = {}
+        self.pinned: set[int] = set()
+        self.removed: set[str] = set()
+        self.chunk_of: dict[str, int] = {}
+
+        # Chunk of each object of the scene by name, built the first time it is needed
+        self.chunk_by_name: dict[str, int] | None = None
+
+        self.tick = 0
+        self.last_visible = np.zeros(len(self.scene.chunks), dtype=np.int64)
+        self.chunk_sizes = (
+            self.scene.chunks["vertex_count"].astype(np.int64) * 24
+            + self.scene.chunks["edge_count"].astype(np.int64) * 8
+        )
+
+    def get_bounds(self) -> np.ndarray:
+        """
+        Returns the (xmin, ymin, zmin, xmax, ymax, zmax) rows of every chunk
+        """
+        return self.scene.chunks["bounds"]
+
+    def resident_size(self) -> int:
+        return int(sum(self.chunk_sizes[chunk] for chunk in self.loaded))
+
+    def update(self, visible: np.ndarray, names: set[str]) -> tuple[list, list]:
+        """
+        Loads the visible chunks and evicts old ones while over the memory cap.
+        Objects whose names are in names are skipped. Returns (loaded, evicted) objects.
+        """
+        self.tick += 1
+        self.last_visible[visible] = self.tick
+
+        loaded = []
+        for chunk in np.flatnonzero(visible):
+            if int(chunk) not in self.loaded:
+                loaded.extend(self.load_chunk(int(chunk), names))
+
+        evicted = []
+        size = self.resident_size()
+        if size > self.memory_cap:
+            candidates = [
+                chunk for chunk in self.loaded if not visible[chunk] and chunk not in self.pinned
+            ]
+            for chunk in sorted(candidates, key=lambda chunk: self.last_visible[chunk]):
+                if size <= self.memory_cap:
+                    break
+                evicted.extend(self.evict_chunk(chunk))
+                size -= int(self.chunk_sizes[chunk])
+        return loaded, evicted
+
+    def load_chunk(self, chunk: int, names: set[str]) -> list:
+        objects = []
+        for i in self.scene.get_chunk_objects(chunk):
+            name = self.scene.get_name(i)
+            if name in self.removed or name in names:
+                continue
+            obj = self.scene.create_object(i)
+            names.add(name)
+            self.chunk_of[name] = chunk
+            objects.append(obj)
+        self.loaded[chunk] = objects
+        return objects
+
+    def evict_chunk(self, chunk: int) -> list:
+        objects = self.loaded.pop(chunk)
+        for obj in objects:
+            self.chunk_of.pop(obj.name, None)
+        return objects
+
+    def pin(self, name: str) -> None:
+        """
+        Keeps the chunk of a changed object resident
+        """
+        if name in self.chunk_of:
+            self.pinned.add(self.chunk_of[name])
+
+    def discard(self, name: str) -> None:
+        """
+        Forgets a removed object, so it is not loaded again with its chunk
+        """
+        chunk = self.chunk_of.pop(name, None)
+        if chunk is not None:
+            self.loaded[chunk] = [obj for obj in self.loaded[chunk] if obj.name != name]
+        # Also objects of the scene that are not resident, or were restored from a snapshot
+        if self.find_chunk(name) is not None:
+            self.removed.add(name)
+
+    def find_chunk(self, name: str) -> int | None:
+        """
+        Returns the chunk of an object of the scene, resident or not
+        """
+        if self.chunk_by_name is None:
+            self.chunk_by_name = {}
+            for chunk in range(len(self.scene.chunks)):
+                for i in self.scene.get_chunk_range(chunk):
+                    self.chunk_by_name[self.scene.get_name(i)] = chunk
+        return self.chunk_by_name.get(name)
+
+    def non_resident_objects(self, names: set[str]) -> list:
+        """
+        Builds the objects of the scene that are not resident, skipping the ones in names
+        and the removed ones
+        """
+        objects = []
+        for i in map(int, self.scene.order):
+            name = self.scene.get_name(i)
+            if name not in names and name not in self.removed:
+                objects.append(self.scene.create_object(i))
+        return objects
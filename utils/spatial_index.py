@@ -0,0 +1,229 @@
+import math
+
+import numpy as np
+
+
+class SpatialIndex():
+    """
+    Uniform grid over the xy extent of object bounding boxes.
+    Each key is stored in every cell its box overlaps, except for boxes
+    spanning too many cells, which are kept in a separate list and returned
+    as candidates of every query. Entries are updated one at a time as
+    objects are added, removed or transformed, and query results come in
+    insertion order, so they can be drawn in the order of the display file.
+    Besides range queries, nearest finds the closest key to a point.
+    """
+
+    def __init__(self, cell_size: float = 16.0, max_cells: int = 1024):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.clear()
+
+    def clear(self) -> None:
+        self.cells: dict[tuple[int, int], set] = {}
+        self.large: set = set()
+        self.entries: dict = {}
+        self.sequence: dict = {}
+        self.counter = 0
+        # z extent of every box ever inserted, only grown, used to bound view volumes
+        self.zmin = math.inf
+        self.zmax = -math.inf
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def cell_range(self, bounds: np.ndarray) -> tuple[int, int, int, int]:
+        return (
+            math.floor(bounds[0] / self.cell_size),
+            math.floor(bounds[1] / self.cell_size),
+            math.floor(bounds[3] / self.cell_size),
+            math.floor(bounds[4] / self.cell_size),
+        )
+
+    def insert(self, key, bounds: np.ndarray) -> None:
+        """
+        Adds a key with its (xmin, ymin, zmin, xmax, ymax, zmax) box, or moves it if it is already indexed
+        """
+        bounds = np.asarray(bounds, dtype=np.float64)
+        if not np.all(np.isfinite(bounds)):
+            bounds = np.array([-math.inf, -math.inf, -math.inf, math.inf, math.inf, math.inf])
+            cells = None
+        else:
+            i0, j0, i1, j1 = self.cell_range(bounds)
+            cells = (i0, j0, i1, j1) if (i1 - i0 + 1) * (j1 - j0 + 1) <= self.max_cells else None
+
+        if key in self.entries:
+            if self.entries[key][1] == cells and cells is not None:
+                self.entries[key] = (bounds, cells)
+                return
+            self.unlink(key)
+        else:
+            self.sequence[key] = self.counter
+            self.counter += 1
+
+        self.entries[key] = (bounds, cells)
+        self.zmin = min(self.zmin, bounds[2])
+        self.zmax = max(self.zmax, bounds[5])
+        if cells is None:
+            self.large.add(key)
+            return
+        i0, j0, i1, j1 = cells
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                self.cells.setdefault((i, j), set()).add(key)
+
+    def insert_many(self, keys: list, bounds: np.ndarray) -> None:
+        """
+        Adds keys that are not indexed yet with their (n, 6) boxes, as insert does one at a
+        time, with the cells of the boxes computed all at once
+        """
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 6)
+        finite = np.isfinite(bounds).all(axis=1)
+        bounds = np.where(finite[:, None], bounds, [-math.inf, -math.inf, -math.inf, math.inf, math.inf, math.inf])
+        ranges = np.zeros((len(bounds), 4), dtype=np.int64)
+        ranges[finite] = np.floor(bounds[finite][:, [0, 1, 3, 4]] / self.cell_size)
+        small = finite & ((ranges[:, 2] - ranges[:, 0] + 1) * (ranges[:, 3] - ranges[:, 1] + 1) <= self.max_cells)
+        if len(bounds):
+            self.zmin = min(self.zmin, bounds[:, 2].min())
+            self.zmax = max(self.zmax, bounds[:, 5].max())
+
+        for key, box, (i0, j0, i1, j1), is_small in zip(keys, bounds, ranges.tolist(), small.tolist()):
+            self.sequence[key] = self.counter
+            self.counter += 1
+            if not is_small:
+                self.entries[key] = (box, None)
+                self.large.add(key)
+                continue
+            self.entries[key] = (box, (i0, j0, i1, j1))
+            if i0 == i1 and j0 == j1:
+                self.cells.setdefault((i0, j0), set()).add(key)
+                continue
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    self.cells.setdefault((i, j), set()).add(key)
+
+    def remove(self, key) -> None:
+        if key in self.entries:
+            self.unlink(key)
+            del self.entries[key]
+            del self.sequence[key]
+
+    def unlink(self, key) -> None:
+        cells = self.entries[key][1]
+        if cells is None:
+            self.large.discard(key)
+            return
+        i0, j0, i1, j1 = cells
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = self.cells[(i, j)]
+                cell.discard(key)
+                if not cell:
+                    del self.cells[(i, j)]
+
+    def query(self, xmin: float, ymin: float, xmax: float, ymax: float) -> list:
+        """
+        Returns the keys whose boxes overlap the xy range, in insertion order
+        """
+        i0, j0, i1, j1 = self.cell_range((xmin, ymin, 0, xmax, ymax, 0))
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self.cells):
+            candidates = set(self.entries)
+        else:
+            candidates = set(self.large)
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    candidates.update(self.cells.get((i, j), ()))
+
+        found = []
+        for key in candidates:
+            bounds = self.entries[key][0]
+            if bounds[0] <= xmax and bounds[3] >= xmin and bounds[1] <= ymax and bounds[4] >= ymin:
+                found.append(key)
+        found.sort(key=self.sequence.__getitem__)
+        return found
+
+    def nearest(self, point: tuple[float, float], max_distance: float = math.inf, distance=None):
+        """
+        Returns the (distance, key) closest to an (x, y) point within max_distance, or None.
+        distance(key) gives the distance of a key, at least the distance of its box, which
+        is used by default; the latest inserted key wins ties, as it is drawn on top.
+        The grid is searched ring by ring of cells around the point, until the best distance
+        is smaller than the distance of the next ring. Once a ring has more cells than there
+        are occupied cells, the occupied cells left are visited in order of distance instead.
+        """
+        if not self.entries:
+            return None
+        x, y = point
+        size = self.cell_size
+
+        def box_distance(key) -> float:
+            bounds = self.entries[key][0]
+            dx = max(bounds[0] - x, 0.0, x - bounds[3])
+            dy = max(bounds[1] - y, 0.0, y - bounds[4])
+            return math.hypot(dx, dy)
+
+        measure = distance or box_distance
+        best = None
+        seen = set()
+
+        def visit(keys):
+            nonlocal best
+            for key in keys:
+                if key in seen:
+                    continue
+                seen.add(key)
+                if box_distance(key) > max_distance:
+                    continue
+                value = measure(key)
+                if value > max_distance:
+                    continue
+                if best is None or value < best[0] or (
+                    value == best[0] and self.sequence[key] > self.sequence[best[1]]
+                ):
+                    best = (value, key)
+
+        visit(self.large)
+        ci, cj = math.floor(x / size), math.floor(y / size)
+        # Distance from the point to the border of its cell
+        inner = min(x - ci * size, (ci + 1) * size - x, y - cj * size, (cj + 1) * size - y)
+        ring = 0
+        while 8 * ring <= len(self.cells):
+            for cell in ring_cells(ci, cj, ring):
+                visit(self.cells.get(cell, ()))
+            # Every box not seen yet is at least this far away from the point
+            reach = ring * size + inner
+            if (best is not None and best[0] < reach) or reach > max_distance or len(seen) == len(self.entries):
+                return best
+            ring += 1
+
+        # The rings are larger than the occupied grid: its remaining cells, closest first
+        remaining = []
+        for i, j in self.cells:
+            if max(abs(i - ci), abs(j - cj)) >= ring:
+                dx = max(i * size - x, 0.0, x - (i + 1) * size)
+                dy = max(j * size - y, 0.0, y - (j + 1) * size)
+                remaining.append((math.hypot(dx, dy), i, j))
+        remaining.sort()
+        for reach, i, j in remaining:
+            if (best is not None and best[0] < reach) or reach > max_distance:
+                break
+            visit(self.cells[(i, j)])
+        return best
+
+
+def ring_cells(ci: int, cj: int, ring: int):
+    """
+    Yields the cells at Chebyshev distance ring from the cell (ci, cj)
+    """
+    if ring == 0:
+        yield ci, cj
+        return
+    for i in range(ci - ring, ci + ring + 1):
+        yield i, cj - ring
+        yield i, cj + ring
+    for j in range(cj - ring + 1, cj + ring):
+        yield ci - ring, j
+        yield ci + ring, j
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import zipfile
+
+import numpy as np
+
+# Next to the package, so the cache does not depend on the working directory
+CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "files", "tessellation_cache")
+# Size of the cache files above which the least recently used ones are deleted
+MAX_CACHE_SIZE = 256 * 1024 * 1024
+
+
+def grid_edges(rows: int, cols: int, offset: int = 0) -> np.ndarray:
+    """
+    Returns the (m, 2) vertex indices of the edges of a rows x cols grid stored in
+    row-major order: first the horizontal edges, then the vertical ones
+    """
+    indices = np.arange(rows * cols, dtype=np.int32).reshape(rows, cols) + offset
+    horizontal = np.column_stack([indices[:, :-1].ravel(), indices[:, 1:].ravel()])
+    vertical = np.column_stack([indices[:-1, :].ravel(), indices[1:, :].ravel()])
+    return np.vstack([horizontal, vertical]).reshape(-1, 2)
+
+
+class TessellationCache():
+    """
+    Content addressed cache of surface tessellations on disk.
+    Entries are keyed by a hash of the surface type, control points and resolution,
+    so a surface with the same definition never has to be tessellated twice.
+    The modification time of a file is refreshed when it is read, and once the files
+    exceed max_size bytes the least recently used ones are evicted.
+    """
+
+    def __init__(self, directory: str = CACHE_DIRECTORY, max_size: int = MAX_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        # Total size of the files, scanned on the first store
+        self.size = None
+
+    @staticmethod
+    def key(obj_type: int, control_points: np.ndarray, resolution: int) -> str:
+        control_points = np.ascontiguousarray(control_points, dtype="<f8")
+        digest = hashlib.sha256()
+        digest.update(np.array([obj_type, resolution, *control_points.shape], dtype="<i8").tobytes())
+        digest.update(control_points.tobytes())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npz")
+
+    def load(self, key: str) -> tuple[np.ndarray, np.ndarray, tuple] | None:
+        """
+        Returns the (vertices, edges, shape) of a cached tessellation, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        try:
+            with np.load(self.path(key)) as data:
+                entry = data["vertices"], data["edges"], tuple(int(size) for size in data["shape"])
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+        return entry
+
+    def store(self, key: str, vertices: np.ndarray, edges: np.ndarray, shape: tuple) -> None:
+        if not self.enabled:
+            return
+        path = self.path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written aside and renamed, so a concurrent reader never sees half a file
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            with open(temporary_path, "wb") as f:
+                np.savez(f, vertices=vertices, edges=edges, shape=np.array(shape, dtype=np.int64))
+            os.replace(temporary_path, path)
+            if self.size is None:
+                self.size = sum(size for _, size, _ in self.files())
+            else:
+                self.size += os.path.getsize(path)
+            if self.size > self.max_size:
+                self.evict()
+        except OSError:
+            pass
+
+    def files(self) -> list[tuple[float, int, str]]:
+        """
+        Returns the (mtime, size, path) of the cache files
+        """
+        files = []
+        for directory, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".npz"):
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def evict(self) -> None:
+        """
+        Deletes the least recently used files until the cache fits in max_size
+        """
+        files = sorted(self.files())
+        self.size = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+
+tessellation_cache = TessellationCache()
@@ -0,0 +1,243 @@
+import concurrent.futures
+import multiprocessing
+import threading
+
+import numpy as np
+
+from utils.geometry_store import attach, geometry_store
+from utils.tessellation_cache import grid_edges, tessellation_cache
+from utils.types import ObjectType
+
+BEZIER_MATRIX = np.array([
+    [-1, 3, -3, 1],
+    [3, -6, 3, 0],
+    [-3, 3, 0, 0],
+    [1, 0, 0, 0]
+])
+
+BSPLINE_MATRIX = np.array([
+    [-1, 3, -3, 1],
+    [3, -6, 3, 0],
+    [-3, 0, 3, 0],
+    [1, 4, 1, 0]
+]) / 6
+
+
+def parameter_powers(resolution: int) -> np.ndarray:
+    """
+    Returns the (resolution + 1, 4) rows [t^3, t^2, t, 1] for t stepping from 0 to 1
+    """
+    t = np.arange(resolution + 1) / resolution
+    return np.column_stack([t**3, t**2, t, np.ones(resolution + 1)])
+
+
+def patch_grid(control: np.ndarray, basis: np.ndarray, resolution: int) -> np.ndarray:
+    """
+    Evaluates the bicubic patch of a (4, 4, 3) control grid at every (u, v) of the
+    parameter grid, returning the (resolution + 1, resolution + 1, 3) surface points
+    """
+    powers = parameter_powers(resolution)
+    return np.stack(
+        [powers @ basis @ control[:, :, k] @ basis.T @ powers.T for k in range(3)],
+        axis=-1,
+    )
+
+
+def forward_differences_grids(controls: np.ndarray, resolution: int) -> np.ndarray:
+    """
+    Evaluates (p, 4, 4, 3) B-spline patches with forward differences along v, as
+    forward_differences_bicubic_evaluate does for a single patch, for every row of every
+    patch at once. Returns the (p, resolution + 1, resolution + 1, 3) surface points.
+    """
+    delta = 1.0 / resolution
+    # (p, 3, 4, 4) coefficient matrices M G M^T of each coordinate
+    coefficients = BSPLINE_MATRIX @ np.moveaxis(controls, -1, 1) @ BSPLINE_MATRIX.T
+    a = parameter_powers(resolution) @ coefficients
+
+    value = a[..., 3]
+    d1 = a[..., 2] * delta
+    d2 = a[..., 1] * delta * delta
+    d3 = a[..., 0] * delta * delta * delta
+
+    points = np.empty((len(controls), 3, resolution + 1, resolution + 1))
+    for j in range(resolution + 1):
+        points[..., j] = value
+        value = value + d1
+        d1 = d1 + d2
+        d2 = d2 + d3
+    return np.moveaxis(points, 1, -1)
+
+
+def forward_differences_controls(control: np.ndarray, patches: tuple[int, int] | None = None) -> np.ndarray:
+    """
+    Returns the (p, 4, 4, 3) control grids of the patches of a (rows, cols, 3) B-spline
+    control grid, optionally only the ones from start to stop in row-major order
+    """
+    rows, cols = control.shape[:2]
+    patches_u = max(1, rows - 3)
+    patches_v = max(1, cols - 3)
+    start, stop = patches if patches is not None else (0, patches_u * patches_v)
+    offsets = np.arange(4)
+    grids = []
+    for index in range(start, stop):
+        i, j = divmod(index, patches_v)
+        u = np.minimum(i + offsets, rows - 1)
+        v = np.minimum(j + offsets, cols - 1)
+        grids.append(control[u[:, None], v[None, :]])
+    return np.array(grids, dtype=np.float64).reshape(-1, 4, 4, 3)
+
+
+def patch_count(obj_type: int, control_shape: tuple) -> int:
+    if obj_type == ObjectType.SURFACE_BSPLINE_FD.value:
+        return max(1, control_shape[0] - 3) * max(1, control_shape[1] - 3)
+    return 1
+
+
+def tessellate(obj_type: int, control: np.ndarray, resolution: int, patches: tuple[int, int] | None = None) -> np.ndarray:
+    """
+    Returns the (n, 3) mesh vertices of a surface from its (rows, cols, 3) control grid.
+    Forward differences surfaces can be tessellated a range of patches at a time.
+    This only takes arrays, so it can run on a worker process.
+    """
+    control = np.asarray(control, dtype=np.float64)
+    if obj_type == ObjectType.SURFACE_BSPLINE_FD.value:
+        grids = forward_differences_grids(forward_differences_controls(control, patches), resolution)
+    else:
+        basis = BEZIER_MATRIX if obj_type == ObjectType.SURFACE_BEZIER.value else BSPLINE_MATRIX
+        grids = patch_grid(control[:4, :4], basis, resolution)
+    return grids.reshape(-1, 3)
+
+
+def tessellate_shared(obj_type: int, handles: dict, resolution: int, patches: tuple[int, int] | None = None) -> np.ndarray:
+    """
+    tessellate for a surface published to the geometry store, reading its control grid
+    from shared memory on the worker process
+    """
+    with attach(handles) as arrays:
+        return tessellate(obj_type, arrays["control"], resolution, patches)
+
+
+def surface_shape(obj_type: int, control_shape: tuple, resolution: int) -> tuple:
+    """
+    Returns the shape of the surface points of a tessellation: (rows, cols) of a single
+    grid, or (patches, rows, cols) for forward differences surfaces
+    """
+    size = resolution + 1
+    if obj_type == ObjectType.SURFACE_BSPLINE_FD.value:
+        return patch_count(obj_type, control_shape), size, size
+    return size, size
+
+
+def surface_edges(shape: tuple) -> np.ndarray:
+    """
+    Returns the (m, 2) grid edges of a tessellation of the given surface_shape
+    """
+    if len(shape) == 2:
+        return grid_edges(*shape)
+    patches, rows, cols = shape
+    return np.vstack(
+        [grid_edges(rows, cols, i * rows * cols) for i in range(patches)]
+        or [np.zeros((0, 2), dtype=np.int32)]
+    )
+
+
+class TessellationService():
+    """
+    Tessellates surfaces on a pool of worker processes.
+    Surfaces are published to the geometry store, so tasks only carry the handles of
+    their control grids, and the vertex arrays come back, with the patches of large
+    forward differences surfaces split across several tasks. Surfaces keep
+    their previous mesh until collect() is called with the new one ready, which must
+    happen on the thread that owns the objects.
+    """
+
+    # Forward differences patches tessellated by a single task
+    patches_per_task = 16
+
+    def __init__(self, max_workers: int | None = None):
+        self.enabled = False
+        self.max_workers = max_workers
+        self.executor: concurrent.futures.ProcessPoolExecutor | None = None
+        self.lock = threading.Lock()
+        # id(obj) -> (obj, cache key or None, shape, futures)
+        self.pending: dict[int, tuple] = {}
+
+    def start(self) -> None:
+        with self.lock:
+            if self.executor is None:
+                # Workers are spawned instead of forked, as the parent process runs Qt threads
+                self.executor = concurrent.futures.ProcessPoolExecutor(
+                    self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        with self.lock:
+            self.pending.clear()
+
+    def busy(self) -> bool:
+        return bool(self.pending)
+
+    def submit(self, obj, key: str | None = None) -> None:
+        """
+        Schedules the tessellation of a surface, replacing the one pending for it, if any.
+        With a key, the result is stored in the tessellation cache.
+        """
+        self.start()
+        handles = geometry_store.publish(obj)
+        control_shape = handles["control"].shape
+        obj_type = obj.obj_type.value
+        shape = surface_shape(obj_type, control_shape, obj.resolution)
+        count = patch_count(obj_type, control_shape)
+        if count > self.patches_per_task:
+            ranges = [(start, min(start + self.patches_per_task, count)) for start in range(0, count, self.patches_per_task)]
+        else:
+            ranges = [None]
+        futures = [
+            self.executor.submit(tessellate_shared, obj_type, handles, obj.resolution, patches) for patches in ranges
+        ]
+
+        with self.lock:
+            previous = self.pending.pop(id(obj), None)
+            self.pending[id(obj)] = (obj, key, shape, futures)
+        if previous is not None:
+            for future in previous[3]:
+                future.cancel()
+
+    def collect(self) -> list:
+        """
+        Applies the finished tessellations to their surfaces, returning the updated surfaces
+        """
+        with self.lock:
+            done = [entry for entry in self.pending.values() if all(future.done() for future in entry[3])]
+            for entry in done:
+                del self.pending[id(entry[0])]
+
+        updated = []
+        for obj, key, shape, futures in done:
+            try:
+                vertices = np.vstack([future.result() for future in futures])
+            except Exception:
+                # A failed or broken worker, or a surface released before its tasks ran:
+                # the surface is tessellated here instead
+                vertices = tessellate(obj.obj_type.value, obj.get_control_array(), obj.resolution)
+            edges = surface_edges(shape)
+            obj.apply_mesh(vertices, edges, shape)
+            if key is not None:
+                tessellation_cache.store(key, vertices, edges, shape)
+            updated.append(obj)
+        return updated
+
+    def wait(self) -> list:
+        """
+        Waits for every pending tessellation and applies them
+        """
+        with self.lock:
+            futures = [future for entry in self.pending.values() for future in entry[3]]
+        concurrent.futures.wait(futures)
+        return self.collect()
+
+
+tessellation_service = TessellationService()
@@ -0,0 +1,107 @@
+import itertools
+
+import numpy as np
+
+# Offsets of half of the 26 neighbours of a grid cell; the other half is their mirror image
+NEIGHBOURS = np.array(
+    [offset for offset in itertools.product((-1, 0, 1), repeat=3) if offset > (0, 0, 0)],
+    dtype=np.int64,
+)
+# Multipliers hashing a cell into a single key; colliding cells only add candidates
+HASH = np.array([73856093, 19349663, 83492791], dtype=np.int64)
+
+
+def cell_pairs(start_a, count_a, start_b, count_b) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Every (a, b) position pair between the runs of a sorted array starting at
+    start_a and start_b, count_a and count_b long
+    """
+    sizes = count_a * count_b
+    total = int(sizes.sum())
+    run = np.repeat(np.arange(len(sizes)), sizes)
+    within = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    return start_a[run] + within // count_b[run], start_b[run] + within % count_b[run]
+
+
+def close_pairs(vertices: np.ndarray, epsilon: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the index pairs of vertices at most epsilon apart, each pair once.
+    Such vertices are in the same or neighbouring cells of an epsilon grid, so only
+    the vertices of the 27 cells around each one are compared.
+    """
+    keys = np.floor(vertices / epsilon).astype(np.int64) @ HASH
+    order = np.argsort(keys, kind="stable")
+    cells, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    shared = counts > 1
+    a, b = cell_pairs(starts[shared], counts[shared], starts[shared], counts[shared])
+    found = [(a[a < b], b[a < b])]
+    # The key of a neighbour is the key of the cell plus the hash of the offset
+    for step in NEIGHBOURS @ HASH:
+        index = np.minimum(np.searchsorted(cells, cells + step), len(cells) - 1)
+        hit = np.flatnonzero(cells[index] == cells + step)
+        if len(hit):
+            found.append(cell_pairs(starts[hit], counts[hit], starts[index[hit]], counts[index[hit]]))
+
+    i = order[np.concatenate([a for a, _ in found])]
+    j = order[np.concatenate([b for _, b in found])]
+    delta = vertices[i] - vertices[j]
+    close = np.einsum("ij,ij->i", delta, delta) <= epsilon * epsilon
+    return i[close], j[close]
+
+
+def group_pairs(count: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """
+    Labels each of count items with the lowest index of the group it is joined to by
+    the pairs (i, j), directly or through other items
+    """
+    labels = np.arange(count)
+    while True:
+        previous = labels.copy()
+        low = np.minimum(labels[i], labels[j])
+        np.minimum.at(labels, i, low)
+        np.minimum.at(labels, j, low)
+        # Points each label at the label of its root, so long chains collapse quickly
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def weld(vertices: np.ndarray, edges: np.ndarray, epsilon: float = 1e-6) -> tuple[np.ndarray, np.ndarray, int, int]:
+    """
+    Merges coincident vertices and removes duplicate edges of a wireframe.
+    Vertices at most epsilon apart merge into the first one of them, and so do
+    chains of such vertices; with epsilon 0 only identical vertices merge.
+    Edges are canonicalized as (lower, higher) index pairs, so reversed copies
+    and edges collapsed into a single vertex are removed as well.
+    Returns (vertices, edges, removed vertices, removed edges), keeping the
+    original order of the remaining vertices and edges.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    if len(vertices) == 0:
+        return vertices, edges.astype(np.int32), 0, 0
+
+    if epsilon > 0:
+        labels = group_pairs(len(vertices), *close_pairs(vertices, epsilon))
+    else:
+        _, first, inverse = np.unique(vertices, axis=0, return_index=True, return_inverse=True)
+        labels = first[inverse.reshape(-1)]
+
+    # Groups are numbered in the order of their first vertex, so the order of the vertices is kept
+    first = np.unique(labels)
+    rank = np.searchsorted(first, labels)
+    welded_vertices = vertices[first]
+
+    remapped = rank[edges]
+    remapped.sort(axis=1)
+    remapped = remapped[remapped[:, 0] != remapped[:, 1]]
+    _, first_edges = np.unique(remapped, axis=0, return_index=True)
+    welded_edges = remapped[np.sort(first_edges)].astype(np.int32)
+
+    return (
+        welded_vertices,
+        welded_edges,
+        len(vertices) - len(welded_vertices),
+        len(edges) - len(welded_edges),
+    )